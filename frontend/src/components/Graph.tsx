@@ -36,6 +36,7 @@ type D3Selection<T extends d3.BaseType, U> = d3.Selection<
 
 const VIEWBOX_WIDTH = 1920;
 const VIEWBOX_HEIGHT = 1080;
+const VIEWBOX_MARGIN = 100;
 const ARROW_LENGTH = 30;
 const LINK_LABEL_OFFSET = { x: -15, y: 15 };
 
@@ -126,19 +127,36 @@ export default function Graph({
 
     const svg = d3.select(svgRef.current);
     svg.selectAll("*").remove(); // Clear previous render
-    svg.attr("viewBox", `0 0 ${VIEWBOX_WIDTH} ${VIEWBOX_HEIGHT}`);
-
-    const simulation = d3
-      .forceSimulation<Node>(nodes)
-      .force(
-        "link",
-        d3
-          .forceLink<Node, Link>(links)
-          .id((d) => d.id)
-          .distance(350),
-      )
-      .force("charge", d3.forceManyBody().strength(-500))
-      .force("center", d3.forceCenter(VIEWBOX_WIDTH / 2, VIEWBOX_HEIGHT / 2));
+
+    // Nodes laid out by the server are only drawn, without simulating any force
+    const positioned = nodes.every((n) => n.x != null && n.y != null);
+    if (positioned && nodes.length > 0) {
+      const [minX, maxX] = d3.extent(nodes, (d) => d.x!) as [number, number];
+      const [minY, maxY] = d3.extent(nodes, (d) => d.y!) as [number, number];
+      svg.attr(
+        "viewBox",
+        `${minX - VIEWBOX_MARGIN} ${minY - VIEWBOX_MARGIN} ` +
+          `${Math.max(maxX - minX + 2 * VIEWBOX_MARGIN, VIEWBOX_WIDTH)} ` +
+          `${Math.max(maxY - minY + 2 * VIEWBOX_MARGIN, VIEWBOX_HEIGHT)}`,
+      );
+    } else {
+      svg.attr("viewBox", `0 0 ${VIEWBOX_WIDTH} ${VIEWBOX_HEIGHT}`);
+    }
+
+    const linkForce = d3
+      .forceLink<Node, Link>(links)
+      .id((d) => d.id)
+      .distance(350);
+    const simulation = d3.forceSimulation<Node>(nodes);
+    if (positioned) {
+      // Still resolves the ends of the links, and lets nodes be dragged around
+      simulation.force("link", linkForce.strength(0)).stop();
+    } else {
+      simulation
+        .force("link", linkForce)
+        .force("charge", d3.forceManyBody().strength(-500))
+        .force("center", d3.forceCenter(VIEWBOX_WIDTH / 2, VIEWBOX_HEIGHT / 2));
+    }
 
     createGlowEffect(svg, "green", 10);
     createGlowEffect(svg, "crimson", 8);
@@ -153,7 +171,7 @@ export default function Graph({
     createMarkers(svg);
     createInitialFinalNodeDecorations(svg, initialNode, finalNodes, svgNodes);
 
-    simulation.on("tick", () => {
+    const draw = () =>
       updatePositions({
         svg,
         svgNodes,
@@ -162,7 +180,8 @@ export default function Graph({
         svgLinkLabels,
         links,
       });
-    });
+    simulation.on("tick", draw);
+    if (positioned) draw();
   }, []);
 
   useEffect(() => {
@@ -7,11 +7,22 @@ PyScaffold helps you to put up the scaffold of your new Python project.
 Learn more under: https://pyscaffold.org/
 """
 
-from setuptools import setup
+from setuptools import Extension, setup
+
+# Compiled run loops of the automata, the package falls back to the pure Python ones in
+# `mercury.automata._run` when the extension can't be built (e.g. without a C compiler)
+speedups = Extension(
+    "mercury.automata._speedups",
+    sources=["src/mercury/automata/_speedups.c"],
+    optional=True,
+)
 
 if __name__ == "__main__":
     try:
-        setup(use_scm_version={"version_scheme": "no-guess-dev"})
+        setup(
+            use_scm_version={"version_scheme": "no-guess-dev"},
+            ext_modules=[speedups],
+        )
     except:  # noqa
         print(
             "\n\nAn error occurred while building the project, "
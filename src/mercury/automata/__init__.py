@@ -1,4 +1,16 @@
+from ._compiled_table import BYTE_ALPHABET, CompiledTable
 from ._deterministic_finite_automata import DeterministicFiniteAutomata
 from ._deterministic_finite_transducer import DeterministicFiniteTransducer
+from ._mealy_transducer import MealyTransducer
+from ._nondeterministic_finite_automata import NondeterministicFiniteAutomata
+from ._trace import RunLengthTrace
 
-__all__ = ["DeterministicFiniteAutomata", "DeterministicFiniteTransducer"]
+__all__ = [
+    "BYTE_ALPHABET",
+    "CompiledTable",
+    "DeterministicFiniteAutomata",
+    "DeterministicFiniteTransducer",
+    "MealyTransducer",
+    "NondeterministicFiniteAutomata",
+    "RunLengthTrace",
+]
@@ -0,0 +1,26 @@
+import os
+
+PURE_PYTHON_VARIABLE = "MERCURY_PURE_PYTHON"
+"""Environment variable that disables the compiled run loops when set to non empty"""
+
+BACKEND: str
+"""
+Implementation of the run loops in use, "c" if the `_speedups` extension could be built
+and imported, "python" otherwise
+"""
+
+if os.environ.get(PURE_PYTHON_VARIABLE):
+    from ._run import run, run_many, trace, transduce, transduce_into
+
+    BACKEND = "python"
+else:
+    try:
+        from ._speedups import run, run_many, trace, transduce, transduce_into
+
+        BACKEND = "c"
+    except ImportError:
+        from ._run import run, run_many, trace, transduce, transduce_into
+
+        BACKEND = "python"
+
+__all__ = ["BACKEND", "run", "run_many", "trace", "transduce", "transduce_into"]
@@ -0,0 +1,104 @@
+from array import array
+
+import numpy as np
+
+from mercury.types import InputBytes
+
+MAX_FUNCTIONS = 256
+"""Largest amount of distinct state transformations the monoid is allowed to hold"""
+
+CHUNK_SIZE = 1 << 20
+"""Bytes reduced at once, bounding the memory used by the intermediate arrays"""
+
+
+class ByteMonoid:
+    """
+    Transformation monoid of an automaton in byte mode, used to run long binary inputs
+    with NumPy.
+
+    Every byte acts on the automaton as a function from states to states, and reading
+    two bytes acts as the composition of their functions. When the automaton has few
+    states, the set of every function that a sequence of bytes can produce is small, so
+    each one gets an id and their compositions are tabulated. A whole input can then be
+    reduced by composing neighbouring pairs with a single vectorized lookup, halving its
+    length in each round, instead of stepping through it one byte at a time.
+
+    Attributes:
+        functions: Functions from state to state, as rows indexed by function id.
+        generators: Function id of each byte.
+        composition: Id of the function that applies `a` and then `b`, at `[a, b]`.
+    """
+
+    functions: "np.ndarray"
+    generators: "np.ndarray"
+    composition: "np.ndarray"
+
+    def __init__(self, functions: list[tuple[int, ...]], generators: list[int]) -> None:
+        ids = {function: i for i, function in enumerate(functions)}
+        self.functions = np.array(functions, dtype=np.intp)
+        self.generators = np.array(generators, dtype=np.intp)
+
+        # composed[a, b, s] = functions[b][functions[a][s]]
+        composed = self.functions[
+            np.arange(len(functions))[None, :, None], self.functions[:, None, :]
+        ]
+        self.composition = np.array(
+            [[ids[tuple(row)] for row in rows] for rows in composed.tolist()],
+            dtype=np.intp,
+        )
+
+    @classmethod
+    def from_byte_table(
+        cls, byte_table: array[int], num_states: int
+    ) -> "ByteMonoid | None":
+        """
+        Builds the monoid out of a byte table (see `CompiledTable.to_byte_table`) with
+        `num_states` rows, or returns None if it would hold more than `MAX_FUNCTIONS`
+        """
+        rows = [
+            tuple(byte_table[state * 256 + byte] for state in range(num_states))
+            for byte in range(256)
+        ]
+
+        functions: list[tuple[int, ...]] = []
+        ids: dict[tuple[int, ...], int] = {}
+        for function in [tuple(range(num_states))] + rows:
+            if function not in ids:
+                ids[function] = len(functions)
+                functions.append(function)
+
+        # Close the set of functions under composition with every byte
+        generators = list(dict.fromkeys(rows))
+        index = 0
+        while index < len(functions):
+            function = functions[index]
+            for generator in generators:
+                composed = tuple(generator[state] for state in function)
+                if composed not in ids:
+                    if len(functions) == MAX_FUNCTIONS:
+                        return None
+                    ids[composed] = len(functions)
+                    functions.append(composed)
+            index += 1
+
+        return cls(functions, [ids[row] for row in rows])
+
+    def run(self, input_bytes: InputBytes, state: int) -> int:
+        """Returns the state reached after reading the whole input from `state`"""
+        data = np.frombuffer(memoryview(input_bytes).cast("B"), dtype=np.uint8)
+        composition = self.composition
+        num_functions = len(composition)
+        flat_composition = composition.ravel()
+
+        for start in range(0, len(data), CHUNK_SIZE):
+            reduced = self.generators[data[start : start + CHUNK_SIZE]]
+            while len(reduced) > 1:
+                if len(reduced) % 2:
+                    state = int(self.functions[reduced[0], state])
+                    reduced = reduced[1:]
+                reduced = flat_composition[
+                    reduced[0::2] * num_functions + reduced[1::2]
+                ]
+            if len(reduced):
+                state = int(self.functions[reduced[0], state])
+        return state
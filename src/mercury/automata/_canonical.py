@@ -0,0 +1,129 @@
+from collections.abc import Callable, Hashable, Sequence
+from hashlib import sha256
+from threading import Lock
+from typing import cast
+from weakref import WeakValueDictionary
+
+from ._compiled_table import CompiledTable
+
+type StateLabel = Callable[[int], Hashable]
+"""Tells apart states by id beyond their transitions, such as whether they accept"""
+
+_interned: WeakValueDictionary[str, object] = WeakValueDictionary()
+_interned_lock = Lock()
+
+
+def minimal_blocks(
+    table: CompiledTable,
+    label: StateLabel | None = None,
+    outputs: Sequence[Hashable] | None = None,
+) -> list[int]:
+    """
+    Block of each state in the minimal automaton, indexed by state id, with -1 for the
+    states that can't be reached from the initial state. States start split by `label`
+    (whether they accept by default) and by the outputs of their transitions when given
+    (indexed by output id), and blocks are then refined by the blocks their transitions
+    lead into until no block splits any further (Moore's algorithm)
+    """
+    reachable = sorted(table.reachable())
+    if label is None:
+        label = table.final_states.__contains__
+
+    keys: dict[Hashable, int] = {}
+    blocks = [-1] * table.num_states
+    for state in reachable:
+        key = label(state)
+        if outputs is not None:
+            key = (key, tuple(outputs[output_id] for output_id in table.outputs[state]))
+        blocks[state] = keys.setdefault(key, len(keys))
+
+    amount = len(keys)
+    transitions = table.transitions
+    while True:
+        signatures: dict[tuple[int, tuple[int, ...]], int] = {}
+        refined = [-1] * table.num_states
+        for state in reachable:
+            signature = (
+                blocks[state],
+                tuple(blocks[next_state] for next_state in transitions[state]),
+            )
+            refined[state] = signatures.setdefault(signature, len(signatures))
+        blocks = refined
+        if len(signatures) == amount:
+            return blocks
+        amount = len(signatures)
+
+
+def canonical_form(
+    table: CompiledTable,
+    label: StateLabel | None = None,
+    outputs: Sequence[Hashable] | None = None,
+) -> tuple[Hashable, ...]:
+    """
+    Description of the minimal automaton that is the same for every automaton with the
+    same behaviour, whatever its states are and however its symbols were grouped into
+    classes. States of the minimal automaton are numbered breadth first from the initial
+    state, following symbols in order, and symbols are grouped by their column in it
+    """
+    blocks = minimal_blocks(table, label, outputs)
+    if label is None:
+        label = table.final_states.__contains__
+
+    # Classes are numbered in order of their first symbol, so going through them in
+    # order finds new states in the same order as going through every symbol would
+    order = {blocks[table.initial_state]: 0}
+    representatives = [table.initial_state]
+    for state in representatives:  # Grows as new states are found
+        for next_state in table.transitions[state]:
+            if blocks[next_state] not in order:
+                order[blocks[next_state]] = len(order)
+                representatives.append(next_state)
+
+    columns: dict[tuple[Hashable, ...], list[str]] = {}
+    for class_id, symbols in enumerate(table.classes):
+        column: tuple[Hashable, ...] = tuple(
+            order[blocks[table.transitions[state][class_id]]]
+            for state in representatives
+        )
+        if outputs is not None:
+            column += tuple(
+                outputs[table.outputs[state][class_id]] for state in representatives
+            )
+        columns.setdefault(column, []).extend(symbols)
+
+    return (
+        len(representatives),
+        tuple(
+            sorted(
+                (tuple(sorted(symbols)), column) for column, symbols in columns.items()
+            )
+        ),
+        tuple(label(state) for state in representatives),
+    )
+
+
+def canonical_digest(
+    kind: str,
+    table: CompiledTable,
+    label: StateLabel | None = None,
+    outputs: Sequence[Hashable] | None = None,
+) -> str:
+    """Hash of the kind of automaton and the canonical form of its table"""
+    form = canonical_form(table, label, outputs)
+    return sha256(repr((kind, form)).encode()).hexdigest()
+
+
+def intern[T](digest: str, automaton: T) -> T:
+    """
+    Returns the automaton interned under the digest, interning the given one if there is
+    none. Interned automata are only held weakly, and dropped once no longer used
+    """
+    with _interned_lock:
+        return cast(T, _interned.setdefault(digest, automaton))
+
+
+def forget(digest: str, automaton: object) -> None:
+    """Drops the automaton from the interned ones, if it is interned under the digest"""
+    with _interned_lock:
+        if _interned.get(digest) is automaton:
+            del _interned[digest]
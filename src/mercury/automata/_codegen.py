@@ -0,0 +1,139 @@
+import os
+from collections.abc import Sequence
+from hashlib import sha256
+from importlib.util import module_from_spec, spec_from_file_location
+from types import ModuleType
+
+from mercury.exceptions import UnsupportedAlphabetException
+
+from ._compiled_table import CompiledTable
+
+MAX_GENERATED_CLASSES = 255
+"""
+Most symbol classes of the automata that can be compiled into Python, as inputs are
+translated into a byte per symbol (with one more value for symbols outside of their
+alphabet)
+"""
+
+_TEMPLATE = '''\
+"""Run loops of a single automaton, generated by Mercury (see `compile_to_python`)"""
+
+WIDTH = {width}
+INVALID = {invalid!r}
+TRANSITIONS = {transitions!r}
+OUTPUTS = {outputs!r}
+EMPTY = {empty!r}
+
+
+class _Classes(dict):
+    def __missing__(self, code):
+        return {invalid_char!r}
+
+
+CLASSES = _Classes({classes!r})
+
+
+def run(data, state):
+    """
+    State id the input leads to from `state`, or -1 on symbols outside of the alphabet
+    """
+    codes = data.translate(CLASSES).encode("latin-1")
+    if INVALID in codes:
+        return -1
+    transitions = TRANSITIONS
+    index = state * WIDTH
+    for code in codes:
+        index = transitions[index + code]
+    return index // WIDTH
+
+
+def transduce(data, state):
+    """
+    Outputs of the transitions taken from `state` joined together, the state id it ends
+    on (-1 on symbols outside of the alphabet) and the amount of symbols read
+    """
+    codes = data.translate(CLASSES).encode("latin-1")
+    end = codes.find(INVALID)
+    if end != -1:
+        codes = codes[:end]
+    transitions = TRANSITIONS
+    outputs = OUTPUTS
+    parts = []
+    append = parts.append
+    index = state * WIDTH
+    for code in codes:
+        index += code
+        append(outputs[index])
+        index = transitions[index]
+    return EMPTY.join(parts), -1 if end != -1 else index // WIDTH, len(codes)
+'''
+
+
+def generate_source(
+    table: CompiledTable,
+    outputs: Sequence[str] | Sequence[bytes] | None = None,
+    empty: str | bytes = "",
+) -> str:
+    """
+    Source of a module with the run loops of the table, with every constant they need
+    written out as a literal. Inputs are translated into a byte string of class ids with
+    `str.translate` first, so the loops only index into a flat tuple of transitions
+    (holding the offset of each row instead of the state id). With `outputs`, the
+    strings indexed by the output ids of the table, it also transduces
+    """
+    if any(len(symbol) != 1 for symbol in table.symbols):
+        raise UnsupportedAlphabetException(
+            "generated Python", "every input symbol must be a single character"
+        )
+    if table.num_classes > MAX_GENERATED_CLASSES:
+        raise UnsupportedAlphabetException(
+            "generated Python",
+            f"there must be at most {MAX_GENERATED_CLASSES} symbol classes",
+        )
+
+    # Rows are at least one wide, so that without symbols (where every input but the
+    # empty one is invalid) the offset of the state still gives back its id
+    width = max(table.num_classes, 1)
+    return _TEMPLATE.format(
+        width=width,
+        invalid=bytes([table.num_classes]),
+        invalid_char=chr(table.num_classes),
+        transitions=tuple(
+            next_state * width for row in table.transitions for next_state in row
+        ),
+        outputs=(
+            ()
+            if outputs is None
+            else tuple(outputs[output_id] for row in table.outputs for output_id in row)
+        ),
+        empty=empty,
+        classes={
+            ord(symbol): chr(class_id) for symbol, class_id in table.class_ids.items()
+        },
+    )
+
+
+def load(source: str, path: str | None = None) -> ModuleType:
+    """
+    Runs the generated source as a module. With `path`, writes it into that file first
+    (unless it already holds it) and imports it from there, so that Python caches its
+    bytecode for later loads
+    """
+    name = f"mercury_generated_{sha256(source.encode()).hexdigest()[:16]}"
+    if path is None:
+        module = ModuleType(name)
+        exec(compile(source, f"<{name}>", "exec"), module.__dict__)
+        return module
+
+    existing = None
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            existing = file.read()
+    if existing != source:
+        with open(path, "w", encoding="utf-8") as file:
+            _ = file.write(source)
+    spec = spec_from_file_location(name, path)
+    assert spec is not None and spec.loader is not None
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
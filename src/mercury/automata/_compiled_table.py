@@ -0,0 +1,225 @@
+from array import array
+from collections.abc import Iterable, Mapping
+
+from mercury.exceptions import UnsupportedAlphabetException
+from mercury.types import InputSymbol, State
+
+NO_CLASS = -1
+"""Class of the symbols that are not part of the alphabet of the automaton"""
+
+BYTE_ALPHABET = "".join(chr(byte) for byte in range(256))
+"""Every input symbol that a byte can be read as, for automata running in byte mode"""
+
+
+class CompiledTable:
+    """
+    Transition table of an automaton over integer ids.
+
+    States and input symbols are numbered in a stable order (sorted by their `repr`
+    and by value respectively), so that the run loops can work on plain integer
+    indexing instead of going through `repr` strings and nested dictionaries. The
+    table is immutable once built.
+
+    Input symbols that every state treats the same way (that is, with identical columns
+    in the transition table) are merged into a single symbol class, and the table only
+    keeps one column per class. Alphabets where hundreds of symbols behave alike then
+    take just a handful of columns. When the table also holds the outputs of a
+    transducer, symbols only share a class if they produce the same outputs too.
+
+    Attributes:
+        states: States of the automaton, indexed by their id.
+        symbols: Input symbols of the automaton, indexed by their id.
+        classes: Symbols of each class, indexed by class id.
+        transitions: Rows by state id, mapping each class id into the next state id.
+        flat_transitions: Rows of `transitions` concatenated, indexed by
+            `state * num_classes + class_id`.
+        outputs: Rows of output ids laid out like `transitions`, empty without outputs.
+        flat_outputs: Rows of `outputs` concatenated, laid out like `flat_transitions`.
+        initial_state: Id of the initial state.
+        final_states: Ids of the accepting states.
+        sink_state: Id of a state that isn't accepting and only leads to itself, where
+            runs can stop early as they can never be accepted. None if there is no such
+            state.
+        state_ids: Inverse of `states`, maps each state into its id.
+        symbol_ids: Inverse of `symbols`, maps each input symbol into its id.
+        symbol_classes: Class id of each symbol, indexed by symbol id.
+        class_ids: Maps each input symbol into its class id.
+        class_lookup: Maps code points into class ids (`NO_CLASS` if not in the
+            alphabet), with 256 or 65536 entries depending on the highest code point of
+            the alphabet. Empty if some symbol is not a single character below 65536.
+    """
+
+    states: tuple[State, ...]
+    symbols: tuple[InputSymbol, ...]
+    classes: tuple[tuple[InputSymbol, ...], ...]
+    transitions: tuple[tuple[int, ...], ...]
+    flat_transitions: array[int]
+    outputs: tuple[tuple[int, ...], ...]
+    flat_outputs: array[int]
+    initial_state: int
+    final_states: frozenset[int]
+    sink_state: int | None
+    state_ids: dict[State, int]
+    symbol_ids: dict[InputSymbol, int]
+    symbol_classes: tuple[int, ...]
+    class_ids: dict[InputSymbol, int]
+    class_lookup: array[int]
+
+    def __init__(
+        self,
+        states: Iterable[State],
+        symbols: Iterable[InputSymbol],
+        transitions: Mapping[State, Mapping[InputSymbol, State]],
+        initial_state: State,
+        final_states: Iterable[State],
+        outputs: Mapping[State, Mapping[InputSymbol, int]] | None = None,
+    ) -> None:
+        """
+        Numbers the states and symbols, groups the symbols into classes and builds the
+        integer transition table.
+
+        Args:
+            states: States of the automaton.
+            symbols: Input symbols of the automaton.
+            transitions: Mapping from each state and symbol into the next state.
+            initial_state: Initial state of the automaton.
+            final_states: Accepting states of the automaton.
+            outputs: Mapping from each state and symbol into an output id, for
+                transducers.
+        """
+        self.states = tuple(sorted(states, key=repr))
+        self.symbols = tuple(sorted(symbols))
+        self.state_ids = {state: i for i, state in enumerate(self.states)}
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.initial_state = self.state_ids[initial_state]
+        self.final_states = frozenset(self.state_ids[state] for state in final_states)
+
+        # Symbols with the same column of next states (and outputs) belong to the same
+        # class, outputs are kept in the second half of the column
+        columns: dict[tuple[int, ...], int] = {}
+        classes: list[list[InputSymbol]] = []
+        symbol_classes: list[int] = []
+        for symbol in self.symbols:
+            column = tuple(
+                self.state_ids[transitions[state][symbol]] for state in self.states
+            )
+            if outputs is not None:
+                column += tuple(outputs[state][symbol] for state in self.states)
+            class_id = columns.setdefault(column, len(columns))
+            if class_id == len(classes):
+                classes.append([])
+            classes[class_id].append(symbol)
+            symbol_classes.append(class_id)
+
+        self.classes = tuple(tuple(symbols_in_class) for symbols_in_class in classes)
+        self.symbol_classes = tuple(symbol_classes)
+        self.class_ids = dict(zip(self.symbols, self.symbol_classes))
+        self.transitions = tuple(
+            tuple(column[i] for column in columns) for i in range(len(self.states))
+        )
+        self.outputs = (
+            tuple(
+                tuple(column[len(self.states) + i] for column in columns)
+                for i in range(len(self.states))
+            )
+            if outputs is not None
+            else ()
+        )
+        self.flat_transitions = array("i", [i for row in self.transitions for i in row])
+        self.flat_outputs = array("i", [i for row in self.outputs for i in row])
+        self.class_lookup = self._build_class_lookup()
+        self.sink_state = next(
+            (
+                state
+                for state, row in enumerate(self.transitions)
+                if state not in self.final_states and all(t == state for t in row)
+            ),
+            None,
+        )
+
+    def _build_class_lookup(self) -> array[int]:
+        if not all(len(symbol) == 1 for symbol in self.symbols):
+            return array("i")
+        highest = max((ord(symbol) for symbol in self.symbols), default=0)
+        if highest >= 65536:
+            return array("i")
+
+        lookup = array("i", [NO_CLASS]) * (256 if highest < 256 else 65536)
+        for symbol, class_id in self.class_ids.items():
+            lookup[ord(symbol)] = class_id
+        return lookup
+
+    def reachable(self) -> frozenset[int]:
+        """Ids of the states that can be reached from the initial state"""
+        seen = {self.initial_state}
+        queue = [self.initial_state]
+        for state in queue:  # Grows as new states are found
+            for next_state in self.transitions[state]:
+                if next_state not in seen:
+                    seen.add(next_state)
+                    queue.append(next_state)
+        return frozenset(seen)
+
+    def live(self) -> frozenset[int]:
+        """Ids of the states from which some accepting state can be reached"""
+        return frozenset(
+            state for state, distance in enumerate(self.distances()) if distance >= 0
+        )
+
+    def distances(self) -> array[int]:
+        """
+        Least amount of symbols to read from each state to reach an accepting state,
+        indexed by state id, or -1 if none can be reached. Found with a single breadth
+        first search backwards from the accepting states
+        """
+        predecessors: list[set[int]] = [set() for _ in self.states]
+        for state, row in enumerate(self.transitions):
+            for next_state in row:
+                predecessors[next_state].add(state)
+
+        distances = array("i", [-1]) * self.num_states
+        queue = list(self.final_states)
+        for state in queue:
+            distances[state] = 0
+        for state in queue:  # Grows as new states are found
+            for previous_state in predecessors[state]:
+                if distances[previous_state] == -1:
+                    distances[previous_state] = distances[state] + 1
+                    queue.append(previous_state)
+        return distances
+
+    def to_byte_table(self) -> array[int]:
+        """
+        Expands the table into `(num_states + 1) x 256` entries, indexed by
+        `state * 256 + byte`, with each byte read as the symbol `chr(byte)`. The extra
+        last row is a dead state that bytes outside of the alphabet lead into, so that
+        run loops don't need to check for them on every step.
+        """
+        if len(self.class_lookup) == 0:
+            raise UnsupportedAlphabetException(
+                "byte",
+                "every input symbol must be a single character below U+10000",
+            )
+        dead_state = self.num_states
+        table = array("i", [dead_state]) * ((self.num_states + 1) * 256)
+        for state, row in enumerate(self.transitions):
+            for byte in range(256):
+                class_id = self.class_lookup[byte]
+                if class_id != NO_CLASS:
+                    table[state * 256 + byte] = row[class_id]
+        return table
+
+    @property
+    def num_states(self) -> int:
+        """Amount of states (rows) in the table"""
+        return len(self.states)
+
+    @property
+    def num_symbols(self) -> int:
+        """Amount of input symbols in the alphabet"""
+        return len(self.symbols)
+
+    @property
+    def num_classes(self) -> int:
+        """Amount of symbol classes (columns) in the table"""
+        return len(self.classes)
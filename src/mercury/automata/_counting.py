@@ -0,0 +1,327 @@
+from collections.abc import Iterator
+from random import Random
+from typing import TYPE_CHECKING, Any
+
+from ._compiled_table import CompiledTable
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+_INT64_MAX = (1 << 63) - 1
+"""Largest value NumPy can hold in an int64, bounding the counts computed with NumPy"""
+
+
+class LanguageCounter:
+    """
+    Counts and enumerates the inputs of each length accepted by a compiled table.
+
+    Counting is a dynamic program over the table: the amount of accepted inputs of
+    length `k + 1` from a state is the sum, over its symbol classes, of the amount of
+    symbols in the class times the amount of accepted inputs of length `k` from the next
+    state. Each step is a matrix-vector product, done with NumPy in int64 when the
+    counts are known to fit (and with Python integers otherwise). For lengths much
+    larger than the amount of states, the matrix is raised to the length by repeated
+    squaring instead.
+
+    Sampling draws inputs of a length uniformly at random among the accepted ones,
+    walking the table with each transition weighted by the amount of accepted inputs it
+    leads to. These amounts are kept per remaining length, and computed once for each.
+
+    Attributes:
+        table: Compiled table of the automaton.
+        useful: Ids of the states that are reachable and can reach a final state, the
+            only ones that take part in accepted inputs.
+    """
+
+    table: CompiledTable
+    useful: tuple[int, ...]
+    _class_sizes: list[int]
+    _predecessors: list[set[int]]
+    _ways: list[list[int]]
+
+    def __init__(self, table: CompiledTable) -> None:
+        self.table = table
+        self.useful = tuple(sorted(table.reachable() & table.live()))
+        self._class_sizes = [len(symbols) for symbols in table.classes]
+        self._predecessors = [set() for _ in table.states]
+        for state, row in enumerate(table.transitions):
+            for next_state in row:
+                self._predecessors[next_state].add(state)
+        self._ways = [
+            [int(state in table.final_states) for state in range(table.num_states)]
+        ]
+
+    def count(self, length: int, modulus: int | None = None) -> int:
+        """Amount of accepted inputs of the given length, modulo `modulus` if given"""
+        if length < 0:
+            raise ValueError("length must not be negative")
+        if modulus is not None and modulus < 1:
+            raise ValueError("modulus must be positive")
+        if self.table.initial_state not in self.useful:
+            return 0
+
+        steps_cost = length * self.table.num_states * max(self.table.num_classes, 1)
+        power_cost = len(self.useful) ** 3 * length.bit_length()
+        if steps_cost > power_cost:
+            return self._count_power(length, modulus)
+        return self._count_steps(length, modulus)
+
+    def _count_steps(self, length: int, modulus: int | None) -> int:
+        """Runs the dynamic program one length at a time over the whole table"""
+        table = self.table
+        sizes = self._class_sizes
+        ways = [int(state in table.final_states) for state in range(table.num_states)]
+
+        # Counts are below the amount of inputs of the length, or the modulus, and each
+        # step adds up to that many times the amount of symbols
+        fits = (
+            (modulus - 1) * table.num_symbols <= _INT64_MAX
+            if modulus is not None
+            else length * table.num_symbols.bit_length() < 63
+        )
+        np = _import_numpy() if fits and table.num_classes else None
+        if np is not None:
+            transitions = np.array(table.transitions, dtype=np.intp)
+            class_sizes = np.array(sizes, dtype=np.int64)
+            vector = np.array(ways, dtype=np.int64)
+            for _ in range(length):
+                vector = (vector[transitions] * class_sizes).sum(axis=1)
+                if modulus is not None:
+                    vector %= modulus
+            ways = vector.tolist()
+        else:
+            for _ in range(length):
+                ways = [
+                    sum(size * ways[next_state] for next_state, size in zip(row, sizes))
+                    for row in table.transitions
+                ]
+                if modulus is not None:
+                    ways = [count % modulus for count in ways]
+
+        count = ways[table.initial_state]
+        return count % modulus if modulus is not None else count
+
+    def _count_power(self, length: int, modulus: int | None) -> int:
+        """Raises the matrix of the useful states to the length by repeated squaring"""
+        table = self.table
+        index = {state: i for i, state in enumerate(self.useful)}
+        size = len(self.useful)
+        matrix = [[0] * size for _ in range(size)]
+        for state in self.useful:
+            for next_state, symbols in zip(table.transitions[state], self._class_sizes):
+                if next_state in index:
+                    matrix[index[state]][index[next_state]] += symbols
+
+        multiply = _multiply
+        np = _import_numpy()
+        if np is not None:
+            fits = modulus is not None and size * (modulus - 1) ** 2 <= _INT64_MAX
+            multiply = _numpy_multiply(np.int64 if fits else np.object_)
+
+        # The vector is only multiplied by the powers of the matrix making up the length
+        column = [[int(state in table.final_states)] for state in self.useful]
+        while length:
+            if length & 1:
+                column = multiply(matrix, column, modulus)
+            length >>= 1
+            if length:
+                matrix = multiply(matrix, matrix, modulus)
+
+        count = int(column[index[table.initial_state]][0])
+        return count % modulus if modulus is not None else count
+
+    def ways(self, length: int) -> list[int]:
+        """
+        Amount of accepted inputs of the given length from each state, indexed by state
+        id. Cached along with every shorter length
+        """
+        ways = self._ways
+        if len(ways) <= length:
+            # Extends a copy, so that threads reading the cache never see it half built
+            ways = list(ways)
+            transitions = self.table.transitions
+            sizes = self._class_sizes
+            while len(ways) <= length:
+                previous = ways[-1]
+                ways.append(
+                    [
+                        sum(
+                            size * previous[next_state]
+                            for next_state, size in zip(row, sizes)
+                        )
+                        for row in transitions
+                    ]
+                )
+            self._ways = ways
+        return ways[length]
+
+    def sample(self, length: int, amount: int, rng: Random) -> list[str]:
+        """
+        Draws `amount` accepted inputs of the given length, each uniformly at random and
+        independently of the others. Large batches are drawn with NumPy, a column of
+        symbols at a time, when it is installed and the counts fit in an int64
+        """
+        if length < 0:
+            raise ValueError("length must not be negative")
+        total = self.ways(length)[self.table.initial_state]
+        if not total:
+            raise ValueError(f"no input of length {length} is accepted")
+
+        np = _import_numpy() if amount > 1 and length and total <= _INT64_MAX else None
+        # Symbols are laid out as code points, where trailing NUL characters get lost
+        if np is not None and all(
+            len(symbol) == 1 and symbol != "\0" for symbol in self.table.symbols
+        ):
+            return self._sample_numpy(np, length, amount, rng)
+        return [self._sample_one(length, rng) for _ in range(amount)]
+
+    def _sample_one(self, length: int, rng: Random) -> str:
+        """
+        Draws an accepted input by a single number below the amount of accepted inputs
+        left from each state, which picks both the class and the symbol within it
+        """
+        table = self.table
+        state = table.initial_state
+        symbols: list[str] = []
+        for remaining in range(length, 0, -1):
+            after = self._ways[remaining - 1]
+            draw = rng.randrange(self._ways[remaining][state])
+            for next_state, class_symbols in zip(
+                table.transitions[state], table.classes
+            ):
+                weight = after[next_state] * len(class_symbols)
+                if draw < weight:
+                    symbols.append(class_symbols[draw // after[next_state]])
+                    state = next_state
+                    break
+                draw -= weight
+        return "".join(symbols)
+
+    def _sample_numpy(self, np, length: int, amount: int, rng: Random) -> list[str]:
+        """Draws like `_sample_one` for every input at once, a position at a time"""
+        table = self.table
+        transitions = np.array(table.transitions, dtype=np.intp)
+        sizes = np.array(self._class_sizes, dtype=np.int64)
+        code_points = np.zeros((table.num_classes, int(sizes.max())), dtype=np.uint32)
+        for class_id, class_symbols in enumerate(table.classes):
+            code_points[class_id, : len(class_symbols)] = list(map(ord, class_symbols))
+
+        # States the inputs go through never have more accepted inputs left than the
+        # initial state, the rest are capped so that their rows can't overflow
+        cap = _INT64_MAX // max(table.num_symbols, 1)
+        generator = np.random.default_rng(rng.getrandbits(64))
+        rows = np.arange(amount)
+        states = np.full(amount, table.initial_state, dtype=np.intp)
+        out = np.empty((amount, length), dtype=np.uint32)
+        for position in range(length):
+            after = np.array(
+                [min(count, cap) for count in self._ways[length - position - 1]],
+                dtype=np.int64,
+            )
+            weights = after[transitions] * sizes
+            bounds = weights.cumsum(axis=1)[states]
+            draws = generator.integers(0, bounds[:, -1])
+            class_ids = (bounds <= draws[:, None]).sum(axis=1)
+            next_states = transitions[states, class_ids]
+            offsets = draws - bounds[rows, class_ids] + weights[states, class_ids]
+            out[:, position] = code_points[class_ids, offsets // after[next_states]]
+            states = next_states
+        return out.view(f"<U{length}").ravel().tolist()
+
+    def accepted(self, max_length: int) -> Iterator[str]:
+        """
+        Yields the accepted inputs up to `max_length` symbols by length, and in
+        lexicographic order of their symbols within each length. Only extends an input
+        with symbols after which an input of the remaining length can still be accepted,
+        so every step leads to an accepted input
+        """
+        table = self.table
+        # States that accept some input of exactly `k` more symbols, at index `k`
+        accepting = [frozenset(table.final_states)]
+        for _ in range(max_length):
+            accepting.append(
+                frozenset(
+                    state
+                    for next_state in accepting[-1]
+                    for state in self._predecessors[next_state]
+                )
+            )
+
+        steps = [
+            (symbol, table.class_ids[symbol])
+            for symbol in table.symbols  # Sorted by value
+        ]
+        for length in range(max_length + 1):
+            if table.initial_state in accepting[length]:
+                yield from self._accepted_of_length(length, accepting, steps)
+
+    def _accepted_of_length(
+        self,
+        length: int,
+        accepting: list[frozenset[int]],
+        steps: list[tuple[str, int]],
+    ) -> Iterator[str]:
+        if length == 0:
+            yield ""
+            return
+
+        transitions = self.table.transitions
+        path: list[str] = []
+        states = [self.table.initial_state]
+        pending = [iter(steps)]
+        while pending:
+            remaining = length - len(path)
+            for symbol, class_id in pending[-1]:
+                next_state = transitions[states[-1]][class_id]
+                if next_state not in accepting[remaining - 1]:
+                    continue
+                if remaining == 1:
+                    yield "".join(path) + symbol
+                    continue
+                path.append(symbol)
+                states.append(next_state)
+                pending.append(iter(steps))
+                break
+            else:
+                pending.pop()
+                states.pop()
+                if path:
+                    path.pop()
+
+
+def _import_numpy():
+    """NumPy if it is installed, None otherwise"""
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    return np
+
+
+def _multiply(
+    left: list[list[int]], right: list[list[int]], modulus: int | None
+) -> list[list[int]]:
+    columns = list(zip(*right))
+    product = [
+        [sum(a * b for a, b in zip(row, column)) for column in columns] for row in left
+    ]
+    if modulus is not None:
+        product = [[value % modulus for value in row] for row in product]
+    return product
+
+
+def _numpy_multiply(dtype: "type[np.int64] | type[np.object_]"):
+    import numpy as np
+
+    def multiply(
+        left: list[list[int]], right: list[list[int]], modulus: int | None
+    ) -> list[list[int]]:
+        product: "NDArray[Any]" = np.matmul(
+            np.array(left, dtype=dtype), np.array(right, dtype=dtype)
+        )
+        if modulus is not None:
+            product %= modulus
+        return product.tolist()
+
+    return multiply
@@ -1,13 +1,53 @@
 import ast
-from collections.abc import Generator, Hashable, Iterable
-from typing import cast
+import os
+from array import array
+from collections.abc import (
+    Collection,
+    Generator,
+    Hashable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from concurrent.futures import Executor
+from contextlib import AbstractContextManager, nullcontext
+from functools import lru_cache
+from itertools import repeat
+from random import Random
+from time import perf_counter
+from types import ModuleType
+from typing import TYPE_CHECKING, Literal, Self, cast
 
+from automata.base.exceptions import InvalidStateError
 from automata.fa.dfa import DFA
 from frozendict import frozendict
 
 from mercury.decorators import DeltaFunction, OutputFunction
-from mercury.exceptions import MissingStateException, WrongArgumentException
-from mercury.types import InputState, InputSymbol, State
+from mercury.exceptions import (
+    MissingDependencyException,
+    MissingStateException,
+    UnsupportedAlphabetException,
+    WrongArgumentException,
+)
+from mercury.operations.sets import LazySet
+from mercury.profiling import AutomataStats, Coverage
+from mercury.types import InputBytes, InputState, InputSymbol, Registry, State
+
+from . import _backend, _canonical, _codegen, _dot
+from ._compiled_table import NO_CLASS, CompiledTable
+from ._counting import LanguageCounter
+from ._regex import RegexAutomaton
+from ._run import REJECTED
+from ._search_automaton import UNEXPLORED, SearchAutomaton
+from ._trace import RunLengthTrace
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+    from ._byte_monoid import ByteMonoid
+    from ._lockstep import LockstepTable
 
 type _InternalState = str
 """
@@ -23,6 +63,37 @@ Transition table used internally by the `automata-python`, receives a state and
 a separate mapping that receives input symbols and returns what state it turns into
 """
 
+LAZY_STATES_MIN_SIZE = 1 << 16
+"""
+Sets of states given as lazy views (see `mercury.operations.sets`) with at least this
+many states are explored from the initial state, keeping only the reachable states,
+instead of being materialized. Smaller sets keep every declared state
+"""
+
+REGEX_CACHE_SIZE = 128
+"""
+Amount of parsed regular expressions kept by `DeterministicFiniteAutomata.from_regex`
+"""
+
+BYTES_NUMPY_MAX_STATES = 16
+"""
+Without the compiled run loops, long byte inputs are run with NumPy (when available) if
+the automaton has fewer states than this, reducing the input through the transformation
+monoid of the automaton
+"""
+
+_BYTES_NUMPY_MIN_LENGTH = 1 << 12
+"""Below this length, the setup cost of NumPy outweighs stepping in pure Python"""
+
+_COVERAGE_FLUSH_SIZE = 1 << 16
+"""Amount of taken transitions buffered by `coverage` before counting them with NumPy"""
+
+ACCEPTS_MANY_CHUNK_SIZE = 1 << 10
+"""Inputs run at once by `accepts_many`, the unit of work handed out to executors"""
+
+_TRACE_CHUNK_SIZE = 1 << 16
+"""Symbols traced at once by `trace_runs` before compressing their states"""
+
 
 class DeterministicFiniteAutomata:
     """
@@ -32,6 +103,14 @@ class DeterministicFiniteAutomata:
     providing additional functionality and flexibility through the use of
     a transition function instead of raw transition tables.
 
+    Once built, an automaton can be shared by any amount of threads, also on
+    free-threaded builds of Python. Inputs are run over the compiled table, which is
+    never changed in place, without taking any lock. Structures built lazily on first
+    use are fully built before being stored, so threads racing to build one at most
+    build it twice. The exceptions are `rebuild`, which must not run while other threads
+    use the automaton, and the stats, whose counters may miss updates made by threads at
+    the same time.
+
     Attributes:
         automata: The underlying DFA instance.
         internal_states: A set containing string representations of internal states.
@@ -39,6 +118,9 @@ class DeterministicFiniteAutomata:
         initial_state: String representation of the initial state.
         final_states: Set of string representations of accepting states.
         transition_function: Transition function mapping current states to other states based on input symbols.
+        stats: Runtime counters of the automaton, only collected when built with
+            `collect_stats=True`.
+        compiled: Transition table of the automaton over integer state and symbol ids.
     """
 
     _automata: DFA
@@ -48,6 +130,23 @@ class DeterministicFiniteAutomata:
     _final_states: frozenset[_InternalState]
     _transitions: _InternalMappingStates
     _transition_function: DeltaFunction
+    _decoded_states: dict[_InternalState, State]
+    _stats: AutomataStats | None
+    _compiled: CompiledTable
+    _search_automaton: SearchAutomaton | None
+    _byte_offsets: list[int] | None
+    _byte_monoid: "ByteMonoid | Literal[False] | None"
+    _lockstep: "LockstepTable | None"
+    _counter: LanguageCounter | None
+    _distances: array[int] | None
+    _resolved: _InternalMappingStates
+    _resolved_by: dict[tuple[type, ...], list[_InternalState]]
+    _definitions: Registry
+    _declared_states: Collection[InputState] | None
+    _declared_final_states: Collection[InputState]
+    _pruned: bool
+    _generated: ModuleType | None
+    _canonical_hash: str | None
 
     def __init__(
         self,
@@ -56,67 +155,426 @@ class DeterministicFiniteAutomata:
         initial_state: InputState,
         final_states: Iterable[InputState],
         transition_function: DeltaFunction,
+        collect_stats: bool = False,
+        prune: bool = False,
     ) -> None:
         """
         Initialize the DFA with the specified states, input symbols, initial state,
         accepting states, and transition function.
 
         Args:
-            states: An iterable of all possible internal states (strings).
+            states: An iterable of all possible internal states (strings). Large lazy
+                sets such as `S(range(n)) * S(range(m))` only keep the reachable states,
+                see `LAZY_STATES_MIN_SIZE`.
             input_symbols: An iterable of allowed input symbols.
             initial_state: String representation of the initial state.
             final_states: An iterable containing string representations of accepting states.
             transition_function: A DeltaFunction mapping current states to other states based on input symbols.
+            collect_stats: Whether to record construction times and runtime counters,
+                also counting the calls to the transition function for this automaton
+                alone (see `DeltaFunction.with_stats`).
+            prune: Whether to drop the states that can't be reached from the initial
+                state, and to collapse the states that can't reach a final state into a
+                single sink where runs stop early, see `_prune`.
         """
-        self._states = frozenset(
-            {
-                self._to_internal_state(self._collapse_into_state(state))
-                for state in states
-            }
+        self._decoded_states = {}
+        self._stats = AutomataStats() if collect_stats else None
+        self._clear_caches()
+
+        if isinstance(transition_function, OutputFunction):
+            raise WrongArgumentException(DeltaFunction, OutputFunction)
+
+        if self._stats is not None:
+            transition_function = transition_function.with_stats()
+            self._stats.transition_function = transition_function.stats
+        self._transition_function = transition_function
+
+        # Large lazy sets of states are explored from the initial state instead
+        declared_states = (
+            states
+            if isinstance(states, LazySet) and len(states) >= LAZY_STATES_MIN_SIZE
+            else None
         )
-        self._input_symbols = frozenset(input_symbols)
-        self._initial_state = self._to_internal_state(
-            self._collapse_into_state(initial_state)
+
+        with self._phase("states"):
+            self._input_symbols = frozenset(input_symbols)
+            self._initial_state = self._to_internal_state(
+                self._collapse_into_state(initial_state)
+            )
+            self._declared_states = declared_states
+            self._declared_final_states = (
+                final_states
+                if isinstance(final_states, LazySet)
+                else frozenset(map(self._collapse_into_state, final_states))
+            )
+            if declared_states is None:
+                self._states = frozenset(
+                    {
+                        self._to_internal_state(self._collapse_into_state(state))
+                        for state in states
+                    }
+                )
+                self._final_states = self._internal_final_states()
+
+        self._pruned = prune
+        self._resolve({})
+
+    @classmethod
+    def _from_mappings(
+        cls,
+        states: Iterable[State],
+        input_symbols: Iterable[InputSymbol],
+        initial_state: State,
+        final_states: Iterable[State],
+        transitions: Mapping[State, Mapping[InputSymbol, State]],
+        transition_function: DeltaFunction,
+    ) -> Self:
+        """
+        Creates an automaton from transitions that were already resolved, without
+        calling the transition function for every pair of state and symbol. The
+        transition function is kept in order for the automaton to behave just like a
+        regular one
+        """
+        automata = cls.__new__(cls)
+        automata._decoded_states = {}
+        automata._stats = None
+        automata._clear_caches()
+        automata._transition_function = transition_function
+        automata._states = frozenset(
+            {automata._to_internal_state(state) for state in states}
         )
-        self._final_states = frozenset(
-            {
-                self._to_internal_state(self._collapse_into_state(state))
-                for state in final_states
+        automata._input_symbols = frozenset(input_symbols)
+        automata._initial_state = automata._to_internal_state(initial_state)
+        automata._final_states = frozenset(
+            {automata._to_internal_state(state) for state in final_states}
+        )
+        automata._transitions = {
+            automata._to_internal_state(state): {
+                symbol: automata._to_internal_state(next_state)
+                for symbol, next_state in symbol_mapping.items()
             }
+            for state, symbol_mapping in transitions.items()
+        }
+        automata._resolved = automata._transitions
+        automata._resolved_by = {}
+        for state in transitions:
+            automata._resolved_by.setdefault(
+                transition_function.signature(state), []
+            ).append(automata._to_internal_state(state))
+        automata._definitions = transition_function.definitions
+        automata._declared_states = None
+        automata._declared_final_states = frozenset(final_states)
+        automata._pruned = False
+        automata._build()
+        return automata
+
+    @staticmethod
+    def from_regex(
+        pattern: str, alphabet: Iterable[InputSymbol]
+    ) -> "DeterministicFiniteAutomata":
+        """
+        Compiles a regular expression into an automaton that accepts the inputs fully
+        matching it, through a Thompson NFA and the subset construction. States are
+        one-valued tuples with the NFA states they stand for, such as `((0, 2, 5),)`.
+
+        Supports literals, `.`, `|`, `(...)`, `*`, `+`, `?`, character classes (`[a-z]`,
+        `[^ab]`) and backslash escapes. The subset construction is cached by pattern
+        and alphabet, while every call returns a new automaton of its own, which can be
+        rebuilt or compiled without affecting the others.
+        """
+        return _compile_regex(pattern, frozenset(alphabet))
+
+    def rebuild(self) -> frozenset[State]:
+        """
+        Rebuilds the automaton after definitions of its transition function were added,
+        replaced or removed, only calling the transition function for the states handled
+        by those definitions (plus any state they newly lead to, for automata whose
+        states are explored). The transitions of every other state are reused as they
+        were. Returns the states whose transitions were resolved again. Not safe to call
+        while other threads use the automaton, and interned automata stop being interned
+        """
+        definitions = self._transition_function.definitions
+        changed = {
+            signature
+            for signature in self._definitions.keys() | definitions.keys()
+            if self._definitions.get(signature) is not definitions.get(signature)
+        }
+        stale = {
+            state
+            for signature in changed
+            for state in self._resolved_by.get(signature, ())
+        }
+        reusable = {
+            state: row for state, row in self._resolved.items() if state not in stale
+        }
+
+        if self._declared_states is None:
+            # Pruning may have dropped some of the declared states
+            self._states = frozenset(self._resolved)
+            self._final_states = self._internal_final_states()
+        if self._canonical_hash is not None:
+            _canonical.forget(self._canonical_hash, self)
+        self._clear_caches()
+        self._resolve(reusable)
+        return frozenset(
+            self._to_state(state) for state in self._resolved if state not in reusable
         )
 
-        if isinstance(transition_function, OutputFunction):
-            raise WrongArgumentException(DeltaFunction, OutputFunction)
+    def _internal_final_states(self) -> frozenset[_InternalState]:
+        """Internal states of the declared final states, which may be a lazy view"""
+        return frozenset(
+            self._to_internal_state(self._collapse_into_state(state))
+            for state in self._declared_final_states
+        )
 
-        self._transition_function = transition_function
-        self._transitions = self._generate_mappings()
+    def _resolve(self, reusable: _InternalMappingStates) -> None:
+        """
+        Resolves the transitions of every state, calling the transition function for all
+        but the states with rows in `reusable`, then builds the automaton out of them
+        """
+        self._definitions = self._transition_function.definitions
+        self._resolved_by = {}
+        with self._phase("mappings"):
+            if self._declared_states is not None:
+                self._resolved = self._explore_mappings(
+                    self._declared_states, self._declared_final_states, reusable
+                )
+            else:
+                self._resolved = self._generate_mappings(reusable)
+            self._transitions = self._resolved
+
+        if self._pruned:
+            with self._phase("prune"):
+                self._prune(self._compile())
+        self._build()
+
+    def canonical_hash(self) -> str:
+        """
+        Hash that identifies the behaviour of the automaton: automata accepting the same
+        inputs over the same alphabet get the same hash, whatever their states are. It
+        is computed from the minimal automaton, with its states numbered breadth first
+        from the initial state, and cached until the automaton is rebuilt
+        """
+        if self._canonical_hash is None:
+            self._canonical_hash = _canonical.canonical_digest(
+                type(self).__name__, self._compiled, *self._canonical_extras()
+            )
+        return self._canonical_hash
+
+    def intern(self) -> Self:
+        """
+        Returns the automaton interned for the canonical hash of this one, interning
+        this one if there is none yet, so that equivalent automata built across the
+        process can share a single instance (along with everything it builds lazily,
+        such as the search automaton or the generated run loops) and duplicates can be
+        dropped, as in `DeterministicFiniteAutomata(...).intern()`. The returned
+        automaton may name its states differently, and is only held weakly
+        """
+        return _canonical.intern(self.canonical_hash(), self)
+
+    def _canonical_extras(
+        self,
+    ) -> tuple[_canonical.StateLabel | None, Sequence[Hashable] | None]:
+        """
+        What tells apart states in the canonical form besides their transitions (whether
+        they accept by default), and the outputs of the transitions by output id
+        """
+        return None, None
+
+    def compile_to_python(self, path: str | None = None) -> ModuleType:
+        """
+        Generates a Python module specialized for this automaton, with its transition
+        table written out as constants and a run loop that does a single tuple lookup
+        per symbol, and returns it. Unless the compiled extension is in use,
+        `accepts_input`, `read_input` (and `transduce_input` for transducers) run
+        through it from then on, which makes them several times faster without building
+        any C code. With `path`, the module is also written there and imported, so its
+        bytecode gets cached. Rebuilding the automaton drops the module.
 
-        self._automata = DFA(
-            states=self._states,
-            input_symbols=self._input_symbols,
-            transitions=self._transitions,
-            initial_state=self._initial_state,
-            final_states=self._final_states,
-            allow_partial=True,
+        Raises:
+            UnsupportedAlphabetException: If some symbol is not a single character, or
+                there are more symbol classes than `MAX_GENERATED_CLASSES`.
+        """
+        self._generated = _codegen.load(
+            _codegen.generate_source(self._compiled, *self._generated_outputs()), path
         )
+        return self._generated
 
-    def _generate_mappings(self) -> _InternalMappingStates:
+    def _generated_outputs(
+        self,
+    ) -> tuple[tuple[str, ...] | tuple[bytes, ...] | None, str | bytes]:
+        """Outputs for the generated module to transduce, and their empty value"""
+        return None, ""
+
+    def _generated_loops(self) -> ModuleType | None:
+        """Module from `compile_to_python` when it should run inputs, None otherwise"""
+        return self._generated if _backend.BACKEND == "python" else None
+
+    def _clear_caches(self) -> None:
+        """Drops every structure derived from the transitions, built lazily on use"""
+        self._search_automaton = None
+        self._byte_offsets = None
+        self._byte_monoid = None  # False once known to be unavailable
+        self._lockstep = None
+        self._counter = None
+        self._distances = None
+        self._generated = None
+        self._canonical_hash = None
+
+    def _build(self) -> None:
         """
-        Iterates through possible paths and returns a mapping that can
-        be used by the automata library for general operations
+        Builds the underlying `automata-python` automaton and the compiled table
+        out of the internal mappings
+        """
+        with self._phase("automata"):
+            self._automata = DFA(
+                states=self._states,
+                input_symbols=self._input_symbols,
+                transitions=self._transitions,
+                initial_state=self._initial_state,
+                final_states=self._final_states,
+                allow_partial=True,
+            )
+
+        with self._phase("compile"):
+            self._compiled = self._compile()
+
+    def _compile(
+        self, outputs: Mapping[State, Mapping[InputSymbol, int]] | None = None
+    ) -> CompiledTable:
         """
+        Builds the compiled table of the automaton out of the internal mappings, along
+        with the output ids of each transition for transducers
+        """
+        return CompiledTable(
+            states=self.states,
+            symbols=self._input_symbols,
+            transitions={
+                self._to_state(internal_state): {
+                    symbol: self._to_state(internal_next_state)
+                    for symbol, internal_next_state in symbol_mapping.items()
+                }
+                for internal_state, symbol_mapping in self._transitions.items()
+            },
+            initial_state=self.initial_state,
+            final_states=self.final_states,
+            outputs=outputs,
+        )
+
+    def _prune(self, table: CompiledTable) -> None:
+        """
+        Keeps only the states reachable from the initial state, redirecting every
+        transition into a state that can't reach a final state into a single one of
+        them (the initial state if it is one). That state becomes a sink that only
+        leads to itself, so it doesn't change which inputs are accepted
+        """
+        reachable = table.reachable()
+        live = table.live()
+        dead = reachable - live
+        sink = (
+            table.initial_state if table.initial_state in dead else min(dead, default=0)
+        )
+
+        def to_internal(state: int) -> _InternalState:
+            return self._to_internal_state(table.states[state])
+
+        def redirect(state: int, next_state: int) -> _InternalState:
+            if dead and (next_state not in live or state == sink):
+                return to_internal(sink)
+            return to_internal(next_state)
+
+        kept = (reachable & live) | ({sink} if dead else set())
+        self._states = frozenset(map(to_internal, kept))
+        self._final_states = self._final_states & self._states
+        self._transitions = {
+            to_internal(state): {
+                symbol: redirect(state, table.transitions[state][class_id])
+                for symbol, class_id in table.class_ids.items()
+            }
+            for state in kept
+        }
+
+    def _explore_mappings(
+        self,
+        states: Collection[InputState],
+        final_states: Collection[InputState],
+        reusable: _InternalMappingStates,
+    ) -> _InternalMappingStates:
+        """
+        Builds the mappings of the states reachable from the initial state, checking
+        that each of them belongs to `states` without iterating through it. Sets the
+        states and final states of the automaton to the reachable ones. States with a
+        row in `reusable` take it instead of calling the transition function
+        """
+        initial_state = self.initial_state
+        if not _contains_state(states, initial_state):
+            raise InvalidStateError(f"{initial_state} is not a valid initial state")
+
         mappings: _InternalMappingStates = {}
-        for state in self.states:
-            mappings[self._to_internal_state(state)] = {}
+        final: set[_InternalState] = set()
+        seen = {initial_state}
+        queue = [initial_state]
+        for state in queue:  # Grows as new states are found
+            internal_state = self._to_internal_state(state)
+            self._resolved_by.setdefault(
+                self._transition_function.signature(state), []
+            ).append(internal_state)
+            if _contains_state(final_states, state):
+                final.add(internal_state)
+            row = reusable.get(internal_state)
+            if row is not None:
+                mappings[internal_state] = row
+                for internal_next_state in row.values():
+                    next_state = self._to_state(internal_next_state)
+                    if next_state not in seen:
+                        seen.add(next_state)
+                        queue.append(next_state)
+                continue
+
+            mappings[internal_state] = {}
             for symbol in self._input_symbols:
                 next_state = self._collapse_into_state(
                     self._transition_function(args=state, next_symbol=symbol)
                 )
-                if next_state not in self.states:
+                if not _contains_state(states, next_state):
                     raise MissingStateException(state, symbol, next_state)
-                mappings[self._to_internal_state(state)][symbol] = (
-                    self._to_internal_state(next_state)
+                if next_state not in seen:
+                    seen.add(next_state)
+                    queue.append(next_state)
+                mappings[internal_state][symbol] = self._to_internal_state(next_state)
+
+        self._states = frozenset(mappings)
+        self._final_states = frozenset(final)
+        return mappings
+
+    def _generate_mappings(
+        self, reusable: _InternalMappingStates
+    ) -> _InternalMappingStates:
+        """
+        Iterates through possible paths and returns a mapping that can
+        be used by the automata library for general operations. States with
+        a row in `reusable` take it instead of calling the transition function
+        """
+        mappings: _InternalMappingStates = {}
+        states = self.states
+        for state in states:
+            internal_state = self._to_internal_state(state)
+            self._resolved_by.setdefault(
+                self._transition_function.signature(state), []
+            ).append(internal_state)
+            row = reusable.get(internal_state)
+            if row is not None:
+                mappings[internal_state] = row
+                continue
+
+            mappings[internal_state] = {}
+            for symbol in self._input_symbols:
+                next_state = self._collapse_into_state(
+                    self._transition_function(args=state, next_symbol=symbol)
                 )
+                if next_state not in states:
+                    raise MissingStateException(state, symbol, next_state)
+                mappings[internal_state][symbol] = self._to_internal_state(next_state)
         return mappings
 
     @property
@@ -154,9 +612,317 @@ class DeterministicFiniteAutomata:
             {self._to_state(internal_state) for internal_state in self._final_states}
         )
 
+    @property
+    def compiled(self) -> CompiledTable:
+        """Transition table of the automaton over integer state and symbol ids"""
+        return self._compiled
+
+    @property
+    def symbol_classes(self) -> tuple[frozenset[InputSymbol], ...]:
+        """
+        Groups of input symbols that every state treats the same way, which share a
+        single column in the compiled table
+        """
+        return tuple(frozenset(symbols) for symbols in self._compiled.classes)
+
+    @property
+    def stats(self) -> AutomataStats | None:
+        """
+        Runtime counters of the automaton, None unless built with `collect_stats=True`
+        """
+        return self._stats
+
+    def reachable_states(self) -> frozenset[State]:
+        """States that can be reached from the initial state by reading some input"""
+        return frozenset(
+            map(self._compiled.states.__getitem__, self._compiled.reachable())
+        )
+
+    def live_states(self) -> frozenset[State]:
+        """States from which some input leads into a final state"""
+        return frozenset(map(self._compiled.states.__getitem__, self._compiled.live()))
+
+    def dead_states(self) -> frozenset[State]:
+        """States from which no input leads into a final state"""
+        return self.states - self.live_states()
+
+    def distance_to_acceptance(self, state: InputState) -> int | None:
+        """
+        Returns the least amount of symbols that lead from the given state into a final
+        state, or None if no input does (or the state is not part of the automaton).
+        Distances are computed for every state on the first call, see
+        `CompiledTable.distances`
+        """
+        state_id = self._compiled.state_ids.get(self._collapse_into_state(state))
+        if state_id is None:
+            return None
+        distance = self._get_distances()[state_id]
+        return None if distance == -1 else distance
+
+    def can_accept_within(self, state: InputState, remaining: int) -> bool:
+        """
+        Returns false if no input of at most `remaining` symbols leads from the given
+        state into a final state, in which case a run with that many symbols left can be
+        rejected without reading them
+        """
+        distance = self.distance_to_acceptance(state)
+        return distance is not None and distance <= remaining
+
+    def shortest_accepted(self) -> str | None:
+        """
+        Returns the shortest input accepted by the automaton (the first in lexicographic
+        order of its symbols among those of its length), or None if no input is accepted
+        """
+        return self._shortest_from(self._compiled.initial_state)
+
+    def shortest_accepted_from(self, state: InputState) -> str | None:
+        """
+        Returns the shortest input that leads from the given state into a final state,
+        like `shortest_accepted`, or None if there is no such input
+        """
+        state_id = self._compiled.state_ids.get(self._collapse_into_state(state))
+        return None if state_id is None else self._shortest_from(state_id)
+
+    def _shortest_from(self, state: int) -> str | None:
+        """Follows the first symbol that gets one step closer to acceptance each time"""
+        table = self._compiled
+        distances = self._get_distances()
+        if distances[state] == -1:
+            return None
+
+        steps = [(symbol, table.class_ids[symbol]) for symbol in table.symbols]
+        symbols: list[str] = []
+        while distances[state]:
+            for symbol, class_id in steps:
+                next_state = table.transitions[state][class_id]
+                if distances[next_state] == distances[state] - 1:
+                    symbols.append(symbol)
+                    state = next_state
+                    break
+        return "".join(symbols)
+
+    def _get_distances(self) -> array[int]:
+        if self._distances is None:
+            self._distances = self._compiled.distances()
+        return self._distances
+
     def accepts_input(self, input_str: str) -> bool:
         "Returns true if this automaton accepts the input string"
-        return self._automata.accepts_input(input_str)
+        if self._stats is None:
+            return self._accepts(input_str)
+
+        start = perf_counter()
+        try:
+            return self._accepts(input_str)
+        finally:
+            self._stats.execution_time += perf_counter() - start
+            self._stats.inputs_processed += 1
+            self._stats.symbols_processed += len(input_str)
+
+    def _accepts(self, input_str: str) -> bool:
+        # Inputs shorter than any accepted one are rejected without running them, once
+        # distances are known
+        if self._distances is not None and not (
+            0 <= self._distances[self._compiled.initial_state] <= len(input_str)
+        ):
+            return False
+        return self._run(input_str, sink=True) in self._compiled.final_states
+
+    def read_input(self, input_str: str) -> State | None:
+        """
+        Returns the state the automaton ends on after reading the whole input string,
+        or None if it reads a symbol outside of the alphabet
+        """
+        state = self._run(input_str)
+        return None if state == REJECTED else self._compiled.states[state]
+
+    def _run(self, input_str: str, state: int | None = None, sink: bool = False) -> int:
+        """
+        Runs the input through the compiled table with the run loops of the backend,
+        from the initial state unless given, returning the id of the state it ends on
+        or `REJECTED`. With `sink`, stops as soon as it reaches the sink state of the
+        table (if any), which then stands for any input that isn't accepted
+        """
+        table = self._compiled
+        if state is None:
+            state = table.initial_state
+        generated = self._generated_loops()
+        if generated is not None:
+            return generated.run(input_str, state)
+        sink_state = (
+            table.sink_state if sink and table.sink_state is not None else REJECTED
+        )
+        if table.num_classes and len(table.class_lookup):
+            return _backend.run(
+                table.class_lookup,
+                table.flat_transitions,
+                table.num_classes,
+                state,
+                input_str,
+                sink_state,
+            )
+
+        # Alphabets that can't be looked up by code point go through the class ids
+        transitions = table.transitions
+        for class_id in map(table.class_ids.get, input_str, repeat(NO_CLASS)):
+            if class_id == NO_CLASS:
+                return REJECTED
+            state = transitions[state][class_id]
+            if state == sink_state:
+                break
+        return state
+
+    def accepts_batch(self, inputs: Sequence[str]) -> "np.ndarray":
+        """
+        Runs a batch of inputs in lockstep with NumPy, returning a boolean array telling
+        whether each input is accepted. Pays off over `accepts_input` on many short
+        inputs, where per input overhead dominates, see `LockstepTable`
+        """
+        try:
+            from ._lockstep import LockstepTable
+        except ImportError:
+            raise MissingDependencyException("numpy", "numpy")
+
+        if self._lockstep is None:
+            self._lockstep = LockstepTable(self._compiled, self._run)
+        lockstep = self._lockstep
+
+        if self._stats is None:
+            return lockstep.accepting[lockstep.run(inputs)]
+
+        start = perf_counter()
+        try:
+            return lockstep.accepting[lockstep.run(inputs)]
+        finally:
+            self._stats.execution_time += perf_counter() - start
+            self._stats.inputs_processed += len(inputs)
+            self._stats.symbols_processed += sum(map(len, inputs))
+
+    def accepts_many(
+        self,
+        inputs: Sequence[str],
+        executor: Executor | None = None,
+        chunk_size: int = ACCEPTS_MANY_CHUNK_SIZE,
+    ) -> list[bool]:
+        """
+        Returns whether each input is accepted, running them in chunks of `chunk_size`
+        inputs. Chunks are spread over the threads of the executor when given (such as a
+        `ThreadPoolExecutor`), and the compiled run loops read each chunk without
+        holding the GIL, so the threads run in parallel
+        """
+        if self._stats is None:
+            return self._accepts_many(inputs, executor, chunk_size)
+
+        start = perf_counter()
+        try:
+            return self._accepts_many(inputs, executor, chunk_size)
+        finally:
+            self._stats.execution_time += perf_counter() - start
+            self._stats.inputs_processed += len(inputs)
+            self._stats.symbols_processed += sum(map(len, inputs))
+
+    def _accepts_many(
+        self, inputs: Sequence[str], executor: Executor | None, chunk_size: int
+    ) -> list[bool]:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        chunks = [
+            inputs[start : start + chunk_size]
+            for start in range(0, len(inputs), chunk_size)
+        ]
+        results = map(self._accepts_chunk, chunks)
+        if executor is not None:
+            results = executor.map(self._accepts_chunk, chunks)
+        return [accepted for chunk in results for accepted in chunk]
+
+    def _accepts_chunk(self, inputs: Sequence[str]) -> list[bool]:
+        table = self._compiled
+        if not (table.num_classes and len(table.class_lookup)):
+            return [self._accepts(input_str) for input_str in inputs]
+
+        states = array("i", [REJECTED]) * len(inputs)
+        _backend.run_many(
+            table.class_lookup,
+            table.flat_transitions,
+            table.num_classes,
+            table.initial_state,
+            inputs,
+            REJECTED if table.sink_state is None else table.sink_state,
+            states,
+        )
+        final_states = table.final_states
+        return [state in final_states for state in states]
+
+    def accepts_bytes(self, input_bytes: InputBytes) -> bool:
+        """
+        Returns true if this automaton accepts the binary input, reading each byte as
+        the symbol `chr(byte)`. Works for alphabets of single characters, see
+        `BYTE_ALPHABET`
+        """
+        table = self._compiled
+        if _backend.BACKEND == "c" and table.num_classes:
+            if len(table.class_lookup) == 0:
+                raise UnsupportedAlphabetException(
+                    "byte",
+                    "every input symbol must be a single character below U+10000",
+                )
+            state = _backend.run(
+                table.class_lookup,
+                table.flat_transitions,
+                table.num_classes,
+                table.initial_state,
+                input_bytes,
+                REJECTED if table.sink_state is None else table.sink_state,
+            )
+            return state in table.final_states
+
+        monoid = (
+            self._get_byte_monoid()
+            if table.num_states < BYTES_NUMPY_MAX_STATES
+            and len(input_bytes) >= _BYTES_NUMPY_MIN_LENGTH
+            else None
+        )
+        if monoid is not None:
+            state = monoid.run(input_bytes, table.initial_state)
+        else:
+            state = self._run_bytes(self._get_byte_offsets(), input_bytes)
+        return state in table.final_states
+
+    def _get_byte_offsets(self) -> list[int]:
+        """
+        Byte table of the compiled automaton, holding `next_state * 256` instead of the
+        next state so that the run loop only needs one addition per byte
+        """
+        if self._byte_offsets is None:
+            self._byte_offsets = [
+                next_state << 8 for next_state in self._compiled.to_byte_table()
+            ]
+        return self._byte_offsets
+
+    def _run_bytes(self, offsets: list[int], input_bytes: InputBytes) -> int:
+        offset = self._compiled.initial_state << 8
+        for byte in memoryview(input_bytes).cast("B"):
+            offset = offsets[offset + byte]
+        return offset >> 8
+
+    def _get_byte_monoid(self) -> "ByteMonoid | None":
+        """
+        Transformation monoid used to run long binary inputs with NumPy, None if NumPy
+        is not installed or if the automaton produces too many distinct transformations
+        """
+        if self._byte_monoid is None:
+            try:
+                from ._byte_monoid import ByteMonoid
+            except ImportError:
+                self._byte_monoid = False
+                return None
+            self._byte_monoid = (
+                ByteMonoid.from_byte_table(
+                    self._compiled.to_byte_table(), self._compiled.num_states + 1
+                )
+                or False
+            )
+        return self._byte_monoid or None
 
     def read_input_stepwise(self, input_str: str) -> Generator[State, None, None]:
         "Returns a generator that yields each step while reading from the input string"
@@ -169,33 +935,414 @@ class DeterministicFiniteAutomata:
             for next_internal_state in internal_state_generator:
                 yield self._to_state(next_internal_state)
 
-        return generator()
+        if self._stats is None:
+            return generator()
+
+        stats = self._stats
+        stats.inputs_processed += 1
+
+        def instrumented_generator():
+            start = perf_counter()
+            for step, next_internal_state in enumerate(internal_state_generator):
+                stats.execution_time += perf_counter() - start
+                # The first state yielded is the initial one, before reading symbols
+                if step:
+                    stats.symbols_processed += 1
+                yield self._to_state(next_internal_state)
+                start = perf_counter()
+            stats.execution_time += perf_counter() - start
+
+        return instrumented_generator()
+
+    def trace(self, input_str: str) -> "NDArray[np.int32]":
+        """
+        Returns the id of every state the automaton goes through while reading the input
+        (starting with the initial state) as a NumPy int32 array, without decoding any
+        of them. Ids index `compiled.states`. The trace stops at the first symbol
+        outside of the alphabet, being shorter than the input plus one
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise MissingDependencyException("numpy", "numpy")
+
+        return np.frombuffer(self.trace_ids(input_str), dtype=np.int32)
+
+    def trace_runs(self, input_str: str) -> RunLengthTrace:
+        """
+        Returns the trace of the input (see `trace`) compressed into runs of the same
+        state. The input is traced one chunk at a time, so the full trace is never held
+        in memory at once
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise MissingDependencyException("numpy", "numpy")
+
+        begin = perf_counter()
+        table = self._compiled
+        buffer = array("i", [0]) * (_TRACE_CHUNK_SIZE + 1)
+        state_ids = [np.array([table.initial_state], dtype=np.int32)]
+        lengths = [np.ones(1, dtype=np.int64)]
+        state = table.initial_state
+        for start in range(0, len(input_str), _TRACE_CHUNK_SIZE):
+            chunk = input_str[start : start + _TRACE_CHUNK_SIZE]
+            steps = np.frombuffer(buffer, dtype=np.int32)[
+                1 : self._trace(chunk, state, buffer)
+            ]
+            if len(steps) == 0:
+                break
+            run_starts = np.flatnonzero(np.r_[True, steps[1:] != steps[:-1]])
+            state_ids.append(steps[run_starts])
+            lengths.append(np.diff(np.r_[run_starts, len(steps)]))
+            state = int(steps[-1])
+            if len(steps) < len(chunk):
+                break
+
+        # Runs may continue across chunks, which are merged back together
+        all_state_ids = np.concatenate(state_ids)
+        all_lengths = np.concatenate(lengths)
+        if self._stats is not None:
+            self._stats.execution_time += perf_counter() - begin
+            self._stats.inputs_processed += 1
+            self._stats.symbols_processed += int(all_lengths.sum()) - 1
+        run_starts = np.flatnonzero(
+            np.r_[True, all_state_ids[1:] != all_state_ids[:-1]]
+        )
+        return RunLengthTrace(
+            table.states,
+            all_state_ids[run_starts],
+            np.add.reduceat(all_lengths, run_starts),
+        )
+
+    def trace_ids(self, input_str: str) -> array[int]:
+        """
+        Returns the ids of every state the input goes through just like `trace`, as an
+        int array from the standard library instead, which doesn't require NumPy
+        """
+        start = perf_counter()
+        out = array("i", [0]) * (len(input_str) + 1)
+        del out[self._trace(input_str, self._compiled.initial_state, out) :]
+        if self._stats is not None:
+            self._stats.execution_time += perf_counter() - start
+            self._stats.inputs_processed += 1
+            self._stats.symbols_processed += len(out) - 1
+        return out
+
+    def _trace(self, input_str: str, state: int, out: array[int]) -> int:
+        """
+        Runs the input from the given state with the run loops of the backend, writing
+        every state it goes through into `out`. Returns the amount of states written
+        """
+        table = self._compiled
+        if table.num_classes and len(table.class_lookup):
+            return _backend.trace(
+                table.class_lookup,
+                table.flat_transitions,
+                table.num_classes,
+                state,
+                input_str,
+                out,
+            )
+
+        # Alphabets that can't be looked up by code point go through the class ids
+        transitions = table.transitions
+        out[0] = state
+        written = 1
+        for class_id in map(table.class_ids.get, input_str, repeat(NO_CLASS)):
+            if class_id == NO_CLASS:
+                break
+            state = transitions[state][class_id]
+            out[written] = state
+            written += 1
+        return written
+
+    def count_accepted(self, length: int, modulus: int | None = None) -> int:
+        """
+        Returns the amount of inputs of the given length accepted by the automaton, as
+        an exact integer or modulo `modulus` (for lengths where exact counts get too
+        large). Computed with dynamic programming over the compiled table instead of
+        running every input, see `LanguageCounter`
+        """
+        return self._get_counter().count(length, modulus)
+
+    def iter_accepted(self, max_length: int) -> Iterator[str]:
+        """
+        Yields every input of up to `max_length` symbols accepted by the automaton,
+        shortest first and in lexicographic order of their symbols within each length.
+        Branches that can't lead to an accepted input are never explored
+        """
+        return self._get_counter().accepted(max_length)
+
+    def sample_accepted(
+        self, length: int, k: int = 1, rng: Random | None = None
+    ) -> list[str]:
+        """
+        Returns `k` inputs of the given length accepted by the automaton, each drawn
+        uniformly at random among all of them (unlike rejection sampling, this works as
+        well for languages where almost no input is accepted). The amount of accepted
+        inputs from each state is computed once per length, after which every input
+        takes a single pass, and batches are drawn with NumPy when it is installed.
+
+        Args:
+            length: Length of the inputs.
+            k: Amount of inputs to draw.
+            rng: Source of randomness, for reproducible samples.
+
+        Raises:
+            ValueError: If no input of this length is accepted.
+        """
+        return self._get_counter().sample(
+            length, k, rng if rng is not None else Random()
+        )
+
+    def _get_counter(self) -> LanguageCounter:
+        if self._counter is None:
+            self._counter = LanguageCounter(self._compiled)
+        return self._counter
+
+    def coverage(self, inputs: Iterable[str]) -> Coverage:
+        """
+        Runs every input of the batch through the automaton, counting the visits to each
+        state and transition. Counts are NumPy arrays aligned with the ids of the
+        compiled table, and can be mapped back to states through the returned Coverage.
+        An input stops being counted once it reads a symbol outside of the alphabet
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise MissingDependencyException("numpy", "numpy")
+
+        table = self._compiled
+        transitions = table.transitions
+        symbol_ids = table.symbol_ids
+        symbol_classes = table.symbol_classes
+        num_symbols = table.num_symbols
+        transition_visits = np.zeros(table.num_states * num_symbols, dtype=np.int64)
+
+        # The hot loop only appends the flat index of each taken transition, counting
+        # is left to NumPy every once in a while
+        taken: list[int] = []
+        runs = 0
+        for input_str in inputs:
+            runs += 1
+            state = table.initial_state
+            for symbol in input_str:
+                symbol_id = symbol_ids.get(symbol)
+                if symbol_id is None:
+                    break
+                taken.append(state * num_symbols + symbol_id)
+                state = transitions[state][symbol_classes[symbol_id]]
+            if len(taken) >= _COVERAGE_FLUSH_SIZE:
+                transition_visits += np.bincount(
+                    taken, minlength=transition_visits.size
+                )
+                taken.clear()
+        if taken:
+            transition_visits += np.bincount(taken, minlength=transition_visits.size)
+
+        # Every visit to a state comes from a transition into it, or from starting a run
+        state_visits = np.zeros(table.num_states, dtype=np.int64)
+        targets = np.array(transitions, dtype=np.intp).reshape(table.num_states, -1)
+        np.add.at(
+            state_visits, targets[:, list(symbol_classes)].ravel(), transition_visits
+        )
+        state_visits[table.initial_state] += runs
+
+        return Coverage(
+            table.states,
+            table.symbols,
+            state_visits,
+            transition_visits.reshape(table.num_states, num_symbols),
+        )
+
+    def finditer(self, text: str, anchored: bool = False) -> Iterator[int]:
+        """
+        Returns an iterator over every offset of the text where a match ends, see `scan`
+        """
+        return self.scan([text], anchored)
+
+    def scan(
+        self, stream: Iterable[str | InputBytes], anchored: bool = False
+    ) -> Iterator[int]:
+        """
+        Reads a stream of text chunks in one linear pass, yielding every offset (counted
+        in symbols from the start of the stream) where the automaton is in a final
+        state. Chunks may also be binary, reading each byte as the symbol `chr(byte)`.
+
+        By default an offset is reported when any substring ending there is accepted, as
+        if the automaton was restarted at each position, which is done through a search
+        automaton built lazily and cached for later scans. With `anchored`, matches must
+        start at the beginning of the stream, and scanning stops at the first symbol
+        outside of the alphabet. Unanchored scans restart after such symbols instead.
+        """
+        table = self._compiled
+        transitions = table.transitions
+        offset = 0
+
+        if anchored:
+            final_states = table.final_states
+            state = table.initial_state
+            if state in final_states:
+                yield offset
+            for chunk in stream:
+                for class_id in self._to_classes(chunk):
+                    offset += 1
+                    if class_id == NO_CLASS:
+                        return
+                    state = transitions[state][class_id]
+                    if state in final_states:
+                        yield offset
+            return
+
+        if self._search_automaton is None:
+            self._search_automaton = SearchAutomaton(table)
+        search = self._search_automaton
+        rows = search.rows
+        accepting = search.accepting
+        state = search.initial_state
+        if accepting[state]:
+            yield offset
+        for chunk in stream:
+            for class_id in self._to_classes(chunk):
+                offset += 1
+                if class_id == NO_CLASS:
+                    state = search.initial_state
+                else:
+                    next_state = rows[state][class_id]
+                    if next_state == UNEXPLORED:
+                        next_state = search.expand(state, class_id)
+                    state = next_state
+                if accepting[state]:
+                    yield offset
+
+    def _to_classes(self, chunk: str | InputBytes) -> Iterator[int]:
+        """
+        Maps a chunk of input into symbol class ids, `NO_CLASS` for unknown symbols
+        """
+        table = self._compiled
+        if isinstance(chunk, str):
+            return map(table.class_ids.get, chunk, repeat(NO_CLASS))
+        if len(table.class_lookup) == 0:
+            raise UnsupportedAlphabetException(
+                "byte", "every input symbol must be a single character below U+10000"
+            )
+        return map(table.class_lookup.__getitem__, memoryview(chunk).cast("B"))
+
+    def next_state(self, state: InputState, symbol: InputSymbol) -> State | None:
+        """
+        Returns the state the automaton moves into after reading a single symbol from
+        the given state, or None if there is no such transition (i.e. the symbol is not
+        part of the alphabet)
+        """
+        internal_mapping = self._transitions.get(
+            self._to_internal_state(self._collapse_into_state(state))
+        )
+        if internal_mapping is None or symbol not in internal_mapping:
+            return None
+        return self._to_state(internal_mapping[symbol])
 
     def show_diagram(self, path: str) -> None:
         """
-        Shows a diagram for the generated automaton using the UI libraries.
-        Please make sure that you have installed either the package with all
-        the dependencies or at least the graphical ones (mercury-lib[all] or mercury-lib[graphical])
+        Shows a diagram for the generated automaton using the UI libraries. Please make
+        sure that you have installed either the package with all the dependencies or at
+        least the graphical ones (mercury-lib[all] or mercury-lib[graphical]). For large
+        automata, prefer `export_diagram`
         """
         _ = self._automata.show_diagram().draw(  # pyright: ignore[reportUnknownMemberType]
             path
         )
 
+    def iter_dot(
+        self,
+        max_states: int | None = None,
+        around: InputState | None = None,
+        radius: int | None = None,
+    ) -> Iterator[str]:
+        """
+        Yields the lines of a DOT diagram of the automaton, generated straight from the
+        compiled table so that it can be written out as it goes. Transitions between the
+        same states are merged into one edge labelled with ranges of symbols, like
+        `a-z`.
+
+        Args:
+            max_states: Most states to draw, the rest are shown as a single placeholder.
+            around: State to draw the surroundings of, following transitions both ways,
+                instead of starting from the initial state.
+            radius: Most transitions away from the starting state to draw.
+        """
+        table = self._compiled
+        return _dot.iter_dot(
+            table,
+            _dot.select_states(table, max_states, self._dot_start(around), radius),
+        )
+
+    def export_diagram(
+        self,
+        path: str,
+        max_states: int | None = None,
+        around: InputState | None = None,
+        radius: int | None = None,
+    ) -> None:
+        """
+        Writes a diagram of the automaton like `iter_dot`, as DOT text if the path ends
+        with `.dot` or `.gv`, and otherwise rendered by Graphviz into the format of its
+        extension (such as `.svg`), which requires the `dot` program. Unlike
+        `show_diagram` it doesn't go through pygraphviz, and rendered diagrams are
+        cached by the hash of the automaton
+        """
+        extension = os.path.splitext(path)[1].lstrip(".").lower()
+        output_format = "dot" if extension in ("dot", "gv") else extension
+        rendered = _dot.render(
+            self._compiled, output_format, max_states, self._dot_start(around), radius
+        )
+        with open(path, "wb") as file:
+            _ = file.write(rendered)
+
+    def _dot_start(self, around: InputState | None) -> int | None:
+        if around is None:
+            return None
+        state_id = self._compiled.state_ids.get(self._collapse_into_state(around))
+        if state_id is None:
+            raise ValueError(f"{around} is not a state of the automaton")
+        return state_id
+
     def _to_internal_state(self, state: State) -> _InternalState:
         """
         Converts from regular state (tuples) into a state that can
-        be handled by the underlying library (strings)
+        be handled by the underlying library (strings). The state is kept
+        as the decoded one, so it never goes through `literal_eval`
         """
-        return repr(state)
+        internal_state = repr(state)
+        _ = self._decoded_states.setdefault(internal_state, state)
+        return internal_state
 
     def _to_state(self, internal_state: _InternalState) -> State:
         """
         Converts from internal states (strings) into a state that can
-        be manipulated by general python users (tuples)
+        be manipulated by general python users (tuples). Decoded states
+        are cached, as `literal_eval` is expensive to call on every step
         """
-        return cast(State, ast.literal_eval(internal_state))
+        state = self._decoded_states.get(internal_state)
+        if state is not None:
+            if self._stats is not None:
+                self._stats.decode_hits += 1
+            return state
+
+        start = perf_counter()
+        state = cast(State, ast.literal_eval(internal_state))
+        self._decoded_states[internal_state] = state
+        if self._stats is not None:
+            self._stats.decode_misses += 1
+            self._stats.decode_time += perf_counter() - start
+        return state
 
-    def _collapse_into_state(self, input_state: InputState) -> State:
+    def _phase(self, name: str) -> AbstractContextManager[None]:
+        """Times a construction phase when stats are being collected"""
+        return nullcontext() if self._stats is None else self._stats.phase(name)
+
+    @staticmethod
+    def _collapse_into_state(input_state: InputState) -> State:
         """
         Converts from user input states (tuples OR strings) into
         general usable states (tuples)
@@ -209,3 +1356,36 @@ class DeterministicFiniteAutomata:
             )
             else (input_state,)
         )
+
+
+def _contains_state(states: Collection[InputState], state: State) -> bool:
+    """Whether the collection holds the state, either collapsed or as it was declared"""
+    return state in states or (len(state) == 1 and state[0] in states)
+
+
+@lru_cache(maxsize=REGEX_CACHE_SIZE)
+def _parse_regex(pattern: str, alphabet: frozenset[InputSymbol]) -> RegexAutomaton:
+    """Subset construction of the pattern, cached as it is never modified"""
+    return RegexAutomaton(pattern, alphabet)
+
+
+def _compile_regex(
+    pattern: str, alphabet: frozenset[InputSymbol]
+) -> DeterministicFiniteAutomata:
+    regex = _parse_regex(pattern, alphabet)
+    transitions = regex.transitions
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(nfa_states: tuple, next: str):  # pyright: ignore[reportMissingTypeArgument]
+        return transitions[(nfa_states,)][next]
+
+    return DeterministicFiniteAutomata._from_mappings(
+        regex.states,
+        alphabet,
+        regex.initial_state,
+        regex.final_states,
+        transitions,
+        delta,
+    )
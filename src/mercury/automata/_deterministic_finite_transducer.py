@@ -1,14 +1,24 @@
-from collections.abc import Generator, Iterable
+from collections.abc import Generator, Hashable, Iterable, Sequence
 from itertools import zip_longest
+from typing import cast, override
 
 from mercury.decorators import DeltaFunction, OutputFunction
-from mercury.exceptions import InvalidOutputException
-from mercury.types import InputState, InputSymbol
+from mercury.exceptions import (
+    InvalidOutputException,
+    InvalidReturnTypeException,
+    UnsupportedAlphabetException,
+)
+from mercury.types import InputState, InputSymbol, State
 
-from ._deterministic_finite_automata import DeterministicFiniteAutomata
+from . import _canonical
+from ._compiled_table import NO_CLASS
+from ._transducer import Transducer
 
+type _PairState = tuple[tuple[Hashable, ...], tuple[Hashable, ...]]
+"""State of a composition, with a state of each of the composed transducers"""
 
-class DeterministicFiniteTransducer(DeterministicFiniteAutomata):
+
+class DeterministicFiniteTransducer(Transducer):
     """
     A deterministic finite transducer (DFT) modeled as a Mealy machine.
 
@@ -16,6 +26,10 @@ class DeterministicFiniteTransducer(DeterministicFiniteAutomata):
     with an output symbol. It is defined using a transition function for state
     changes and an output function for determining outputs.
 
+    Outputs are resolved once while building the transducer and stored in the compiled
+    table next to the transitions, so transducing doesn't call the output function on
+    every step (except when collecting stats, in order to count its calls).
+
     Attributes:
         automata: The underlying DFA base instance.
         internal_states: A set containing string representations of internal states.
@@ -28,7 +42,7 @@ class DeterministicFiniteTransducer(DeterministicFiniteAutomata):
     """
 
     _output_symbols: frozenset[str]
-    _output_function: OutputFunction
+    _final_outputs: dict[int, str]
 
     def __init__(
         self,
@@ -39,6 +53,7 @@ class DeterministicFiniteTransducer(DeterministicFiniteAutomata):
         final_states: Iterable[InputState],
         transition_function: DeltaFunction,
         output_function: OutputFunction,
+        collect_stats: bool = False,
     ) -> None:
         """
         Initialize the DFT (Mealy machine) with the specified states, input/output symbols,
@@ -52,20 +67,60 @@ class DeterministicFiniteTransducer(DeterministicFiniteAutomata):
             final_states: An iterable containing string representations of accepting states.
             transition_function: A DeltaFunction mapping current states and input symbols to next states.
             output_function: An OutputFunction mapping states to output symbols.
+            collect_stats: Whether to record construction times and runtime counters,
+                also counting the calls to the transition and output functions for this
+                automaton alone (see `DeltaFunction.with_stats`).
         """
+        # Outputs are resolved while building the automaton, see `_build`
+        self._output_symbols = frozenset(output_symbols)
+
         super().__init__(
-            states, input_symbols, initial_state, final_states, transition_function
+            states,
+            input_symbols,
+            initial_state,
+            final_states,
+            transition_function,
+            output_function,
+            collect_stats,
         )
-        self._output_symbols = frozenset(output_symbols)
-        self._output_function = output_function
 
-        for state in self.states:
-            for symbol in self._input_symbols:
-                output_symbol = self._output_function(args=state, next_symbol=symbol)
-                if output_symbol not in self._output_symbols:
-                    raise InvalidOutputException(
-                        state, symbol, list(self._output_symbols), output_symbol
-                    )
+    @override
+    def _clear_caches(self) -> None:
+        super()._clear_caches()
+        self._final_outputs = {}
+
+    @override
+    def _transition_output(self, state: State, symbol: InputSymbol) -> str:
+        output_symbol = self._output(state, symbol)
+        if output_symbol not in self._output_symbols:
+            raise InvalidOutputException(
+                state, symbol, list(self._output_symbols), output_symbol
+            )
+        return output_symbol
+
+    def _output(self, state: State, symbol: InputSymbol | None) -> str:
+        """
+        Calls the output function, which may return bytes for a `MealyTransducer` but
+        must return strings for this transducer
+        """
+        output_symbol = self._output_function(
+            args=state, next_symbol=symbol  # pyright: ignore[reportArgumentType]
+        )
+        if not isinstance(output_symbol, str):
+            raise InvalidReturnTypeException(
+                "OutputFunction", str, type(output_symbol), output_symbol
+            )
+        return output_symbol
+
+    @override
+    def _canonical_extras(
+        self,
+    ) -> tuple[_canonical.StateLabel | None, Sequence[Hashable] | None]:
+        final_states = self._compiled.final_states
+        return (
+            lambda state: (state in final_states, self._final_output(state)),
+            self._tape.outputs,
+        )
 
     def read_input_transducer_stepwise(
         self, input_str: str
@@ -76,7 +131,7 @@ class DeterministicFiniteTransducer(DeterministicFiniteAutomata):
 
         def generator():
             for next_state, next_symbol in zip_longest(state_generator, input_str):
-                yield self._output_function(args=next_state, next_symbol=next_symbol)
+                yield self._output(next_state, next_symbol)
 
         return generator()
 
@@ -84,7 +139,155 @@ class DeterministicFiniteTransducer(DeterministicFiniteAutomata):
         """
         Returns the result from the automata after transducing from the input string
         """
-        tape = ""
-        for output_symbol in self.read_input_transducer_stepwise(input_str):
-            tape += output_symbol
-        return tape
+        if self._stats is not None:
+            return "".join(self.read_input_transducer_stepwise(input_str))
+
+        return self._transduce_many([input_str])[0]
+
+    def transduce_many(self, inputs: Iterable[str]) -> list[str]:
+        """
+        Transduces every input like `transduce_input`, copying the outputs of all of
+        them through a single buffer instead of allocating one per input
+        """
+        if self._stats is not None:
+            return [self.transduce_input(input_str) for input_str in inputs]
+        return self._transduce_many(inputs)
+
+    def _transduce_many(self, inputs: Iterable[str]) -> list[str]:
+        results: list[str] = []
+        for parts, state in self._tape.transduce_many(
+            self._compiled, inputs, self._generated_loops()
+        ):
+            tape = cast(list[str], parts)
+            tape.append(self._final_output(state))
+            results.append("".join(tape))
+        return results
+
+    def _final_output(self, state: int) -> str:
+        """
+        Output of the state a transduction ends on, where no symbol is left to read.
+        Resolved on first use, as the output function is called without a symbol
+        """
+        output_symbol = self._final_outputs.get(state)
+        if output_symbol is None:
+            output_symbol = self._output(self._compiled.states[state], None)
+            self._final_outputs[state] = output_symbol
+        return output_symbol
+
+    def __rshift__(
+        self, other: "DeterministicFiniteTransducer"
+    ) -> "DeterministicFiniteTransducer":
+        """
+        Composes both transducers into a single one that feeds the outputs of this one
+        into `other` as it reads, so that `(a >> b).transduce_input(input_str)` returns
+        `b.transduce_input(a.transduce_input(input_str))` in one pass.
+
+        States of the composition are pairs with a state of each transducer, built from
+        the pair of initial states on. It accepts the inputs accepted by this transducer
+        whose output is accepted by `other`. Outputs are read by `other` a character at
+        a time, so every output of this transducer that can be reached must be made of
+        input symbols of `other`, otherwise raises InvalidOutputException.
+
+        Raises:
+            UnsupportedAlphabetException: If some input symbol of `other` is not a
+                single character.
+        """
+        if any(len(symbol) != 1 for symbol in other._input_symbols):
+            raise UnsupportedAlphabetException(
+                "composition",
+                "every input symbol of the second transducer must be a single "
+                "character",
+            )
+        left, right = self._compiled, other._compiled
+        # Outputs of both transducers are strings, checked while resolving them
+        left_outputs = cast(tuple[str, ...], self._tape.outputs)
+        right_outputs = cast(tuple[str, ...], other._tape.outputs)
+        valid_outputs = sorted(right.symbols)
+
+        def feed(
+            left_state: int, symbol: InputSymbol | None, right_state: int, tape: str
+        ):
+            """
+            Reads a piece of the tape with `other`, returning its state and outputs
+            """
+            written: list[str] = []
+            for output_symbol in tape:
+                class_id = right.class_ids.get(output_symbol, NO_CLASS)
+                if class_id == NO_CLASS:
+                    raise InvalidOutputException(
+                        left.states[left_state],
+                        symbol,  # pyright: ignore[reportArgumentType]
+                        valid_outputs,
+                        tape,
+                    )
+                written.append(right_outputs[right.outputs[right_state][class_id]])
+                right_state = right.transitions[right_state][class_id]
+            return right_state, "".join(written)
+
+        # Explores the pairs reachable from the initial one, keeping the next pair and
+        # output of each pair and symbol class of this transducer
+        initial = (left.initial_state, right.initial_state)
+        pairs = [initial]
+        seen = {initial}
+        rows: dict[tuple[int, int], list[tuple[tuple[int, int], str]]] = {}
+        final_outputs: dict[tuple[int, int], str] = {}
+        final_pairs: list[tuple[int, int]] = []
+        for pair in pairs:  # Grows as new pairs are found
+            left_state, right_state = pair
+            rows[pair] = []
+            for class_id, symbols in enumerate(left.classes):
+                next_right_state, output = feed(
+                    left_state,
+                    symbols[0],
+                    right_state,
+                    left_outputs[left.outputs[left_state][class_id]],
+                )
+                next_pair = (left.transitions[left_state][class_id], next_right_state)
+                if next_pair not in seen:
+                    seen.add(next_pair)
+                    pairs.append(next_pair)
+                rows[pair].append((next_pair, output))
+
+            # The final output of this transducer is read by `other` before its own
+            end_state, output = feed(
+                left_state, None, right_state, self._final_output(left_state)
+            )
+            final_outputs[pair] = output + other._final_output(end_state)
+            if left_state in left.final_states and end_state in right.final_states:
+                final_pairs.append(pair)
+
+        def to_state(pair: tuple[int, int]) -> _PairState:
+            return (left.states[pair[0]], right.states[pair[1]])
+
+        transitions: dict[_PairState, dict[InputSymbol, _PairState]] = {}
+        outputs: dict[_PairState, dict[InputSymbol | None, str]] = {}
+        for pair, row in rows.items():
+            state = to_state(pair)
+            transitions[state] = {}
+            outputs[state] = {None: final_outputs[pair]}
+            for (next_pair, output), symbols in zip(row, left.classes):
+                for symbol in symbols:
+                    transitions[state][symbol] = to_state(next_pair)
+                    outputs[state][symbol] = output
+
+        delta = DeltaFunction()
+        output_fn = OutputFunction()
+
+        @delta.definition()
+        def _(left_state: tuple, right_state: tuple, next: str):
+            return transitions[(left_state, right_state)][next]
+
+        @output_fn.definition()
+        def _(left_state: tuple, right_state: tuple, next: str):
+            return outputs[(left_state, right_state)][next]
+
+        return DeterministicFiniteTransducer(
+            transitions,
+            self._input_symbols,
+            other._output_symbols
+            | {output for row in rows.values() for _, output in row},
+            to_state(initial),
+            map(to_state, final_pairs),
+            delta,
+            output_fn,
+        )
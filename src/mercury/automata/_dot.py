@@ -0,0 +1,165 @@
+import shutil
+import subprocess
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterator
+from hashlib import sha256
+from threading import Lock
+
+from mercury.exceptions import MissingDependencyException
+
+from ._compiled_table import CompiledTable
+
+DIAGRAM_CACHE_SIZE = 32
+"""Amount of rendered diagrams kept by `render`, by automaton and options"""
+
+_OMITTED = "__omitted"
+"""Node that stands for every state left out of the diagram"""
+
+_rendered: OrderedDict[tuple[object, ...], bytes] = OrderedDict()
+_rendered_lock = Lock()
+
+
+def table_digest(table: CompiledTable) -> str:
+    """Hash of everything a diagram shows about the table, identifying its automaton"""
+    digest = sha256()
+    digest.update(repr((table.states, table.symbols)).encode())
+    digest.update(array("i", table.symbol_classes).tobytes())
+    digest.update(table.flat_transitions.tobytes())
+    digest.update(repr((table.initial_state, sorted(table.final_states))).encode())
+    return digest.hexdigest()
+
+
+def select_states(
+    table: CompiledTable,
+    max_states: int | None = None,
+    around: int | None = None,
+    radius: int | None = None,
+) -> list[int]:
+    """
+    Ids of the states to draw, in breadth first order. Starts from `around` following
+    transitions both ways, or from the initial state following them forwards (and then
+    takes the unreachable states, unless limited by `radius`). Stops at `radius` steps
+    away from the start, and after `max_states` states
+    """
+    start = table.initial_state if around is None else around
+    neighbours: list[list[int]] = [list(row) for row in table.transitions]
+    if around is not None:
+        for state, row in enumerate(table.transitions):
+            for next_state in row:
+                neighbours[next_state].append(state)
+
+    limit = table.num_states if max_states is None else max_states
+    depth = {start: 0}
+    queue = [start]
+    for state in queue:  # Grows as new states are found
+        if len(queue) >= limit:
+            break
+        if radius is not None and depth[state] >= radius:
+            continue
+        for next_state in neighbours[state]:
+            if next_state not in depth:
+                depth[next_state] = depth[state] + 1
+                queue.append(next_state)
+
+    if around is None and radius is None:
+        queue.extend(state for state in range(table.num_states) if state not in depth)
+    return queue[:limit]
+
+
+def iter_dot(table: CompiledTable, states: list[int]) -> Iterator[str]:
+    """
+    Yields the lines of a DOT diagram of the given states, straight from the compiled
+    table. Transitions between the same pair of states are merged into a single edge,
+    labelled with ranges of their symbols, and transitions into states that aren't
+    drawn all lead into a single placeholder node
+    """
+    drawn = set(states)
+    yield "digraph {\n"
+    yield "  rankdir=LR;\n"
+    yield "  node [shape=circle];\n"
+    if table.initial_state in drawn:
+        yield "  __start [shape=point];\n"
+        yield f"  __start -> s{table.initial_state};\n"
+    if len(drawn) < table.num_states:
+        yield f'  {_OMITTED} [label="…" shape=plaintext];\n'
+
+    for state in states:
+        label = _escape("".join(map(str, table.states[state])))
+        shape = " shape=doublecircle" if state in table.final_states else ""
+        yield f'  s{state} [label="{label}"{shape}];\n'
+
+    for state in states:
+        edges: dict[str, list[str]] = {}
+        for next_state, symbols in zip(table.transitions[state], table.classes):
+            target = f"s{next_state}" if next_state in drawn else _OMITTED
+            edges.setdefault(target, []).extend(symbols)
+        for target, symbols in edges.items():
+            yield f'  s{state} -> {target} [label="{_escape(_ranges(symbols))}"];\n'
+    yield "}\n"
+
+
+def render(
+    table: CompiledTable,
+    output_format: str = "dot",
+    max_states: int | None = None,
+    around: int | None = None,
+    radius: int | None = None,
+) -> bytes:
+    """
+    Returns the diagram of the table as DOT text, or rendered by the `dot` program of
+    Graphviz into any other of its output formats (such as "svg" or "png"). Diagrams
+    are cached by the hash of the table and the options, see `DIAGRAM_CACHE_SIZE`
+    """
+    key = (table_digest(table), output_format, max_states, around, radius)
+    with _rendered_lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            return _rendered[key]
+
+    dot = "".join(iter_dot(table, select_states(table, max_states, around, radius)))
+    if output_format == "dot":
+        result = dot.encode()
+    else:
+        program = shutil.which("dot")
+        if program is None:
+            raise MissingDependencyException("graphviz", "graphviz")
+        result = subprocess.run(
+            [program, f"-T{output_format}"],
+            input=dot.encode(),
+            capture_output=True,
+            check=True,
+        ).stdout
+
+    with _rendered_lock:
+        _rendered[key] = result
+        if len(_rendered) > DIAGRAM_CACHE_SIZE:
+            _ = _rendered.popitem(last=False)
+    return result
+
+
+def _ranges(symbols: list[str]) -> str:
+    """Joins the symbols into a label, writing runs of 3 or more code points as `a-z`"""
+    parts: list[str] = []
+    ordered = sorted(symbols)
+    i = 0
+    while i < len(ordered):
+        end = i
+        if len(ordered[i]) == 1:
+            while (
+                end + 1 < len(ordered)
+                and len(ordered[end + 1]) == 1
+                and ord(ordered[end + 1]) == ord(ordered[end]) + 1
+            ):
+                end += 1
+        if end - i >= 2:
+            parts.append(f"{ordered[i]}-{ordered[end]}")
+        else:
+            parts.extend(ordered[i : end + 1])
+        i = end + 1
+    return ",".join(parts)
+
+
+def _escape(text: str) -> str:
+    """Escapes text for a quoted DOT string"""
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,156 @@
+from collections.abc import Callable, Sequence
+from itertools import repeat
+
+import numpy as np
+
+from ._compiled_table import NO_CLASS, CompiledTable
+from ._run import REJECTED
+
+CHUNK_SIZE = 1 << 16
+"""Most inputs advanced together at once"""
+
+MATRIX_SIZE = 1 << 24
+"""
+Most symbols held by the matrix of a chunk, which takes fewer inputs when they are long
+"""
+
+FINISH_SIZE = 32
+"""Once fewer inputs than this are still being read, they are finished one at a time"""
+
+_CODE_POINTS = 0x110000
+"""
+Amount of Unicode code points, the size of the lookup from code points into columns
+"""
+
+
+class LockstepTable:
+    """
+    Transition table of an automaton laid out to run batches of inputs with NumPy.
+
+    Instead of walking each input in its own Python loop, a batch is encoded into a
+    matrix of symbol class ids with one column per input, and a vector with the current
+    state of every input is advanced one row (that is, one position of the inputs) at a
+    time through a single fancy-indexing lookup. Inputs of different lengths are padded
+    with a mask, and sorted by length so that each step only touches the prefix of the
+    batch that is still being read instead of every input.
+
+    Symbols outside of the alphabet are mapped into an extra column leading into an
+    extra dead state, which never leaves itself and is never accepting.
+
+    Attributes:
+        transitions: Flat table indexed by `state * width + column`, with the dead
+            state.
+        accepting: Whether each state (including the dead one) is a final state.
+        width: Columns of each row, the symbol classes plus the dead column.
+        dead_state: Id of the extra dead state.
+    """
+
+    transitions: "np.ndarray"
+    accepting: "np.ndarray"
+    width: int
+    dead_state: int
+    _table: CompiledTable
+    _run: Callable[[str, int], int]
+    _lookup: "np.ndarray"
+    _column_type: "np.dtype"
+
+    def __init__(self, table: CompiledTable, run: Callable[[str, int], int]) -> None:
+        """
+        Lays out the table, taking the run loop used to finish the inputs that are much
+        longer than the rest of the batch (from a given state, returning `REJECTED` on
+        symbols outside of the alphabet)
+        """
+        self._table = table
+        self._run = run
+        self.width = table.num_classes + 1
+        self.dead_state = table.num_states
+
+        transitions = np.full(
+            (table.num_states + 1, self.width), self.dead_state, dtype=np.intp
+        )
+        if table.num_classes:
+            transitions[: table.num_states, : table.num_classes] = table.transitions
+        self.transitions = transitions.ravel()
+        self.accepting = np.zeros(table.num_states + 1, dtype=bool)
+        self.accepting[list(table.final_states)] = True
+
+        # Every code point is mapped into a column, with unknown symbols at the dead
+        # column, so that encoding is a single lookup without bound checks
+        self._column_type = np.min_scalar_type(self.width - 1)
+        if len(table.class_lookup):
+            known = np.array(table.class_lookup, dtype=np.intp)
+            known[known == NO_CLASS] = table.num_classes
+            self._lookup = np.full(_CODE_POINTS, table.num_classes, self._column_type)
+            self._lookup[: len(known)] = known
+        else:
+            self._lookup = np.empty(0, self._column_type)
+
+    def run(self, inputs: Sequence[str]) -> "np.ndarray":
+        """Returns the id of the state each input ends on, the dead state if rejected"""
+        lengths = np.fromiter(map(len, inputs), dtype=np.intp, count=len(inputs))
+        states = np.empty(len(inputs), dtype=np.intp)
+
+        start = 0
+        while start < len(inputs):
+            # Takes as many inputs as fit in the matrix, padded to the longest of them
+            longest = np.maximum.accumulate(lengths[start : start + CHUNK_SIZE])
+            fits = longest * np.arange(1, len(longest) + 1) <= MATRIX_SIZE
+            size = len(fits) if fits.all() else max(1, int(np.argmin(fits)))
+            states[start : start + size] = self._run_chunk(
+                inputs[start : start + size], lengths[start : start + size]
+            )
+            start += size
+        return states
+
+    def _run_chunk(self, inputs: Sequence[str], lengths: "np.ndarray") -> "np.ndarray":
+        longest = int(lengths.max())
+
+        # Each input takes a row of the padded matrix, masking out the positions past
+        # its end. Rows are then sorted by decreasing length and transposed, so that row
+        # `i` holds the `i`-th symbol of every input long enough to have one, which is
+        # always a prefix of the batch
+        padded = np.zeros((len(inputs), longest), dtype=self._column_type)
+        padded[np.arange(longest)[None, :] < lengths[:, None]] = self._encode(inputs)
+        order = np.argsort(-lengths, kind="stable")
+        matrix = np.ascontiguousarray(padded[order].T)
+        sorted_lengths = lengths[order]
+        reading = np.searchsorted(-sorted_lengths, -np.arange(1, longest + 1), "right")
+
+        transitions = self.transitions
+        width = self.width
+        states = np.full(len(inputs), self._table.initial_state, dtype=np.intp)
+        for position, active in enumerate(reading.tolist()):
+            if active < FINISH_SIZE:
+                # Few long inputs are left, which are faster to finish one at a time
+                for i in range(active):
+                    states[i] = self._finish(
+                        int(states[i]), inputs[int(order[i])][position:]
+                    )
+                break
+            states[:active] = transitions[
+                states[:active] * width + matrix[position, :active]
+            ]
+
+        result = np.empty_like(states)
+        result[order] = states
+        return result
+
+    def _finish(self, state: int, rest: str) -> int:
+        if state == self.dead_state:
+            return state
+        state = self._run(rest, state)
+        return self.dead_state if state == REJECTED else state
+
+    def _encode(self, inputs: Sequence[str]) -> "np.ndarray":
+        """Column of each symbol of the inputs, concatenated"""
+        text = "".join(inputs)
+        if len(self._lookup) == 0:
+            # Alphabets that can't be looked up by code point go through the class ids
+            return np.fromiter(
+                map(self._table.class_ids.get, text, repeat(self.width - 1)),
+                dtype=np.intp,
+                count=len(text),
+            )
+
+        codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), np.uint32)
+        return self._lookup[codes]
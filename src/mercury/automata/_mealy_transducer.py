@@ -0,0 +1,87 @@
+from collections.abc import Iterable
+from time import perf_counter
+from typing import cast
+
+from frozendict import frozendict
+
+from mercury.types import InputSymbol, State
+
+from ._transducer import Transducer
+
+
+class MealyTransducer(Transducer):
+    """
+    A deterministic transducer with fixed outputs per transition, as a Mealy machine.
+
+    Unlike `DeterministicFiniteTransducer`, each transition may output a string of any
+    length (including an empty one) or bytes, and nothing is output for the state the
+    input ends on. Outputs are resolved once while building the transducer, interned and
+    stored in the compiled table next to the transitions, so transducing runs in the
+    compiled run loops and copies the outputs straight into a preallocated buffer
+    without ever calling the output function.
+
+    Attributes:
+        outputs: Distinct outputs of the transitions, indexed by the output ids of the
+            compiled table.
+        output_table: Output of every transition, by state and input symbol.
+    """
+
+    @property
+    def outputs(self) -> tuple[str, ...] | tuple[bytes, ...]:
+        """Distinct outputs of the transitions, indexed by their output ids"""
+        return self._tape.outputs
+
+    @property
+    def output_table(self) -> frozendict[tuple[State, InputSymbol], str | bytes]:
+        """
+        Output of every transition, by the state it leaves from and its input symbol
+        """
+        return frozendict(
+            {
+                (state, symbol): self._tape.outputs[output_id]
+                for state, symbol_mapping in self._output_mappings.items()
+                for symbol, output_id in symbol_mapping.items()
+            }
+        )
+
+    def transduce_input(self, input_str: str) -> str | bytes:
+        """
+        Returns the outputs of the transitions taken while reading the input string,
+        concatenated into a string (or bytes, if that is what the transitions output)
+        """
+        if self._stats is None:
+            return self._transduce_many([input_str])[0]
+
+        start = perf_counter()
+        try:
+            return self._transduce_many([input_str])[0]
+        finally:
+            self._stats.execution_time += perf_counter() - start
+            self._stats.inputs_processed += 1
+            self._stats.symbols_processed += len(input_str)
+
+    def transduce_many(self, inputs: Iterable[str]) -> list[str] | list[bytes]:
+        """
+        Transduces every input like `transduce_input`, copying the outputs of all of
+        them through a single buffer instead of allocating one per input
+        """
+        if self._stats is None:
+            return self._transduce_many(inputs)
+
+        start = perf_counter()
+        inputs = list(inputs)
+        try:
+            return self._transduce_many(inputs)
+        finally:
+            self._stats.execution_time += perf_counter() - start
+            self._stats.inputs_processed += len(inputs)
+            self._stats.symbols_processed += sum(map(len, inputs))
+
+    def _transduce_many(self, inputs: Iterable[str]) -> list[str] | list[bytes]:
+        runs = self._tape.transduce_many(
+            self._compiled, inputs, self._generated_loops()
+        )
+        # Every output has the type of the tape, checked while resolving them
+        if self._tape.output_type is bytes:
+            return [b"".join(cast(list[bytes], parts)) for parts, _ in runs]
+        return ["".join(cast(list[str], parts)) for parts, _ in runs]
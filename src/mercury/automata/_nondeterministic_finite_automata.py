@@ -0,0 +1,284 @@
+from collections.abc import Generator, Iterable, Set
+
+from frozendict import frozendict
+
+from mercury.decorators import DeltaFunction, OutputFunction
+from mercury.exceptions import (
+    InvalidReturnTypeException,
+    MissingStateException,
+    WrongArgumentException,
+)
+from mercury.types import InputState, InputSymbol, State
+
+from ._deterministic_finite_automata import DeterministicFiniteAutomata
+from ._search_automaton import UNEXPLORED
+
+type _StateSet = int
+"""
+Set of states represented as a bitset, where bit `i` is on if the state with id `i`
+(in the order of `NondeterministicFiniteAutomata.compiled_states`) is part of the set
+"""
+
+
+class NondeterministicFiniteAutomata:
+    """
+    A nondeterministic finite automaton (NFA) defined with a transition function.
+
+    Works just like `DeterministicFiniteAutomata`, except for the transition function
+    returning a set of states (possibly empty) instead of a single one. Sets of states
+    are represented internally as bitsets over integer state ids, and the automaton is
+    determinized lazily: the deterministic state for a set of states is only built the
+    first time an input reaches it, and is cached for every later input. Exponential
+    blow-up is then only paid for the sets of states that inputs actually visit.
+
+    Attributes:
+        states: Frozenset of the states of the automaton.
+        input_symbols: A collection of allowed input symbols as strings.
+        initial_state: The initial state.
+        final_states: Frozenset of the accepting states.
+        transitions: Mapping from each state and symbol into the set of next states.
+        materialized_states: Amount of deterministic states built so far.
+    """
+
+    _states: tuple[State, ...]
+    _state_ids: dict[State, int]
+    _input_symbols: frozenset[InputSymbol]
+    _symbol_ids: dict[InputSymbol, int]
+    _initial_state: int
+    _final_mask: _StateSet
+    _transitions: tuple[tuple[_StateSet, ...], ...]
+    _transition_function: DeltaFunction
+    _subset_ids: dict[_StateSet, int]
+    _subsets: list[_StateSet]
+    _rows: list[list[int]]
+
+    def __init__(
+        self,
+        states: Iterable[InputState],
+        input_symbols: Iterable[InputSymbol],
+        initial_state: InputState,
+        final_states: Iterable[InputState],
+        transition_function: DeltaFunction,
+    ) -> None:
+        """
+        Initialize the NFA with the specified states, input symbols, initial state,
+        accepting states, and transition function.
+
+        Args:
+            states: An iterable of all possible states.
+            input_symbols: An iterable of allowed input symbols.
+            initial_state: The initial state.
+            final_states: An iterable containing the accepting states.
+            transition_function: A DeltaFunction mapping current states and input
+                symbols to sets of next states.
+        """
+        if isinstance(transition_function, OutputFunction):
+            raise WrongArgumentException(DeltaFunction, OutputFunction)
+
+        collapse = DeterministicFiniteAutomata._collapse_into_state
+        self._states = tuple(sorted({collapse(state) for state in states}, key=repr))
+        self._state_ids = {state: i for i, state in enumerate(self._states)}
+        self._input_symbols = frozenset(input_symbols)
+        self._symbol_ids = {
+            symbol: i for i, symbol in enumerate(sorted(self._input_symbols))
+        }
+        self._initial_state = self._state_ids[collapse(initial_state)]
+        self._final_mask = self._to_bitset(collapse(state) for state in final_states)
+        self._transition_function = transition_function
+        self._transitions = self._generate_mappings()
+
+        self._subset_ids = {}
+        self._subsets = []
+        self._rows = []
+        _ = self._materialize(1 << self._initial_state)
+
+    def _generate_mappings(self) -> tuple[tuple[_StateSet, ...], ...]:
+        """
+        Calls the transition function for every state and symbol, returning the
+        table of next state bitsets indexed by state id and symbol id
+        """
+        collapse = DeterministicFiniteAutomata._collapse_into_state
+        mappings: list[tuple[_StateSet, ...]] = []
+        for state in self._states:
+            row: list[_StateSet] = []
+            for symbol in self._symbol_ids:
+                next_states = self._transition_function(args=state, next_symbol=symbol)
+                if not isinstance(next_states, Set):
+                    raise InvalidReturnTypeException(
+                        "DeltaFunction", frozenset, type(next_states), next_states
+                    )
+                bitset = 0
+                for next_state in next_states:
+                    next_state = collapse(next_state)
+                    if next_state not in self._state_ids:
+                        raise MissingStateException(state, symbol, next_state)
+                    bitset |= 1 << self._state_ids[next_state]
+                row.append(bitset)
+            mappings.append(tuple(row))
+        return tuple(mappings)
+
+    @property
+    def states(self) -> frozenset[State]:
+        """Frozenset of the states for this automata."""
+        return frozenset(self._states)
+
+    @property
+    def compiled_states(self) -> tuple[State, ...]:
+        """States ordered by their id, the bit they take in the internal bitsets"""
+        return self._states
+
+    @property
+    def transitions(self) -> frozendict[tuple[State, InputSymbol], frozenset[State]]:
+        """Mapping from each state and symbol into the set of next states."""
+        return frozendict(
+            {
+                (state, symbol): self._from_bitset(self._transitions[i][symbol_id])
+                for i, state in enumerate(self._states)
+                for symbol, symbol_id in self._symbol_ids.items()
+            }
+        )
+
+    @property
+    def input_symbols(self) -> frozenset[InputSymbol]:
+        """Frozenset containing all allowed input symbols as strings."""
+        return self._input_symbols
+
+    @property
+    def initial_state(self) -> State:
+        """The initial state."""
+        return self._states[self._initial_state]
+
+    @property
+    def final_states(self) -> frozenset[State]:
+        """Frozenset of the accepting states."""
+        return self._from_bitset(self._final_mask)
+
+    @property
+    def materialized_states(self) -> int:
+        """Amount of deterministic states (sets of states) built so far"""
+        return len(self._subsets)
+
+    def accepts_input(self, input_str: str) -> bool:
+        "Returns true if this automaton accepts the input string"
+        state = self._run(input_str)
+        return state is not None and bool(self._subsets[state] & self._final_mask)
+
+    def read_input_stepwise(
+        self, input_str: str
+    ) -> Generator[frozenset[State], None, None]:
+        "Returns a generator that yields the set of current states at each step"
+
+        def generator():
+            state = 0
+            yield self._from_bitset(self._subsets[state])
+            for symbol in input_str:
+                symbol_id = self._symbol_ids.get(symbol)
+                if symbol_id is None:
+                    yield frozenset()
+                    return
+                state = self._step(state, symbol_id)
+                yield self._from_bitset(self._subsets[state])
+
+        return generator()
+
+    def to_dfa(self) -> DeterministicFiniteAutomata:
+        """
+        Determinizes the automaton, building every set of states reachable from the
+        initial state. Each state of the resulting DFA is a one-valued tuple holding the
+        original states it stands for, such as `(((0,), (1,)),)`.
+        """
+        self._determinize()
+        symbols = list(self._symbol_ids.items())
+
+        def to_state(subset: _StateSet) -> State:
+            return (tuple(self._states[i] for i in self._bits(subset)),)
+
+        transitions = {
+            to_state(subset): {
+                symbol: to_state(self._subsets[self._rows[state][symbol_id]])
+                for symbol, symbol_id in symbols
+            }
+            for state, subset in enumerate(self._subsets)
+        }
+
+        delta = DeltaFunction()
+
+        @delta.definition()
+        def _(states: tuple, next: str):  # pyright: ignore[reportMissingTypeArgument]
+            return transitions[(states,)][next]
+
+        return DeterministicFiniteAutomata._from_mappings(
+            [to_state(subset) for subset in self._subsets],
+            self._input_symbols,
+            to_state(self._subsets[0]),
+            [to_state(subset) for subset in self._subsets if subset & self._final_mask],
+            transitions,
+            delta,
+        )
+
+    def _run(self, input_str: str) -> int | None:
+        """
+        Runs the input through the lazily determinized automaton, returning the id of
+        the deterministic state it ends on, or None if it reads an unknown symbol
+        """
+        rows = self._rows
+        symbol_ids = self._symbol_ids
+        state = 0
+        for symbol in input_str:
+            symbol_id = symbol_ids.get(symbol)
+            if symbol_id is None:
+                return None
+            next_state = rows[state][symbol_id]
+            if next_state == UNEXPLORED:
+                next_state = self._expand(state, symbol_id)
+            state = next_state
+        return state
+
+    def _determinize(self) -> None:
+        """Expands every transition, building each subset that can be reached"""
+        state = 0
+        while state < len(self._subsets):  # Grows as new subsets are found
+            for symbol_id in self._symbol_ids.values():
+                _ = self._step(state, symbol_id)
+            state += 1
+
+    def _step(self, state: int, symbol_id: int) -> int:
+        next_state = self._rows[state][symbol_id]
+        return (
+            self._expand(state, symbol_id) if next_state == UNEXPLORED else next_state
+        )
+
+    def _expand(self, state: int, symbol_id: int) -> int:
+        """Builds (and caches) the deterministic transition for a set of states"""
+        next_subset = 0
+        for i in self._bits(self._subsets[state]):
+            next_subset |= self._transitions[i][symbol_id]
+        next_state = self._materialize(next_subset)
+        self._rows[state][symbol_id] = next_state
+        return next_state
+
+    def _materialize(self, subset: _StateSet) -> int:
+        state = self._subset_ids.get(subset)
+        if state is None:
+            state = len(self._subsets)
+            self._subset_ids[subset] = state
+            self._subsets.append(subset)
+            self._rows.append([UNEXPLORED] * len(self._symbol_ids))
+        return state
+
+    def _to_bitset(self, states: Iterable[State]) -> _StateSet:
+        bitset = 0
+        for state in states:
+            bitset |= 1 << self._state_ids[state]
+        return bitset
+
+    def _from_bitset(self, bitset: _StateSet) -> frozenset[State]:
+        return frozenset(self._states[i] for i in self._bits(bitset))
+
+    @staticmethod
+    def _bits(bitset: _StateSet) -> Generator[int, None, None]:
+        """Yields the ids of the states in the bitset"""
+        while bitset:
+            lowest = bitset & -bitset
+            yield lowest.bit_length() - 1
+            bitset ^= lowest
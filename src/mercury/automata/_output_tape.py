@@ -0,0 +1,146 @@
+from array import array
+from collections.abc import Iterable, Iterator
+from itertools import repeat
+from types import ModuleType
+
+from mercury.exceptions import InvalidSymbolException
+
+from . import _backend
+from ._compiled_table import NO_CLASS, CompiledTable
+from ._run import REJECTED
+
+TRANSDUCE_CHUNK_SIZE = 1 << 16
+"""Most symbols transduced at once, which bounds the size of the output buffer"""
+
+
+class OutputTape:
+    """
+    Outputs of a transducer laid out for the run loops of the backend.
+
+    The outputs are encoded back to back into a single blob (strings as UTF-8), so that
+    transducing copies the output of every transition taken straight into a preallocated
+    buffer with `transduce_into`, instead of collecting an object per step. The buffer
+    can be reused across inputs, see `buffer_size`.
+
+    Attributes:
+        outputs: Distinct outputs of the transducer, indexed by the output ids of its
+            table.
+        output_type: Type of every output, either `str` or `bytes`.
+        blob: Encoded outputs, concatenated.
+        offsets: Where each output starts in the blob, followed by the end of the blob.
+        longest: Length of the longest encoded output.
+    """
+
+    outputs: tuple[str, ...] | tuple[bytes, ...]
+    output_type: type[str] | type[bytes]
+    blob: bytes
+    offsets: array[int]
+    longest: int
+
+    def __init__(
+        self,
+        outputs: tuple[str, ...] | tuple[bytes, ...],
+        output_type: type[str] | type[bytes] = str,
+    ) -> None:
+        self.outputs = outputs
+        self.output_type = output_type
+        encoded = [
+            (
+                output.encode("utf-8", "surrogatepass")
+                if isinstance(output, str)
+                else output
+            )
+            for output in outputs
+        ]
+        self.blob = b"".join(encoded)
+        self.offsets = array("i", [0])
+        for output in encoded:
+            self.offsets.append(self.offsets[-1] + len(output))
+        self.longest = max(map(len, encoded), default=0)
+
+    def buffer_size(self, length: int) -> int:
+        """Bytes a buffer needs to hold the outputs of any input of this length"""
+        return min(length, TRANSDUCE_CHUNK_SIZE) * self.longest
+
+    def transduce(
+        self, table: CompiledTable, input_str: str, buffer: bytearray
+    ) -> tuple[list[str] | list[bytes], int]:
+        """
+        Runs the input through the table, returning the outputs of the transitions taken
+        (in a part per chunk) and the id of the state it ends on. `buffer` must hold at
+        least `buffer_size(len(input_str))` bytes, and is overwritten. Raises
+        InvalidSymbolException on symbols outside of the alphabet
+        """
+        if not (table.num_classes and len(table.class_lookup)):
+            return self._transduce_symbols(table, input_str)
+
+        view = memoryview(buffer)
+        decode = self._decode
+        parts: list[str] | list[bytes] = []
+        state = table.initial_state
+        for start in range(0, len(input_str), TRANSDUCE_CHUNK_SIZE):
+            read, written, state = _backend.transduce_into(
+                table.class_lookup,
+                table.flat_transitions,
+                table.flat_outputs,
+                self.blob,
+                self.offsets,
+                table.num_classes,
+                state,
+                input_str[start : start + TRANSDUCE_CHUNK_SIZE],
+                buffer,
+            )
+            parts.append(decode(view[:written]))  # pyright: ignore[reportArgumentType]
+            if state == REJECTED:
+                position = start + read
+                raise InvalidSymbolException(input_str[position], position)
+        return parts, state
+
+    def transduce_many(
+        self,
+        table: CompiledTable,
+        inputs: Iterable[str],
+        generated: ModuleType | None = None,
+    ) -> Iterator[tuple[list[str] | list[bytes], int]]:
+        """
+        Transduces every input like `transduce`, going through a single buffer that is
+        grown as needed instead of allocating one per input. With `generated`, a module
+        from `compile_to_python`, inputs are transduced by it instead
+        """
+        if generated is not None:
+            for input_str in inputs:
+                output, state, read = generated.transduce(
+                    input_str, table.initial_state
+                )
+                if state == REJECTED:
+                    raise InvalidSymbolException(input_str[read], read)
+                yield [output], state
+            return
+
+        buffer = bytearray()
+        for input_str in inputs:
+            size = self.buffer_size(len(input_str))
+            if len(buffer) < size:
+                buffer = bytearray(size)
+            yield self.transduce(table, input_str, buffer)
+
+    def _transduce_symbols(
+        self, table: CompiledTable, input_str: str
+    ) -> tuple[list[str] | list[bytes], int]:
+        """Alphabets that can't be looked up by code point go through the class ids"""
+        parts: list[str] | list[bytes] = []
+        state = table.initial_state
+        class_ids = map(table.class_ids.get, input_str, repeat(NO_CLASS))
+        for position, class_id in enumerate(class_ids):
+            if class_id == NO_CLASS:
+                raise InvalidSymbolException(input_str[position], position)
+            output = self.outputs[table.outputs[state][class_id]]
+            parts.append(output)  # pyright: ignore[reportArgumentType]
+            state = table.transitions[state][class_id]
+        return parts, state
+
+    def _decode(self, written: memoryview) -> str | bytes:
+        """Turns the bytes written into the buffer back into the type of the outputs"""
+        if self.output_type is str:
+            return str(written, "utf-8", "surrogatepass")
+        return bytes(written)
@@ -0,0 +1,207 @@
+from collections.abc import Iterable
+from typing import NoReturn
+
+from mercury.exceptions import InvalidRegexException
+from mercury.types import InputSymbol, State
+
+type _Fragment = tuple[int, int]
+"""Piece of a Thompson NFA, given by its start and accepting state"""
+
+
+class RegexAutomaton:
+    """
+    Deterministic automaton compiled from a regular expression.
+
+    The pattern is parsed into a Thompson NFA, which is then determinized with the
+    subset construction, only keeping the subsets reachable from the start. Each
+    resulting state is a one-valued tuple holding the sorted NFA states it stands for,
+    such as `((0, 2, 5),)`, with `((),)` being the dead state.
+
+    Supported syntax: literals, `.` (any symbol of the alphabet), alternation `|`,
+    grouping `(...)`, the quantifiers `*`, `+` and `?`, character classes such as
+    `[abc]`, `[a-z]` or `[^ab]`, and backslash escapes. The whole input has to match.
+
+    Attributes:
+        states: States reachable from the initial state.
+        initial_state: State of the NFA start closure.
+        final_states: States containing the accepting state of the NFA.
+        transitions: Mapping from each state and symbol into the next state.
+    """
+
+    states: list[State]
+    initial_state: State
+    final_states: list[State]
+    transitions: dict[State, dict[InputSymbol, State]]
+    _pattern: str
+    _alphabet: frozenset[InputSymbol]
+    _position: int
+    _epsilon: list[list[int]]
+    _moves: list[list[tuple[frozenset[InputSymbol], int]]]
+
+    def __init__(self, pattern: str, alphabet: Iterable[InputSymbol]) -> None:
+        self._pattern = pattern
+        self._alphabet = frozenset(alphabet)
+        self._position = 0
+        self._epsilon = []
+        self._moves = []
+
+        start, accept = self._parse_alternation()
+        if self._position < len(pattern):
+            self._fail("unbalanced parenthesis")
+
+        self._determinize(start, accept)
+
+    def _determinize(self, start: int, accept: int) -> None:
+        symbols = sorted(self._alphabet)
+        initial = self._closure([start])
+        subsets = [initial]
+        seen = {initial}
+        self.transitions = {}
+
+        for subset in subsets:
+            mapping: dict[InputSymbol, State] = {}
+            for symbol in symbols:
+                next_subset = self._closure(
+                    target
+                    for nfa_state in subset
+                    for symbols_read, target in self._moves[nfa_state]
+                    if symbol in symbols_read
+                )
+                if next_subset not in seen:
+                    seen.add(next_subset)
+                    subsets.append(next_subset)
+                mapping[symbol] = (next_subset,)
+            self.transitions[(subset,)] = mapping
+
+        self.states = [(subset,) for subset in subsets]
+        self.initial_state = (initial,)
+        self.final_states = [(subset,) for subset in subsets if accept in subset]
+
+    def _closure(self, nfa_states: Iterable[int]) -> tuple[int, ...]:
+        """Epsilon closure of a set of NFA states, as a sorted tuple"""
+        stack = list(nfa_states)
+        closure = set(stack)
+        while stack:
+            for target in self._epsilon[stack.pop()]:
+                if target not in closure:
+                    closure.add(target)
+                    stack.append(target)
+        return tuple(sorted(closure))
+
+    def _new_state(self) -> int:
+        self._epsilon.append([])
+        self._moves.append([])
+        return len(self._epsilon) - 1
+
+    def _new_fragment(self) -> _Fragment:
+        return self._new_state(), self._new_state()
+
+    def _peek(self) -> str | None:
+        return (
+            self._pattern[self._position]
+            if self._position < len(self._pattern)
+            else None
+        )
+
+    def _next(self) -> str:
+        character = self._peek()
+        if character is None:
+            self._fail("unexpected end of pattern")
+        self._position += 1
+        return character
+
+    def _fail(self, reason: str) -> NoReturn:
+        raise InvalidRegexException(self._pattern, self._position, reason)
+
+    def _parse_alternation(self) -> _Fragment:
+        branches = [self._parse_concatenation()]
+        while self._peek() == "|":
+            self._position += 1
+            branches.append(self._parse_concatenation())
+        if len(branches) == 1:
+            return branches[0]
+
+        start, accept = self._new_fragment()
+        for branch_start, branch_accept in branches:
+            self._epsilon[start].append(branch_start)
+            self._epsilon[branch_accept].append(accept)
+        return start, accept
+
+    def _parse_concatenation(self) -> _Fragment:
+        start, accept = self._new_fragment()
+        self._epsilon[start].append(accept)
+        while self._peek() not in (None, "|", ")"):
+            piece_start, piece_accept = self._parse_repetition()
+            self._epsilon[accept].append(piece_start)
+            accept = piece_accept
+        return start, accept
+
+    def _parse_repetition(self) -> _Fragment:
+        fragment = self._parse_atom()
+        while self._peek() in ("*", "+", "?"):
+            operator = self._next()
+            inner_start, inner_accept = fragment
+            start, accept = self._new_fragment()
+            self._epsilon[start].append(inner_start)
+            self._epsilon[inner_accept].append(accept)
+            if operator in ("*", "?"):
+                self._epsilon[start].append(accept)
+            if operator in ("*", "+"):
+                self._epsilon[inner_accept].append(inner_start)
+            fragment = start, accept
+        return fragment
+
+    def _parse_atom(self) -> _Fragment:
+        character = self._next()
+        if character == "(":
+            fragment = self._parse_alternation()
+            if self._peek() != ")":
+                self._fail("missing closing parenthesis")
+            self._position += 1
+            return fragment
+        if character in ("*", "+", "?", ")"):
+            self._fail(f"unexpected '{character}'")
+
+        if character == "[":
+            symbols = self._parse_class()
+        elif character == ".":
+            symbols = self._alphabet
+        else:
+            if character == "\\":
+                character = self._next()
+            if character not in self._alphabet:
+                self._position -= 1
+                self._fail(f"symbol '{character}' is not part of the alphabet")
+            symbols = frozenset([character])
+
+        start, accept = self._new_fragment()
+        self._moves[start].append((symbols, accept))
+        return start, accept
+
+    def _parse_class(self) -> frozenset[InputSymbol]:
+        negated = self._peek() == "^"
+        if negated:
+            self._position += 1
+
+        symbols: set[InputSymbol] = set()
+        while self._peek() != "]":
+            first = self._next()
+            if first == "\\":
+                first = self._next()
+            if self._peek() == "-" and self._pattern[
+                self._position + 1 : self._position + 2
+            ] not in ("", "]"):
+                self._position += 1
+                last = self._next()
+                if last == "\\":
+                    last = self._next()
+                if ord(last) < ord(first):
+                    self._fail(f"invalid range '{first}-{last}'")
+                symbols.update(chr(code) for code in range(ord(first), ord(last) + 1))
+            else:
+                symbols.add(first)
+        self._position += 1
+
+        # Classes may mention symbols outside of the alphabet (like ranges), which are
+        # simply never read by the automaton
+        return self._alphabet - symbols if negated else self._alphabet & symbols
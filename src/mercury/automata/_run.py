@@ -0,0 +1,162 @@
+from array import array
+from collections.abc import Buffer, Sequence
+
+from mercury.types import InputBytes
+
+REJECTED = -1
+"""
+State id returned by the run loops when the input has a symbol outside of the alphabet
+"""
+
+
+def run(
+    lookup: array[int],
+    transitions: array[int],
+    width: int,
+    state: int,
+    data: str | InputBytes,
+    sink: int = REJECTED,
+) -> int:
+    """
+    Runs the input through a flat transition table (see
+    `CompiledTable.flat_transitions`) from `state`, returning the state id it ends on or
+    `REJECTED`. Stops early on reaching `sink`, a state that only leads to itself (see
+    `CompiledTable.sink_state`).
+
+    Each character (or byte) of the input is mapped into a column of the table through
+    `lookup`, indexed by code point, where negative entries and code points past its end
+    are symbols outside of the alphabet. This is the pure Python version of the compiled
+    loop in `_speedups`, and both must behave the same way.
+    """
+    size = len(lookup)
+    codes = map(ord, data) if isinstance(data, str) else memoryview(data).cast("B")
+    for code in codes:
+        column = lookup[code] if code < size else REJECTED
+        if column < 0:
+            return REJECTED
+        state = transitions[state * width + column]
+        if state == sink:
+            break
+    return state
+
+
+def run_many(
+    lookup: array[int],
+    transitions: array[int],
+    width: int,
+    state: int,
+    inputs: Sequence[str | InputBytes],
+    sink: int,
+    out: Buffer,
+) -> None:
+    """
+    Runs every input like `run` from the same state, writing the state id each of
+    them ends on into `out`, a writable buffer of C ints with room for one per input.
+    The compiled version reads the whole batch without holding the GIL, so batches
+    run in parallel from several threads.
+    """
+    view = memoryview(out).cast("B").cast("i")
+    if len(view) < len(inputs):
+        raise ValueError("out must hold an item per input")
+    for i, data in enumerate(inputs):
+        view[i] = run(lookup, transitions, width, state, data, sink)
+
+
+def trace(
+    lookup: array[int],
+    transitions: array[int],
+    width: int,
+    state: int,
+    data: str | InputBytes,
+    out: Buffer,
+) -> int:
+    """
+    Runs the input like `run`, writing every state it goes through (starting with
+    `state`) into `out`, a writable buffer of C ints with room for `len(data) + 1`
+    of them. Returns the amount of states written, which is less than that when
+    stopping at a symbol outside of the alphabet.
+    """
+    view = memoryview(out).cast("B").cast("i")
+    if len(view) <= len(data):
+        raise ValueError("out must hold one more item than data")
+
+    size = len(lookup)
+    view[0] = state
+    written = 1
+    codes = map(ord, data) if isinstance(data, str) else memoryview(data).cast("B")
+    for code in codes:
+        column = lookup[code] if code < size else REJECTED
+        if column < 0:
+            break
+        state = transitions[state * width + column]
+        view[written] = state
+        written += 1
+    return written
+
+
+def transduce[T: (str, bytes)](
+    lookup: array[int],
+    transitions: array[int],
+    outputs: array[int],
+    strings: Sequence[T],
+    width: int,
+    state: int,
+    data: str | InputBytes,
+) -> tuple[list[T], int]:
+    """
+    Runs the input like `run`, also collecting the output of every transition taken,
+    where `outputs` holds ids into `strings` laid out like `transitions`. Returns the
+    outputs and the state id it ends on, or `REJECTED` with the outputs produced up to
+    the first symbol outside of the alphabet.
+    """
+    size = len(lookup)
+    tape: list[T] = []
+    append = tape.append
+    codes = map(ord, data) if isinstance(data, str) else memoryview(data).cast("B")
+    for code in codes:
+        column = lookup[code] if code < size else REJECTED
+        if column < 0:
+            return tape, REJECTED
+        index = state * width + column
+        append(strings[outputs[index]])
+        state = transitions[index]
+    return tape, state
+
+
+def transduce_into(
+    lookup: array[int],
+    transitions: array[int],
+    outputs: array[int],
+    blob: Buffer,
+    offsets: array[int],
+    width: int,
+    state: int,
+    data: str | InputBytes,
+    out: Buffer,
+) -> tuple[int, int, int]:
+    """
+    Runs the input like `transduce`, copying the output of every transition taken back
+    to back into `out`, a writable buffer of bytes, instead of collecting objects. The
+    outputs are laid out in `blob`, where output `i` spans from `offsets[i]` to
+    `offsets[i + 1]`. Returns the amount of symbols read, the amount of bytes written
+    and the state id it ends on (or `REJECTED`). Raises ValueError if `out` is too
+    small to hold the outputs.
+    """
+    source = memoryview(blob).cast("B")
+    target = memoryview(out).cast("B")
+    size = len(lookup)
+    written = 0
+    codes = map(ord, data) if isinstance(data, str) else memoryview(data).cast("B")
+    for read, code in enumerate(codes):
+        column = lookup[code] if code < size else REJECTED
+        if column < 0:
+            return read, written, REJECTED
+        index = state * width + column
+        output_id = outputs[index]
+        start, end = offsets[output_id], offsets[output_id + 1]
+        if written + end - start > len(target):
+            raise ValueError("out is too small for the outputs")
+        target[written : written + end - start] = source[start:end]
+        written += end - start
+        state = transitions[index]
+    return len(data), written, state
@@ -0,0 +1,71 @@
+from threading import Lock
+
+from ._compiled_table import CompiledTable
+
+UNEXPLORED = -1
+"""Marks a transition of the search automaton that has not been built yet"""
+
+
+class SearchAutomaton:
+    """
+    Lazily built automaton recognizing every input ending with a word of the language.
+
+    Running the original automaton from every position of a text is quadratic. Instead,
+    this automaton tracks the set of states of all the runs started so far at once: each
+    of its states is a set of compiled state ids, and every step adds a fresh run from
+    the initial state. Subsets are only materialized (and cached) when the text reaches
+    them, so the exponential worst case of the subset construction is only paid for the
+    states actually visited. Reading `rows` takes no lock, while expanding it is
+    serialized so that threads scanning at the same time agree on the subset ids.
+
+    Attributes:
+        rows: Transitions between subset ids by symbol class id, `UNEXPLORED` if not
+            built yet.
+        accepting: Whether each subset contains a final state of the original automaton.
+        initial_state: Id of the subset containing only the initial state.
+    """
+
+    rows: list[list[int]]
+    accepting: list[bool]
+    initial_state: int
+    _table: CompiledTable
+    _subsets: list[frozenset[int]]
+    _subset_ids: dict[frozenset[int], int]
+    _lock: Lock
+
+    def __init__(self, table: CompiledTable) -> None:
+        self._table = table
+        self._lock = Lock()
+        self._subsets = []
+        self._subset_ids = {}
+        self.rows = []
+        self.accepting = []
+        self.initial_state = self._add_subset(frozenset([table.initial_state]))
+
+    def expand(self, state: int, class_id: int) -> int:
+        """
+        Builds (and caches) the transition from a subset with the given symbol class
+        """
+        transitions = self._table.transitions
+        with self._lock:
+            next_state = self.rows[state][class_id]
+            if next_state != UNEXPLORED:  # Expanded by another thread meanwhile
+                return next_state
+            subset = frozenset(
+                [transitions[original][class_id] for original in self._subsets[state]]
+                + [self._table.initial_state]
+            )
+            next_state = self._subset_ids.get(subset)
+            if next_state is None:
+                next_state = self._add_subset(subset)
+            self.rows[state][class_id] = next_state
+            return next_state
+
+    def _add_subset(self, subset: frozenset[int]) -> int:
+        # The row is complete before its id can be found in `rows` by other threads
+        state = len(self._subsets)
+        self.accepting.append(not subset.isdisjoint(self._table.final_states))
+        self.rows.append([UNEXPLORED] * self._table.num_classes)
+        self._subsets.append(subset)
+        self._subset_ids[subset] = state
+        return state
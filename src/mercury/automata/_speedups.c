@@ -0,0 +1,647 @@
+/*
+ * Compiled run loops over the integer tables of `CompiledTable`.
+ *
+ * Mirrors `mercury/automata/_run.py`, which is the reference implementation and the
+ * fallback when this extension could not be built. Both must return the same results.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#define REJECTED (-1)
+#define CORRUPT (-2)
+
+/* Inputs shorter than this are run without releasing the GIL */
+#define RELEASE_GIL_LENGTH 4096
+
+/* Symbols stepped through at once by transduce before filling the tape */
+#define CHUNK_SIZE 65536
+
+typedef struct {
+    Py_buffer lookup;
+    Py_buffer transitions;
+    Py_buffer outputs;
+    Py_ssize_t width;
+    Py_ssize_t num_states;
+} Table;
+
+static int
+get_int_buffer(PyObject *object, Py_buffer *view, const char *name, int flags)
+{
+    if (PyObject_GetBuffer(object, view, flags | PyBUF_FORMAT | PyBUF_C_CONTIGUOUS) < 0) {
+        return -1;
+    }
+    if (view->itemsize != sizeof(int) || view->format == NULL ||
+        (strcmp(view->format, "i") != 0 && strcmp(view->format, "@i") != 0)) {
+        PyErr_Format(PyExc_TypeError, "%s must be an array of C ints", name);
+        PyBuffer_Release(view);
+        return -1;
+    }
+    return 0;
+}
+
+static void
+release_table(Table *table)
+{
+    if (table->lookup.obj != NULL) {
+        PyBuffer_Release(&table->lookup);
+    }
+    if (table->transitions.obj != NULL) {
+        PyBuffer_Release(&table->transitions);
+    }
+    if (table->outputs.obj != NULL) {
+        PyBuffer_Release(&table->outputs);
+    }
+}
+
+static int
+acquire_table(Table *table, PyObject *lookup, PyObject *transitions,
+              PyObject *outputs, Py_ssize_t width, Py_ssize_t state)
+{
+    memset(table, 0, sizeof(Table));
+    if (get_int_buffer(lookup, &table->lookup, "lookup", 0) < 0 ||
+        get_int_buffer(transitions, &table->transitions, "transitions", 0) < 0 ||
+        (outputs != NULL &&
+         get_int_buffer(outputs, &table->outputs, "outputs", 0) < 0)) {
+        release_table(table);
+        return -1;
+    }
+
+    Py_ssize_t size = table->transitions.len / (Py_ssize_t)sizeof(int);
+    if (width <= 0 || size % width != 0) {
+        PyErr_SetString(PyExc_ValueError, "transitions must hold rows of width items");
+        release_table(table);
+        return -1;
+    }
+    if (outputs != NULL && table->outputs.len != table->transitions.len) {
+        PyErr_SetString(PyExc_ValueError, "outputs must be laid out like transitions");
+        release_table(table);
+        return -1;
+    }
+    table->width = width;
+    table->num_states = size / width;
+    if (state < 0 || state >= table->num_states) {
+        PyErr_SetString(PyExc_ValueError, "initial state is not part of the table");
+        release_table(table);
+        return -1;
+    }
+    return 0;
+}
+
+/*
+ * Steps through the table for every code point of the input, storing the index into the
+ * flat table of each transition taken in `taken` and the state reached after each symbol
+ * in `visited` (when not NULL). Returns the state it ends on, REJECTED on a symbol
+ * outside of the alphabet, or CORRUPT if the table leads outside of itself. Stops early
+ * once it reaches `sink` (REJECTED to never stop). `*read` is set to the amount of
+ * symbols read. Doesn't touch any Python object, so it can run without holding the GIL.
+ */
+#define STEP_LOOP(TYPE)                                                              \
+    {                                                                                \
+        const TYPE *codes = (const TYPE *)data;                                      \
+        for (i = 0; i < length; i++) {                                               \
+            Py_UCS4 code = codes[i];                                                 \
+            int column = code < lookup_size ? lookup[code] : REJECTED;               \
+            if (column < 0 || column >= width) {                                     \
+                *read = i;                                                           \
+                return REJECTED;                                                     \
+            }                                                                        \
+            Py_ssize_t index = state * width + column;                               \
+            if (taken != NULL) {                                                     \
+                taken[i] = index;                                                    \
+            }                                                                        \
+            state = transitions[index];                                              \
+            if (state < 0 || state >= num_states) {                                  \
+                return CORRUPT;                                                      \
+            }                                                                        \
+            if (visited != NULL) {                                                   \
+                visited[i] = (int)state;                                             \
+            }                                                                        \
+            if (state == sink) {                                                     \
+                *read = i + 1;                                                       \
+                return state;                                                        \
+            }                                                                        \
+        }                                                                            \
+    }
+
+static Py_ssize_t
+step(const Table *table, Py_ssize_t state, Py_ssize_t sink, int kind,
+     const void *data, Py_ssize_t length, Py_ssize_t *taken, int *visited,
+     Py_ssize_t *read)
+{
+    const int *lookup = (const int *)table->lookup.buf;
+    const int *transitions = (const int *)table->transitions.buf;
+    Py_UCS4 lookup_size = (Py_UCS4)(table->lookup.len / (Py_ssize_t)sizeof(int));
+    Py_ssize_t width = table->width;
+    Py_ssize_t num_states = table->num_states;
+    Py_ssize_t i;
+
+    switch (kind) {
+    case PyUnicode_1BYTE_KIND:
+        STEP_LOOP(Py_UCS1)
+        break;
+    case PyUnicode_2BYTE_KIND:
+        STEP_LOOP(Py_UCS2)
+        break;
+    default:
+        STEP_LOOP(Py_UCS4)
+        break;
+    }
+    *read = length;
+    return state;
+}
+
+static PyObject *
+table_error(void)
+{
+    PyErr_SetString(PyExc_ValueError, "transitions lead outside of the table");
+    return NULL;
+}
+
+/* Runs `step`, releasing the GIL if the input is long enough to be worth it */
+#define RUN_STEPS(RESULT, TABLE, STATE, SINK, KIND, DATA, LENGTH, TAKEN, VISITED, READ) \
+    if ((LENGTH) >= RELEASE_GIL_LENGTH) {                                              \
+        Py_BEGIN_ALLOW_THREADS                                                         \
+        RESULT = step(TABLE, STATE, SINK, KIND, DATA, LENGTH, TAKEN, VISITED, READ);   \
+        Py_END_ALLOW_THREADS                                                           \
+    }                                                                                  \
+    else {                                                                             \
+        RESULT = step(TABLE, STATE, SINK, KIND, DATA, LENGTH, TAKEN, VISITED, READ);   \
+    }
+
+/*
+ * Exposes the input as an array of code points: the data of a str, or the bytes of
+ * a bytes-like object (read as code points below 256)
+ */
+static int
+get_codes(PyObject *input, Py_buffer *view, int *kind, const void **data,
+          Py_ssize_t *length)
+{
+    view->obj = NULL;
+    if (PyUnicode_Check(input)) {
+        *kind = PyUnicode_KIND(input);
+        *data = PyUnicode_DATA(input);
+        *length = PyUnicode_GET_LENGTH(input);
+        return 0;
+    }
+    if (PyObject_GetBuffer(input, view, PyBUF_C_CONTIGUOUS) < 0) {
+        return -1;
+    }
+    *kind = PyUnicode_1BYTE_KIND;
+    *data = view->buf;
+    *length = view->len;
+    return 0;
+}
+
+PyDoc_STRVAR(run_doc,
+"run(lookup, transitions, width, state, data, sink=-1)\n"
+"--\n\n"
+"Runs the input through a flat transition table, see `_run.run`.");
+
+static PyObject *
+speedups_run(PyObject *module, PyObject *args)
+{
+    PyObject *lookup, *transitions, *input;
+    Py_ssize_t width, state, sink = REJECTED;
+    if (!PyArg_ParseTuple(args, "OOnnO|n:run", &lookup, &transitions, &width, &state,
+                          &input, &sink)) {
+        return NULL;
+    }
+
+    Table table;
+    if (acquire_table(&table, lookup, transitions, NULL, width, state) < 0) {
+        return NULL;
+    }
+    Py_buffer view;
+    int kind;
+    const void *data;
+    Py_ssize_t length, read;
+    if (get_codes(input, &view, &kind, &data, &length) < 0) {
+        release_table(&table);
+        return NULL;
+    }
+
+    Py_ssize_t result;
+    RUN_STEPS(result, &table, state, sink, kind, data, length, NULL, NULL, &read);
+
+    if (view.obj != NULL) {
+        PyBuffer_Release(&view);
+    }
+    release_table(&table);
+    if (result == CORRUPT) {
+        return table_error();
+    }
+    return PyLong_FromSsize_t(result);
+}
+
+/* Runs `step` over every input of a batch, returning 1 if the table is corrupt */
+static int
+step_batch(const Table *table, Py_ssize_t state, Py_ssize_t sink, Py_ssize_t count,
+           const int *kinds, const void **datas, const Py_ssize_t *lengths, int *states)
+{
+    Py_ssize_t i, read;
+    for (i = 0; i < count; i++) {
+        Py_ssize_t end = step(table, state, sink, kinds[i], datas[i], lengths[i], NULL,
+                              NULL, &read);
+        if (end == CORRUPT) {
+            return 1;
+        }
+        states[i] = (int)end;
+    }
+    return 0;
+}
+
+PyDoc_STRVAR(run_many_doc,
+"run_many(lookup, transitions, width, state, inputs, sink, out)\n"
+"--\n\n"
+"Runs every input from the same state into out, see `_run.run_many`.");
+
+static PyObject *
+speedups_run_many(PyObject *module, PyObject *args)
+{
+    PyObject *lookup, *transitions, *inputs, *out;
+    Py_ssize_t width, state, sink;
+    if (!PyArg_ParseTuple(args, "OOnnOnO:run_many", &lookup, &transitions, &width,
+                          &state, &inputs, &sink, &out)) {
+        return NULL;
+    }
+
+    /* A tuple keeps every input alive even if the sequence is changed meanwhile */
+    PyObject *batch = PySequence_Tuple(inputs);
+    if (batch == NULL) {
+        return NULL;
+    }
+    Py_ssize_t count = PyTuple_GET_SIZE(batch);
+    Table table;
+    if (acquire_table(&table, lookup, transitions, NULL, width, state) < 0) {
+        Py_DECREF(batch);
+        return NULL;
+    }
+    Py_buffer out_view;
+    if (get_int_buffer(out, &out_view, "out", PyBUF_WRITABLE) < 0) {
+        release_table(&table);
+        Py_DECREF(batch);
+        return NULL;
+    }
+
+    PyObject *result = NULL;
+    Py_ssize_t acquired = 0, total = 0, i;
+    Py_buffer *views = PyMem_Calloc(count ? count : 1, sizeof(Py_buffer));
+    int *kinds = PyMem_Calloc(count ? count : 1, sizeof(int));
+    const void **datas = PyMem_Calloc(count ? count : 1, sizeof(void *));
+    Py_ssize_t *lengths = PyMem_Calloc(count ? count : 1, sizeof(Py_ssize_t));
+    if (views == NULL || kinds == NULL || datas == NULL || lengths == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    if (out_view.len / (Py_ssize_t)sizeof(int) < count) {
+        PyErr_SetString(PyExc_ValueError, "out must hold an item per input");
+        goto done;
+    }
+    for (; acquired < count; acquired++) {
+        if (get_codes(PyTuple_GET_ITEM(batch, acquired), &views[acquired],
+                      &kinds[acquired], &datas[acquired], &lengths[acquired]) < 0) {
+            goto done;
+        }
+        total += lengths[acquired];
+    }
+
+    int *states = (int *)out_view.buf;
+    int corrupt;
+    if (total >= RELEASE_GIL_LENGTH) {
+        Py_BEGIN_ALLOW_THREADS
+        corrupt = step_batch(&table, state, sink, count, kinds, datas, lengths, states);
+        Py_END_ALLOW_THREADS
+    }
+    else {
+        corrupt = step_batch(&table, state, sink, count, kinds, datas, lengths, states);
+    }
+    if (corrupt) {
+        table_error();
+        goto done;
+    }
+    result = Py_NewRef(Py_None);
+
+done:
+    for (i = 0; i < acquired; i++) {
+        if (views[i].obj != NULL) {
+            PyBuffer_Release(&views[i]);
+        }
+    }
+    PyMem_Free(views);
+    PyMem_Free(kinds);
+    PyMem_Free(datas);
+    PyMem_Free(lengths);
+    PyBuffer_Release(&out_view);
+    release_table(&table);
+    Py_DECREF(batch);
+    return result;
+}
+
+PyDoc_STRVAR(transduce_doc,
+"transduce(lookup, transitions, outputs, strings, width, state, data)\n"
+"--\n\n"
+"Runs the input collecting the output of every transition, see `_run.transduce`.");
+
+static PyObject *
+speedups_transduce(PyObject *module, PyObject *args)
+{
+    PyObject *lookup, *transitions, *outputs, *strings, *input;
+    Py_ssize_t width, state;
+    if (!PyArg_ParseTuple(args, "OOOOnnO:transduce", &lookup, &transitions, &outputs,
+                          &strings, &width, &state, &input)) {
+        return NULL;
+    }
+
+    PyObject *sequence = PySequence_Fast(strings, "strings must be a sequence");
+    if (sequence == NULL) {
+        return NULL;
+    }
+    Table table;
+    if (acquire_table(&table, lookup, transitions, outputs, width, state) < 0) {
+        Py_DECREF(sequence);
+        return NULL;
+    }
+    Py_buffer view;
+    int kind;
+    const void *data;
+    Py_ssize_t length, read;
+    if (get_codes(input, &view, &kind, &data, &length) < 0) {
+        release_table(&table);
+        Py_DECREF(sequence);
+        return NULL;
+    }
+
+    PyObject *result = NULL;
+    PyObject *tape = PyList_New(length);
+    Py_ssize_t *taken = PyMem_Malloc(CHUNK_SIZE * sizeof(Py_ssize_t));
+    if (tape == NULL || taken == NULL) {
+        if (taken == NULL) {
+            PyErr_NoMemory();
+        }
+        goto done;
+    }
+
+    /* Steps through the input one chunk at a time, filling the tape between chunks
+       as the output table maps into objects, which needs the GIL */
+    const int *output_ids = (const int *)table.outputs.buf;
+    Py_ssize_t num_strings = PySequence_Fast_GET_SIZE(sequence);
+    PyObject **items = PySequence_Fast_ITEMS(sequence);
+    Py_ssize_t position = 0;
+    while (position < length) {
+        Py_ssize_t chunk = length - position < CHUNK_SIZE ? length - position
+                                                          : CHUNK_SIZE;
+        const char *chunk_data = (const char *)data + position * kind;
+        RUN_STEPS(state, &table, state, REJECTED, kind, chunk_data, chunk, taken, NULL,
+                  &read);
+        if (state == CORRUPT) {
+            table_error();
+            goto done;
+        }
+        for (Py_ssize_t i = 0; i < read; i++) {
+            int output_id = output_ids[taken[i]];
+            if (output_id < 0 || output_id >= num_strings) {
+                PyErr_SetString(PyExc_ValueError, "outputs lead outside of strings");
+                goto done;
+            }
+            PyObject *item = items[output_id];
+            Py_INCREF(item);
+            PyList_SET_ITEM(tape, position + i, item);
+        }
+        position += read;
+        if (state == REJECTED) {
+            break;
+        }
+    }
+
+    if (position < length && PyList_SetSlice(tape, position, length, NULL) < 0) {
+        goto done;
+    }
+    result = Py_BuildValue("(On)", tape, state);
+
+done:
+    Py_XDECREF(tape);
+    PyMem_Free(taken);
+    if (view.obj != NULL) {
+        PyBuffer_Release(&view);
+    }
+    release_table(&table);
+    Py_DECREF(sequence);
+    return result;
+}
+
+PyDoc_STRVAR(transduce_into_doc,
+"transduce_into(lookup, transitions, outputs, blob, offsets, width, state, data, out)\n"
+"--\n\n"
+"Runs the input writing the output of every transition into out, see\n"
+"`_run.transduce_into`.");
+
+/*
+ * Copies the outputs of the transitions in `taken` back to back into `out`, starting
+ * at `*written` and advancing it. Returns -1 with an exception set when an output
+ * lies outside of the blob or doesn't fit into `out`.
+ */
+static int
+write_outputs(const Table *table, const Py_ssize_t *taken, Py_ssize_t read,
+              const Py_buffer *blob, const Py_buffer *offsets, const Py_buffer *out,
+              Py_ssize_t *written)
+{
+    const int *output_ids = (const int *)table->outputs.buf;
+    const int *bounds = (const int *)offsets->buf;
+    Py_ssize_t num_outputs = offsets->len / (Py_ssize_t)sizeof(int) - 1;
+    const char *source = (const char *)blob->buf;
+    char *target = (char *)out->buf;
+    Py_ssize_t position = *written;
+
+    for (Py_ssize_t i = 0; i < read; i++) {
+        int output_id = output_ids[taken[i]];
+        if (output_id < 0 || output_id >= num_outputs) {
+            PyErr_SetString(PyExc_ValueError, "outputs lead outside of offsets");
+            return -1;
+        }
+        Py_ssize_t start = bounds[output_id];
+        Py_ssize_t size = bounds[output_id + 1] - start;
+        if (start < 0 || size < 0 || start + size > blob->len) {
+            PyErr_SetString(PyExc_ValueError, "offsets lead outside of blob");
+            return -1;
+        }
+        if (size > out->len - position) {
+            PyErr_SetString(PyExc_ValueError, "out is too small for the outputs");
+            return -1;
+        }
+        memcpy(target + position, source + start, size);
+        position += size;
+    }
+    *written = position;
+    return 0;
+}
+
+static PyObject *
+speedups_transduce_into(PyObject *module, PyObject *args)
+{
+    PyObject *lookup, *transitions, *outputs, *blob, *offsets, *input, *out;
+    Py_ssize_t width, state;
+    if (!PyArg_ParseTuple(args, "OOOOOnnOO:transduce_into", &lookup, &transitions,
+                          &outputs, &blob, &offsets, &width, &state, &input, &out)) {
+        return NULL;
+    }
+
+    Table table;
+    if (acquire_table(&table, lookup, transitions, outputs, width, state) < 0) {
+        return NULL;
+    }
+    Py_buffer blob_view, offsets_view, out_view, view;
+    blob_view.obj = offsets_view.obj = out_view.obj = view.obj = NULL;
+    PyObject *result = NULL;
+    Py_ssize_t *taken = NULL;
+    if (PyObject_GetBuffer(blob, &blob_view, PyBUF_C_CONTIGUOUS) < 0 ||
+        get_int_buffer(offsets, &offsets_view, "offsets", 0) < 0 ||
+        PyObject_GetBuffer(out, &out_view, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) < 0) {
+        goto done;
+    }
+    if (offsets_view.len < (Py_ssize_t)sizeof(int)) {
+        PyErr_SetString(PyExc_ValueError, "offsets must hold at least one item");
+        goto done;
+    }
+    int kind;
+    const void *data;
+    Py_ssize_t length, read;
+    if (get_codes(input, &view, &kind, &data, &length) < 0) {
+        goto done;
+    }
+    taken = PyMem_Malloc(CHUNK_SIZE * sizeof(Py_ssize_t));
+    if (taken == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+
+    /* Steps through the input one chunk at a time, copying the outputs in between */
+    Py_ssize_t position = 0, written = 0;
+    while (position < length) {
+        Py_ssize_t chunk = length - position < CHUNK_SIZE ? length - position
+                                                          : CHUNK_SIZE;
+        const char *chunk_data = (const char *)data + position * kind;
+        RUN_STEPS(state, &table, state, REJECTED, kind, chunk_data, chunk, taken, NULL,
+                  &read);
+        if (state == CORRUPT) {
+            table_error();
+            goto done;
+        }
+        if (write_outputs(&table, taken, read, &blob_view, &offsets_view, &out_view,
+                          &written) < 0) {
+            goto done;
+        }
+        position += read;
+        if (state == REJECTED) {
+            break;
+        }
+    }
+    result = Py_BuildValue("(nnn)", position, written, state);
+
+done:
+    PyMem_Free(taken);
+    if (view.obj != NULL) {
+        PyBuffer_Release(&view);
+    }
+    if (out_view.obj != NULL) {
+        PyBuffer_Release(&out_view);
+    }
+    if (offsets_view.obj != NULL) {
+        PyBuffer_Release(&offsets_view);
+    }
+    if (blob_view.obj != NULL) {
+        PyBuffer_Release(&blob_view);
+    }
+    release_table(&table);
+    return result;
+}
+
+PyDoc_STRVAR(trace_doc,
+"trace(lookup, transitions, width, state, data, out)\n"
+"--\n\n"
+"Runs the input writing every state it goes through into out, see `_run.trace`.");
+
+static PyObject *
+speedups_trace(PyObject *module, PyObject *args)
+{
+    PyObject *lookup, *transitions, *input, *out;
+    Py_ssize_t width, state;
+    if (!PyArg_ParseTuple(args, "OOnnOO:trace", &lookup, &transitions, &width, &state,
+                          &input, &out)) {
+        return NULL;
+    }
+
+    Table table;
+    if (acquire_table(&table, lookup, transitions, NULL, width, state) < 0) {
+        return NULL;
+    }
+    Py_buffer out_view;
+    if (get_int_buffer(out, &out_view, "out", PyBUF_WRITABLE) < 0) {
+        release_table(&table);
+        return NULL;
+    }
+    Py_buffer view;
+    int kind;
+    const void *data;
+    Py_ssize_t length, read;
+    if (get_codes(input, &view, &kind, &data, &length) < 0) {
+        PyBuffer_Release(&out_view);
+        release_table(&table);
+        return NULL;
+    }
+
+    PyObject *result = NULL;
+    if (out_view.len / (Py_ssize_t)sizeof(int) <= length) {
+        PyErr_SetString(PyExc_ValueError, "out must hold one more item than data");
+        goto done;
+    }
+    int *visited = (int *)out_view.buf;
+    visited[0] = (int)state;
+    Py_ssize_t final_state;
+    RUN_STEPS(final_state, &table, state, REJECTED, kind, data, length, NULL,
+              visited + 1, &read);
+    if (final_state == CORRUPT) {
+        table_error();
+        goto done;
+    }
+    result = PyLong_FromSsize_t(read + 1);
+
+done:
+    if (view.obj != NULL) {
+        PyBuffer_Release(&view);
+    }
+    PyBuffer_Release(&out_view);
+    release_table(&table);
+    return result;
+}
+
+static PyMethodDef speedups_methods[] = {
+    {"run", speedups_run, METH_VARARGS, run_doc},
+    {"run_many", speedups_run_many, METH_VARARGS, run_many_doc},
+    {"trace", speedups_trace, METH_VARARGS, trace_doc},
+    {"transduce", speedups_transduce, METH_VARARGS, transduce_doc},
+    {"transduce_into", speedups_transduce_into, METH_VARARGS, transduce_into_doc},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef speedups_module = {
+    PyModuleDef_HEAD_INIT,
+    "_speedups",
+    "Compiled run loops over the integer tables of the automata",
+    -1,
+    speedups_methods,
+};
+
+PyMODINIT_FUNC
+PyInit__speedups(void)
+{
+    PyObject *module = PyModule_Create(&speedups_module);
+#ifdef Py_GIL_DISABLED
+    /* The run loops only read tables and inputs that are never changed in place */
+    if (module != NULL && PyUnstable_Module_SetGIL(module, Py_MOD_GIL_NOT_USED) < 0) {
+        Py_DECREF(module);
+        return NULL;
+    }
+#endif
+    return module;
+}
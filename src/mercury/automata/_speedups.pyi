@@ -0,0 +1,50 @@
+from array import array
+from collections.abc import Buffer, Sequence
+
+from mercury.types import InputBytes
+
+def run(
+    lookup: array[int],
+    transitions: array[int],
+    width: int,
+    state: int,
+    data: str | InputBytes,
+    sink: int = ...,
+) -> int: ...
+def run_many(
+    lookup: array[int],
+    transitions: array[int],
+    width: int,
+    state: int,
+    inputs: Sequence[str | InputBytes],
+    sink: int,
+    out: Buffer,
+) -> None: ...
+def trace(
+    lookup: array[int],
+    transitions: array[int],
+    width: int,
+    state: int,
+    data: str | InputBytes,
+    out: Buffer,
+) -> int: ...
+def transduce[T: (str, bytes)](
+    lookup: array[int],
+    transitions: array[int],
+    outputs: array[int],
+    strings: Sequence[T],
+    width: int,
+    state: int,
+    data: str | InputBytes,
+) -> tuple[list[T], int]: ...
+def transduce_into(
+    lookup: array[int],
+    transitions: array[int],
+    outputs: array[int],
+    blob: Buffer,
+    offsets: array[int],
+    width: int,
+    state: int,
+    data: str | InputBytes,
+    out: Buffer,
+) -> tuple[int, int, int]: ...
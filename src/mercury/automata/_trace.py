@@ -0,0 +1,55 @@
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from mercury.types import State
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+
+class RunLengthTrace:
+    """
+    States an automaton went through while reading an input, compressed into runs
+
+    Consecutive steps on the same state are stored once along with the length of the
+    run, so inputs that spend most of their time looping in a few states take memory
+    proportional to the amount of state changes instead of their length. State ids are
+    aligned with the compiled table of the automaton, whose states are shared rather
+    than decoded for every step.
+
+    Attributes:
+        states: States of the automaton indexed by their id, shared with its compiled
+            table.
+        state_ids: Id of the state of each run.
+        lengths: Amount of consecutive steps spent on the state of each run.
+    """
+
+    states: tuple[State, ...]
+    state_ids: "NDArray[np.int32]"
+    lengths: "NDArray[np.int64]"
+
+    def __init__(
+        self,
+        states: tuple[State, ...],
+        state_ids: "NDArray[np.int32]",
+        lengths: "NDArray[np.int64]",
+    ) -> None:
+        self.states = states
+        self.state_ids = state_ids
+        self.lengths = lengths
+
+    def __len__(self) -> int:
+        """Amount of steps of the trace, including the initial state"""
+        return int(self.lengths.sum())
+
+    def runs(self) -> Iterator[tuple[State, int]]:
+        """Yields each run as its state and length"""
+        for state_id, length in zip(self.state_ids.tolist(), self.lengths.tolist()):
+            yield self.states[state_id], length
+
+    def expand(self) -> "NDArray[np.int32]":
+        """Uncompressed trace, with the id of the state of every step"""
+        import numpy as np
+
+        return np.repeat(self.state_ids, self.lengths)
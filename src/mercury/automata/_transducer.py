@@ -0,0 +1,122 @@
+from collections.abc import Hashable, Iterable, Mapping, Sequence
+from typing import override
+
+from mercury.decorators import DeltaFunction, OutputFunction
+from mercury.exceptions import InvalidReturnTypeException
+from mercury.types import InputState, InputSymbol, State
+
+from . import _canonical
+from ._compiled_table import CompiledTable
+from ._deterministic_finite_automata import DeterministicFiniteAutomata
+from ._output_tape import OutputTape
+
+
+class Transducer(DeterministicFiniteAutomata):
+    """
+    Base of the transducers, which resolve the output of every transition once while
+    building (and rebuilding) and store them in the compiled table next to the
+    transitions. Subclasses only decide which outputs are valid for a transition, see
+    `_transition_output`, and what is done with them when transducing.
+    """
+
+    _output_function: OutputFunction
+    _output_mappings: dict[State, dict[InputSymbol, int]]
+    _tape: OutputTape
+
+    def __init__(
+        self,
+        states: Iterable[InputState],
+        input_symbols: Iterable[InputSymbol],
+        initial_state: InputState,
+        final_states: Iterable[InputState],
+        transition_function: DeltaFunction,
+        output_function: OutputFunction,
+        collect_stats: bool = False,
+    ) -> None:
+        """
+        Initialize the transducer with the specified states, input symbols, initial
+        state, accepting states, transition function, and output function.
+
+        Args:
+            states: An iterable of all possible internal states (strings).
+            input_symbols: An iterable of allowed input symbols.
+            initial_state: String representation of the initial state.
+            final_states: An iterable containing string representations of accepting
+                states.
+            transition_function: A DeltaFunction mapping current states and input
+                symbols to next states.
+            output_function: An OutputFunction mapping current states and input symbols
+                to outputs, either strings or bytes for every transition.
+            collect_stats: Whether to record construction times and runtime counters,
+                also counting the calls to the transition and output functions for this
+                automaton alone (see `DeltaFunction.with_stats`).
+        """
+        # Outputs are resolved while building the automaton, see `_build`
+        self._output_function = (
+            output_function.with_stats() if collect_stats else output_function
+        )
+
+        super().__init__(
+            states,
+            input_symbols,
+            initial_state,
+            final_states,
+            transition_function,
+            collect_stats,
+        )
+        if self._stats is not None:
+            self._stats.output_function = self._output_function.stats
+
+    @override
+    def _build(self) -> None:
+        with self._phase("outputs"):
+            self._output_mappings = self._generate_outputs()
+        super()._build()
+
+    @override
+    def _compile(
+        self, outputs: Mapping[State, Mapping[InputSymbol, int]] | None = None
+    ) -> CompiledTable:
+        return super()._compile(self._output_mappings if outputs is None else outputs)
+
+    def _generate_outputs(self) -> dict[State, dict[InputSymbol, int]]:
+        """
+        Calls the output function for every state and symbol, returning the id of each
+        output (indexing the outputs of `_tape`, where equal outputs are only stored
+        once) and laying out the outputs for the run loops. Every output must have the
+        type of the first one
+        """
+        output_ids: dict[str | bytes, int] = {}
+        mappings: dict[State, dict[InputSymbol, int]] = {}
+        output_type: type[str] | type[bytes] = str
+        for state in self.states:
+            mappings[state] = {}
+            for symbol in self._input_symbols:
+                output = self._transition_output(state, symbol)
+                if not output_ids:
+                    output_type = type(output)
+                elif not isinstance(output, output_type):
+                    raise InvalidReturnTypeException(
+                        "OutputFunction", output_type, type(output), output
+                    )
+                mappings[state][symbol] = output_ids.setdefault(output, len(output_ids))
+        self._tape = OutputTape(
+            tuple(output_ids), output_type  # pyright: ignore[reportArgumentType]
+        )
+        return mappings
+
+    def _transition_output(self, state: State, symbol: InputSymbol) -> str | bytes:
+        """Output of the transition from the state with the symbol"""
+        return self._output_function(args=state, next_symbol=symbol)
+
+    @override
+    def _canonical_extras(
+        self,
+    ) -> tuple[_canonical.StateLabel | None, Sequence[Hashable] | None]:
+        return None, self._tape.outputs
+
+    @override
+    def _generated_outputs(
+        self,
+    ) -> tuple[tuple[str, ...] | tuple[bytes, ...] | None, str | bytes]:
+        return self._tape.outputs, self._tape.output_type()
@@ -1,13 +1,16 @@
 import inspect
 from collections.abc import Hashable
+from copy import copy
+from time import perf_counter
 from types import NoneType
-from typing import Callable, cast
+from typing import Callable, Self, cast
 
 from mercury.exceptions import (
     MissingDefinitionException,
     MissingNextParameterException,
     MissingTypeHintException,
 )
+from mercury.profiling import FunctionStats
 from mercury.types import InputState, Registry
 
 NEXT_SYMBOL_KEYWORD_NAME = "next"
@@ -24,23 +27,74 @@ class DeltaFunction:
     """
 
     _registry: Registry
+    _stats: FunctionStats | None
 
     def __init__(self) -> None:
         self._registry = {}
+        self._stats = None
 
     def __call__(
         self,
         args: tuple[Hashable],
         next_symbol: str,
     ):
-        type_args = tuple([type(arg) for arg in args])
+        type_args = self.signature(args)
 
         if type_args not in self._registry:
             raise MissingDefinitionException(self._registry, args, next_symbol)
 
         resolver = self._registry[type_args]
 
-        return resolver(*args, **{NEXT_SYMBOL_KEYWORD_NAME: next_symbol})
+        if self._stats is None:
+            return resolver(*args, **{NEXT_SYMBOL_KEYWORD_NAME: next_symbol})
+
+        start = perf_counter()
+        try:
+            return resolver(*args, **{NEXT_SYMBOL_KEYWORD_NAME: next_symbol})
+        finally:
+            self._stats.record(type_args, perf_counter() - start)
+
+    @staticmethod
+    def signature(args: tuple[Hashable, ...]) -> tuple[type, ...]:
+        """Types of the values of a state, which pick the definition that handles it"""
+        return tuple([type(arg) for arg in args])
+
+    @property
+    def definitions(self) -> Registry:
+        """
+        Copy of the definitions of the function, by the types of the states they handle
+        """
+        return dict(self._registry)
+
+    @property
+    def stats(self) -> FunctionStats | None:
+        """Call counts and time spent per definition, None unless stats are enabled"""
+        return self._stats
+
+    def enable_stats(self) -> FunctionStats:
+        """
+        Starts counting the calls and cumulative time spent in each definition of the
+        function, returning the stats object that will hold them. Calling it again keeps
+        the existing counters
+        """
+        if self._stats is None:
+            self._stats = FunctionStats()
+        return self._stats
+
+    def disable_stats(self) -> None:
+        """Stops counting calls to the definitions of the function"""
+        self._stats = None
+
+    def with_stats(self) -> Self:
+        """
+        Copy of the function that counts its calls in stats of its own, while sharing
+        the definitions of this one (including the ones added later). Automata built
+        with `collect_stats=True` call such a copy, leaving the stats of this function
+        as they were for any other automaton using it
+        """
+        function = copy(self)
+        function._stats = FunctionStats()
+        return function
 
     def definition(self):
         """
@@ -19,7 +19,8 @@ class OutputFunction(DeltaFunction):
     between states and outputs.
 
     Rules for the output function are similar to the delta function, but
-    you must return an output symbol from the alphabet (usually one character)
+    you must return an output symbol from the alphabet (usually one character),
+    or any string or bytes for the outputs of a `MealyTransducer`
     """
 
     @override
@@ -29,7 +30,7 @@ class OutputFunction(DeltaFunction):
         next_symbol: str,
     ):
         response = super().__call__(args, next_symbol)
-        if not isinstance(response, str):
+        if not isinstance(response, str | bytes):
             raise InvalidReturnTypeException(
                 "OutputFunction", str, type(response), response
             )
@@ -75,3 +75,40 @@ class WrongArgumentException(Exception):
         super().__init__(
             f"Expected to find class '{expected_class.__name__}' as input, recieved '{found_class.__name__}' instead"
         )
+
+
+class MissingDependencyException(Exception):
+    def __init__(self, package: str, extra: str) -> None:
+        super().__init__(
+            f"Missing optional dependency '{package}', "
+            f"install it directly or through mercury-lib[{extra}]"
+        )
+
+
+class StatsNotCollectedException(Exception):
+    def __init__(self) -> None:
+        super().__init__(
+            "Automata was built without stats, "
+            "construct it with `collect_stats=True` in order to export metrics"
+        )
+
+
+class InvalidRegexException(Exception):
+    def __init__(self, pattern: str, position: int, reason: str) -> None:
+        super().__init__(
+            f"Could not compile regular expression '{pattern}' "
+            f"at position {position}: {reason}"
+        )
+
+
+class UnsupportedAlphabetException(Exception):
+    def __init__(self, mode: str, requirement: str) -> None:
+        super().__init__(f"Could not run the automata in {mode} mode, {requirement}")
+
+
+class InvalidSymbolException(Exception):
+    def __init__(self, symbol: str, position: int) -> None:
+        super().__init__(
+            f"Could not read symbol '{symbol}' at position {position}, "
+            "it is not part of the input symbols of the automata"
+        )
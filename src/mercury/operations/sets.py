@@ -1,9 +1,17 @@
-from collections.abc import Set
-from typing import Hashable, TypeVar, override
+from collections.abc import Iterable, Iterator, Set
+from itertools import product
+from math import prod
+from typing import Hashable, TypeVar, cast, override
 
 T = TypeVar("T", bound=Hashable)
 U = TypeVar("U", bound=Hashable)
 
+LAZY_RANGE_MIN_SIZE = 1 << 16
+"""
+Ranges with at least this many integers are kept as lazy views by `S(range(...))`,
+smaller ones are stored in a regular `S`
+"""
+
 
 class S(frozenset[T]):
     """
@@ -13,6 +21,13 @@ class S(frozenset[T]):
     save for implementing both product and union operations using the traditional operations
     * and |, as to make syntax easier to read and use by students.
 
+    Products, unions involving them and sets of large ranges (see `LAZY_RANGE_MIN_SIZE`)
+    are lazy views (see `LazySet`) that don't store their elements, so declaring large
+    sets of states costs no memory. Chained products yield flat tuples, so
+    `S(a) * S(b) * S(c)` holds `(a, b, c)` instead of `((a, b), c)`. Lazy views compare
+    and hash just like a frozenset with the same elements, but are not instances of
+    `frozenset` (or of `S`).
+
     Examples with more detail on how to use S are in the documentation page. You may also use
     regular collections instead of this set on automata, these were made to be convenient to translate
     old GOLD-3 syntax and exercises into this newer version.
@@ -25,9 +40,177 @@ class S(frozenset[T]):
     ```
     """
 
-    def __mul__(self, other: "S[U]") -> "S[tuple[T, U]]":
-        return S((a, b) for a in self for b in other)
+    def __new__(cls, iterable: Iterable[T] = (), /) -> "S[T]":
+        if isinstance(iterable, range) and len(iterable) >= LAZY_RANGE_MIN_SIZE:
+            return RangeSet(iterable)  # pyright: ignore[reportReturnType]
+        return super().__new__(cls, cast(Iterable[T], iterable))
+
+    def __mul__(self, other: "Set[U]") -> "ProductSet":
+        return ProductSet(self, other)
 
     @override
     def __or__(self, other: "Set[Hashable]") -> "S[Hashable]":
+        if isinstance(other, LazySet):
+            return NotImplemented  # Left to `LazySet.__ror__`, keeping the view lazy
         return S(super().__or__(other))
+
+
+class LazySet(Set[T]):
+    """
+    A read only set computed from other sets instead of storing its elements.
+
+    Membership, length and iteration are answered from the parts of the set, which makes
+    products of large sets as cheap as their factors. Supports the * and | operations of
+    `S` (building further views), while the rest of the set operations return an `S`.
+    Equality and hashing follow frozensets, hashing goes through every element once.
+    """
+
+    _hash_value: int | None = None
+
+    @override
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Set):
+            return NotImplemented
+        return len(self) == len(other) and all(item in other for item in self)
+
+    @override
+    def __hash__(self) -> int:
+        if self._hash_value is None:
+            self._hash_value = self._hash()
+        return self._hash_value
+
+    def __mul__(self, other: "Set[Hashable]") -> "ProductSet":
+        return ProductSet(self, other)
+
+    def __rmul__(self, other: "Set[Hashable]") -> "ProductSet":
+        return ProductSet(other, self)
+
+    @override
+    def __or__(self, other: "Set[Hashable]") -> "UnionSet":  # pyright: ignore
+        if not isinstance(other, Set):
+            return NotImplemented
+        return UnionSet(self, other)
+
+    def __ror__(self, other: "Set[Hashable]") -> "UnionSet":
+        if not isinstance(other, Set):
+            return NotImplemented
+        return UnionSet(other, self)
+
+    @classmethod
+    @override
+    def _from_iterable(cls, it: Iterable[Hashable]) -> "S[Hashable]":  # pyright: ignore
+        return S(it)
+
+
+class RangeSet(LazySet[int]):
+    """Integers of a range, as built by `S(range(...))`"""
+
+    _range: range
+
+    def __init__(self, values: range) -> None:
+        self._range = values
+
+    @override
+    def __contains__(self, item: object) -> bool:
+        # Ranges compare non integers against every element, which would be linear
+        return isinstance(item, int) and item in self._range
+
+    @override
+    def __len__(self) -> int:
+        return len(self._range)
+
+    @override
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._range)
+
+    @override
+    def __repr__(self) -> str:
+        return f"S({self._range!r})"
+
+
+class ProductSet(LazySet[tuple[Hashable, ...]]):
+    """
+    Cartesian product of sets, holding flat tuples with an element of each factor.
+    Membership checks each component against its factor.
+    """
+
+    factors: tuple[Set[Hashable], ...]
+
+    def __init__(self, *factors: Set[Hashable]) -> None:
+        self.factors = tuple(
+            inner
+            for factor in factors
+            for inner in (
+                factor.factors if isinstance(factor, ProductSet) else (factor,)
+            )
+        )
+
+    @override
+    def __contains__(self, item: object) -> bool:
+        factors = self.factors
+        if not isinstance(item, tuple) or len(item) != len(factors):  # pyright: ignore
+            return False
+        return all(
+            component in factor
+            for component, factor in zip(item, factors)  # pyright: ignore
+        )
+
+    @override
+    def __len__(self) -> int:
+        return prod(map(len, self.factors))
+
+    @override
+    def __iter__(self) -> Iterator[tuple[Hashable, ...]]:
+        return product(*self.factors)
+
+    @override
+    def __repr__(self) -> str:
+        return " * ".join(map(repr, self.factors))
+
+
+class UnionSet(LazySet[Hashable]):
+    """
+    Union of sets, holding the elements of every part. Elements found in more than one
+    part are only counted and iterated once.
+    """
+
+    parts: tuple[Set[Hashable], ...]
+    _length: int | None
+
+    def __init__(self, *parts: Set[Hashable]) -> None:
+        self.parts = tuple(
+            inner
+            for part in parts
+            for inner in (part.parts if isinstance(part, UnionSet) else (part,))
+        )
+        self._length = None
+
+    @override
+    def __contains__(self, item: object) -> bool:
+        return any(item in part for part in self.parts)
+
+    @override
+    def __len__(self) -> int:
+        # Counts the largest part by its length, and only iterates through the rest
+        if self._length is None:
+            parts = sorted(self.parts, key=len, reverse=True)
+            length = len(parts[0]) if parts else 0
+            for i, part in enumerate(parts[1:], 1):
+                length += sum(
+                    1
+                    for item in part
+                    if not any(item in previous for previous in parts[:i])
+                )
+            self._length = length
+        return self._length
+
+    @override
+    def __iter__(self) -> Iterator[Hashable]:
+        for i, part in enumerate(self.parts):
+            for item in part:
+                if not any(item in previous for previous in self.parts[:i]):
+                    yield item
+
+    @override
+    def __repr__(self) -> str:
+        return " | ".join(map(repr, self.parts))
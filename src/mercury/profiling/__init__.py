@@ -0,0 +1,4 @@
+from ._coverage import Coverage
+from ._stats import AutomataStats, FunctionStats, Signature
+
+__all__ = ["AutomataStats", "Coverage", "FunctionStats", "Signature"]
@@ -0,0 +1,71 @@
+from typing import TYPE_CHECKING
+
+from mercury.types import InputSymbol, State
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+
+class Coverage:
+    """
+    Visit counts per state and per transition of an automaton over a batch of inputs
+
+    The arrays are aligned with the ids of the compiled table of the automaton, so
+    `state_visits[i]` counts the visits to `states[i]` and `transition_visits[i, j]`
+    counts the times the transition from `states[i]` with `symbols[j]` was taken. The
+    initial state is visited once per input, before reading any symbol.
+    """
+
+    states: tuple[State, ...]
+    symbols: tuple[InputSymbol, ...]
+    state_visits: "NDArray[np.int64]"
+    transition_visits: "NDArray[np.int64]"
+    _state_ids: dict[State, int]
+
+    def __init__(
+        self,
+        states: tuple[State, ...],
+        symbols: tuple[InputSymbol, ...],
+        state_visits: "NDArray[np.int64]",
+        transition_visits: "NDArray[np.int64]",
+    ) -> None:
+        self.states = states
+        self.symbols = symbols
+        self.state_visits = state_visits
+        self.transition_visits = transition_visits
+        self._state_ids = {state: i for i, state in enumerate(states)}
+
+    def visits(self, state: State) -> int:
+        """Amount of times the given state was visited"""
+        return int(self.state_visits[self._state_ids[state]])
+
+    def state_counts(self) -> dict[State, int]:
+        """Visits per state, keyed by the states of the automaton"""
+        return {
+            state: int(visits) for state, visits in zip(self.states, self.state_visits)
+        }
+
+    def transition_counts(self) -> dict[tuple[State, InputSymbol], int]:
+        """Visits per transition, keyed the same way as the automaton transitions"""
+        return {
+            (state, symbol): int(self.transition_visits[i, j])
+            for i, state in enumerate(self.states)
+            for j, symbol in enumerate(self.symbols)
+        }
+
+    def unvisited_states(self) -> frozenset[State]:
+        """States that no input went through, candidates for pruning"""
+        return frozenset(
+            state
+            for state, visits in zip(self.states, self.state_visits)
+            if visits == 0
+        )
+
+    def unvisited_transitions(self) -> frozenset[tuple[State, InputSymbol]]:
+        """Transitions that no input took"""
+        return frozenset(
+            transition
+            for transition, visits in self.transition_counts().items()
+            if visits == 0
+        )
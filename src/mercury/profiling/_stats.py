@@ -0,0 +1,110 @@
+from collections.abc import Generator
+from contextlib import contextmanager
+from time import perf_counter
+
+type Signature = tuple[type, ...]
+"""Type signature of a definition, the same key used by the `DeltaFunction` registry"""
+
+
+class FunctionStats:
+    """
+    Runtime counters for a `DeltaFunction` (or `OutputFunction`)
+
+    Keeps how many times each definition in the registry was called and the cumulative
+    time spent inside of it, keyed by the type signature of the definition. Only
+    collected once `enable_stats()` has been called on the function, or for the copy
+    of it made by `with_stats()` for an automaton built with `collect_stats=True`.
+    """
+
+    calls: dict[Signature, int]
+    times: dict[Signature, float]
+
+    def __init__(self) -> None:
+        self.calls = {}
+        self.times = {}
+
+    def record(self, signature: Signature, elapsed: float) -> None:
+        """Adds a single call to a definition that took `elapsed` seconds"""
+        self.calls[signature] = self.calls.get(signature, 0) + 1
+        self.times[signature] = self.times.get(signature, 0.0) + elapsed
+
+    @property
+    def total_calls(self) -> int:
+        """Amount of calls across all definitions"""
+        return sum(self.calls.values())
+
+    @property
+    def total_time(self) -> float:
+        """Seconds spent across all definitions"""
+        return sum(self.times.values())
+
+    def reset(self) -> None:
+        """Sets every counter back to zero"""
+        self.calls.clear()
+        self.times.clear()
+
+
+class AutomataStats:
+    """
+    Runtime counters for a `DeterministicFiniteAutomata` built with `collect_stats=True`
+
+    Attributes:
+        construction: Seconds spent on each construction phase, in the order they ran.
+        inputs_processed: Amount of input strings read by the automaton.
+        symbols_processed: Amount of input symbols read by the automaton.
+        execution_time: Seconds spent executing inputs (mostly in the native or Python
+            run loops, depending on the backend in use).
+        decode_hits: State decodes answered by the cache of decoded states.
+        decode_misses: State decodes that had to go through `literal_eval`.
+        decode_time: Seconds spent in `literal_eval` decoding states.
+        transition_function: Counters of the transition function definitions.
+        output_function: Counters of the output function definitions, for transducers.
+    """
+
+    construction: dict[str, float]
+    inputs_processed: int
+    symbols_processed: int
+    execution_time: float
+    decode_hits: int
+    decode_misses: int
+    decode_time: float
+    transition_function: FunctionStats | None
+    output_function: FunctionStats | None
+
+    def __init__(self) -> None:
+        self.construction = {}
+        self.transition_function = None
+        self.output_function = None
+        self.reset()
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """Records the time spent inside the `with` block as a construction phase"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.construction[name] = perf_counter() - start
+
+    @property
+    def construction_time(self) -> float:
+        """Seconds spent constructing the automaton"""
+        return sum(self.construction.values())
+
+    @property
+    def decode_hit_rate(self) -> float:
+        """Fraction of state decodes that were answered by the cache"""
+        total = self.decode_hits + self.decode_misses
+        return self.decode_hits / total if total else 0.0
+
+    def reset(self) -> None:
+        """Sets every runtime counter back to zero, keeping construction times"""
+        self.inputs_processed = 0
+        self.symbols_processed = 0
+        self.execution_time = 0.0
+        self.decode_hits = 0
+        self.decode_misses = 0
+        self.decode_time = 0.0
+        for function_stats in (self.transition_function, self.output_function):
+            if function_stats is not None:
+                function_stats.reset()
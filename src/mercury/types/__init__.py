@@ -1,4 +1,4 @@
 from ._delta_function import Registry
-from ._state import InputState, InputSymbol, State
+from ._state import InputBytes, InputState, InputSymbol, State
 
-__all__ = ["Registry", "State", "InputState", "InputSymbol"]
+__all__ = ["Registry", "State", "InputState", "InputSymbol", "InputBytes"]
@@ -25,3 +25,10 @@ type InputSymbol = str
 Wrapper over string to represent a single input symbol. It should always be a one-character
 string value, however, this verification might not be enforced at runtime for now
 """
+
+type InputBytes = bytes | bytearray | memoryview
+"""
+Binary input for automata running in byte mode, where each byte is read as the input
+symbol with the same code point (`chr(byte)`), so that alphabets made of the characters
+between `\\x00` and `\\xff` can read raw bytes without decoding them first
+"""
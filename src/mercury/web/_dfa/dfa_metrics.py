@@ -0,0 +1,85 @@
+from collections.abc import Iterator
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from mercury.profiling import AutomataStats, FunctionStats
+
+
+class DFAStatsCollector(Collector):
+    """
+    Prometheus collector that exposes the stats of an automaton, read at scrape time
+    so that counting in the hot loop stays a plain integer increment
+    """
+
+    _stats: AutomataStats
+
+    def __init__(self, stats: AutomataStats) -> None:
+        self._stats = stats
+
+    def collect(self) -> Iterator[Metric]:
+        construction = GaugeMetricFamily(
+            "mercury_construction_seconds",
+            "Seconds spent on each construction phase of the automaton",
+            labels=["phase"],
+        )
+        for phase, elapsed in self._stats.construction.items():
+            construction.add_metric([phase], elapsed)
+        yield construction
+
+        yield CounterMetricFamily(
+            "mercury_inputs_processed",
+            "Input strings read by the automaton",
+            value=self._stats.inputs_processed,
+        )
+        yield CounterMetricFamily(
+            "mercury_symbols_processed",
+            "Input symbols read by the automaton",
+            value=self._stats.symbols_processed,
+        )
+        yield CounterMetricFamily(
+            "mercury_execution_seconds",
+            "Seconds spent executing inputs",
+            value=self._stats.execution_time,
+        )
+
+        decodes = CounterMetricFamily(
+            "mercury_state_decodes",
+            "State decodes, by whether they were answered by the cache",
+            labels=["result"],
+        )
+        decodes.add_metric(["hit"], self._stats.decode_hits)
+        decodes.add_metric(["miss"], self._stats.decode_misses)
+        yield decodes
+        yield CounterMetricFamily(
+            "mercury_state_decode_seconds",
+            "Seconds spent decoding states with literal_eval",
+            value=self._stats.decode_time,
+        )
+
+        calls = CounterMetricFamily(
+            "mercury_definition_calls",
+            "Calls to each definition of the transition and output functions",
+            labels=["function", "signature"],
+        )
+        seconds = CounterMetricFamily(
+            "mercury_definition_seconds",
+            "Seconds spent in each definition of the transition and output functions",
+            labels=["function", "signature"],
+        )
+        for function, function_stats in (
+            ("transition", self._stats.transition_function),
+            ("output", self._stats.output_function),
+        ):
+            if function_stats is None:
+                continue
+            for signature, labels in _signature_labels(function_stats):
+                calls.add_metric([function, labels], function_stats.calls[signature])
+                seconds.add_metric([function, labels], function_stats.times[signature])
+        yield calls
+        yield seconds
+
+
+def _signature_labels(function_stats: FunctionStats):
+    for signature in function_stats.calls:
+        yield signature, f"({', '.join(t.__name__ for t in signature)})"
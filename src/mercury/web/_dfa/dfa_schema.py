@@ -1,8 +1,10 @@
+from collections.abc import Sequence
 from typing import Literal
 
 from pydantic import BaseModel
 
-from mercury.automata import DeterministicFiniteAutomata
+from mercury.automata import CompiledTable, DeterministicFiniteAutomata
+from mercury.profiling import Coverage
 from mercury.types import State
 
 
@@ -11,6 +13,11 @@ class DFANode(BaseModel):
     label: str
 
 
+class DFALayoutNode(DFANode):
+    x: float
+    y: float
+
+
 class DFALink(BaseModel):
     label: str
     source: str
@@ -18,12 +25,25 @@ class DFALink(BaseModel):
 
 
 class DFASchema(BaseModel):
-    nodes: list[DFANode]
+    nodes: list[DFALayoutNode | DFANode]
     links: list[DFALink]
     initial_node: DFANode
     final_nodes: list[DFANode]
 
 
+class DFAHeatmapNode(DFANode):
+    visits: int
+
+
+class DFAHeatmapLink(DFALink):
+    visits: int
+
+
+class DFAHeatmap(BaseModel):
+    nodes: list[DFAHeatmapNode]
+    links: list[DFAHeatmapLink]
+
+
 class DFAEndResult(BaseModel):
     accepted: bool
 
@@ -33,35 +53,74 @@ class DFAStepResult(BaseModel):
     result: DFANode | bool
 
 
-def to_schema(dfa: DeterministicFiniteAutomata) -> DFASchema:
-    nodes: list[DFANode] = []
+class DFASessionMessage(BaseModel):
+    action: Literal["read", "reset", "finish"]
+    symbols: str = ""
+
+
+class DFASessionError(BaseModel):
+    status: Literal["error"] = "error"
+    detail: str
+
+
+def to_schema(
+    dfa: DeterministicFiniteAutomata,
+    positions: Sequence[tuple[float, float]] | None = None,
+    table: CompiledTable | None = None,
+) -> DFASchema:
+    """
+    Describes the automaton for the frontend, out of `table` (its compiled table by
+    default). With `positions` (indexed by state id of that same table, see
+    `layered_layout`), nodes carry their coordinates so the client only draws them
+    """
+    if table is None:
+        table = dfa.compiled
+    nodes: list[DFALayoutNode | DFANode] = []
     links: list[DFALink] = []
-    for state in dfa.states:
-        nodes.append(to_node(state))
-    for initial_conditions, next_state in dfa.transitions.items():
-        links.append(
-            DFALink(
-                label=initial_conditions[1],
-                source=str(initial_conditions[0]),
-                target=str(next_state),
-            )
-        )
+    for state_id, state in enumerate(table.states):
+        node = to_node(state)
+        if positions is not None:
+            x, y = positions[state_id]
+            node = DFALayoutNode(**node.model_dump(), x=x, y=y)
+        nodes.append(node)
+    for state, row in zip(table.states, table.transitions):
+        for symbols, next_state_id in zip(table.classes, row):
+            for symbol in symbols:
+                links.append(
+                    DFALink(
+                        label=symbol,
+                        source=str(state),
+                        target=str(table.states[next_state_id]),
+                    )
+                )
     return DFASchema(
         nodes=nodes,
         links=links,
-        initial_node=DFANode(
-            id=str(dfa.initial_state),
-            label="".join([str(cmp) for cmp in dfa.initial_state]),
-        ),
+        initial_node=to_node(table.states[table.initial_state]),
         final_nodes=[
-            DFANode(
-                id=str(state),
-                label="".join([str(cmp) for cmp in state]),
-            )
-            for state in dfa.final_states
+            to_node(table.states[state_id]) for state_id in table.final_states
         ],
     )
 
 
 def to_node(state: State) -> DFANode:
     return DFANode(label="".join([str(cmp) for cmp in state]), id=str(state))
+
+
+def to_heatmap(dfa: DeterministicFiniteAutomata, coverage: Coverage) -> DFAHeatmap:
+    transition_counts = coverage.transition_counts()
+    return DFAHeatmap(
+        nodes=[
+            DFAHeatmapNode(**to_node(state).model_dump(), visits=visits)
+            for state, visits in coverage.state_counts().items()
+        ],
+        links=[
+            DFAHeatmapLink(
+                label=initial_conditions[1],
+                source=str(initial_conditions[0]),
+                target=str(next_state),
+                visits=transition_counts[initial_conditions],
+            )
+            for initial_conditions, next_state in dfa.transitions.items()
+        ],
+    )
@@ -1,13 +1,31 @@
+import asyncio
+from concurrent.futures import Future
 from pathlib import Path
+from threading import Lock, Thread
+from typing import cast
 
 import uvicorn
-from fastapi import APIRouter, FastAPI
+from fastapi import APIRouter, FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from pydantic import ValidationError
 
+from mercury.automata import CompiledTable
 from mercury.automata import DeterministicFiniteAutomata as DFA
+from mercury.exceptions import MissingDependencyException, StatsNotCollectedException
+from mercury.types import State
 
-from .._dfa.dfa_schema import DFASchema, to_node, to_schema
+from .._dfa.dfa_layout import layered_layout
+from .._dfa.dfa_schema import (
+    DFAHeatmap,
+    DFASchema,
+    DFASessionError,
+    DFASessionMessage,
+    DFAStepResult,
+    to_heatmap,
+    to_node,
+    to_schema,
+)
 
 # Cannot easily modify unless recompiling the frontend
 
@@ -21,9 +39,20 @@ class DFAView:
     _automata: DFA
     _app: FastAPI
     _router: APIRouter
+    _schema: Future[DFASchema]
+    _schema_table: CompiledTable | None
+    _schema_lock: Lock
 
-    def __init__(self, automata: DFA) -> None:
+    def __init__(self, automata: DFA, metrics: bool = False) -> None:
+        """
+        Creates the web application for the automaton. With `metrics`, the stats of the
+        automaton (see `collect_stats`) are exported as Prometheus metrics in `/metrics`
+        """
         self._automata = automata
+        self._schema_table = None
+        self._schema_lock = Lock()
+        # The layout of large automata takes a while, so it starts right away
+        _ = self._current_schema()
         self._app = FastAPI(
             title="Mercury API Interface",
             description="Mercury API made in order to link the library to a web interface",
@@ -37,6 +66,8 @@ class DFAView:
         )
         self._router = APIRouter()
         self._register_routes()
+        if metrics:
+            self._mount_metrics()
 
         static_dir = Path(__file__).parent.parent.parent / "static"
         self._app.mount(
@@ -48,18 +79,157 @@ class DFAView:
 
         @self._router.get("/automata")
         async def fetch_automata() -> DFASchema:
-            "Returns basic information about the automata that is currently running"
-            return to_schema(self._automata)
+            """
+            Returns basic information about the automata that is currently running, with
+            the position of each node. Built in the background and cached until the
+            automaton is rebuilt
+            """
+            return await asyncio.wrap_future(self._current_schema())
 
         @self._router.post("/automata/execute")
-        async def execute_automata(input_string: str):
-            "Executes the input string on the DFA at once, returning the states it went through"
-            states = list(self._automata.read_input_stepwise(input_string))
+        async def execute_automata(input_string: str, compact: bool = False):
+            """
+            Executes the input string on the DFA at once, returning the states it went
+            through. With `compact`, repeated states are sent once along with the amount
+            of consecutive steps spent on them (in `counts`, see `trace_runs`)
+            """
+            table = self._automata.compiled
+            if compact:
+                trace = self._automata.trace_runs(input_string)
+                state_ids = cast(list[int], trace.state_ids.tolist())
+                steps = len(trace)
+            else:
+                trace = None
+                state_ids = self._automata.trace_ids(input_string).tolist()
+                steps = len(state_ids)
+            # The trace stops early on symbols outside of the alphabet
+            accepted = (
+                steps == len(input_string) + 1 and state_ids[-1] in table.final_states
+            )
+            # Each state is only converted once, no matter how often it is visited
+            nodes = {
+                state_id: to_node(table.states[state_id]) for state_id in set(state_ids)
+            }
+
+            if trace is None:
+                return {
+                    "nodes": [nodes[state_id] for state_id in state_ids],
+                    "accepted": accepted,
+                }
             return {
-                "nodes": [to_node(state) for state in states],
-                "accepted": states[-1] in self._automata.final_states,
+                "nodes": [nodes[state_id] for state_id in state_ids],
+                "counts": cast(list[int], trace.lengths.tolist()),
+                "accepted": accepted,
             }
 
+        @self._router.post("/automata/coverage")
+        async def coverage_automata(input_strings: list[str]) -> DFAHeatmap:
+            """
+            Runs a batch of input strings on the DFA, returning the visits to each state
+            and link
+            """
+            return to_heatmap(self._automata, self._automata.coverage(input_strings))
+
+        @self._router.websocket("/automata/session")
+        async def automata_session(websocket: WebSocket):
+            """
+            Opens a step-through session on the DFA. The client sends symbols as they
+            are typed and receives each new state immediately, while the server only
+            keeps the current state of the session
+            """
+            await websocket.accept()
+            state: State | None = self._automata.initial_state
+            await websocket.send_json(
+                DFAStepResult(status="ongoing", result=to_node(state)).model_dump()
+            )
+            try:
+                while True:
+                    try:
+                        message = DFASessionMessage.model_validate_json(
+                            await websocket.receive_text()
+                        )
+                    except ValidationError as e:
+                        # Malformed messages are reported, keeping the session open
+                        detail = "; ".join(error["msg"] for error in e.errors())
+                        await websocket.send_json(
+                            DFASessionError(detail=detail).model_dump()
+                        )
+                        continue
+                    if message.action == "reset":
+                        state = self._automata.initial_state
+                        await websocket.send_json(
+                            DFAStepResult(
+                                status="ongoing", result=to_node(state)
+                            ).model_dump()
+                        )
+                    elif message.action == "finish":
+                        # Read from the current table, which `rebuild` may replace
+                        table = self._automata.compiled
+                        accepted = (
+                            state is not None
+                            and table.state_ids.get(state) in table.final_states
+                        )
+                        await websocket.send_json(
+                            DFAStepResult(
+                                status="finished", result=accepted
+                            ).model_dump()
+                        )
+                    else:
+                        for symbol in message.symbols:
+                            if state is not None:
+                                state = self._automata.next_state(state, symbol)
+                            # A symbol without transition rejects the rest of the input
+                            if state is None:
+                                await websocket.send_json(
+                                    DFAStepResult(
+                                        status="finished", result=False
+                                    ).model_dump()
+                                )
+                                break
+                            await websocket.send_json(
+                                DFAStepResult(
+                                    status="ongoing", result=to_node(state)
+                                ).model_dump()
+                            )
+            except WebSocketDisconnect:
+                pass
+
+    def _current_schema(self) -> Future[DFASchema]:
+        """
+        Schema of the automaton as currently compiled, laying it out again in the
+        background whenever `rebuild` replaced its compiled table since the last one
+        """
+        table = self._automata.compiled
+        with self._schema_lock:
+            if self._schema_table is not table:
+                self._schema_table = table
+                self._schema = Future()
+                Thread(
+                    target=self._build_schema, args=(table, self._schema), daemon=True
+                ).start()
+            return self._schema
+
+    def _build_schema(self, table: CompiledTable, schema: Future[DFASchema]) -> None:
+        try:
+            positions = layered_layout(table)
+            schema.set_result(to_schema(self._automata, positions, table))
+        except Exception as e:
+            schema.set_exception(e)
+
+    def _mount_metrics(self):
+        if self._automata.stats is None:
+            raise StatsNotCollectedException()
+        try:
+            from prometheus_client import CollectorRegistry, make_asgi_app
+
+            from .dfa_metrics import DFAStatsCollector
+        except ImportError:
+            raise MissingDependencyException("prometheus-client", "metrics")
+
+        registry = CollectorRegistry()
+        registry.register(DFAStatsCollector(self._automata.stats))
+        self._app.mount("/metrics", make_asgi_app(registry=registry))
+
     def run(self, host: str = "0.0.0.0"):
         """Run the FastAPI application using uvicorn"""
         print("Graphical automata view can be seen at http://127.0.0.1:8081/view")
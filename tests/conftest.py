@@ -1,10 +1,39 @@
 """
-Dummy conftest.py for mercury.
+Shared configuration of the tests of mercury.
 
-If you don't know what this is for, just leave it empty.
 Read more about conftest.py under:
 - https://docs.pytest.org/en/stable/fixture.html
 - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+from pathlib import Path
+
+import pytest
+
+BENCHMARK_STORAGE = Path(__file__).parent / "benchmarks"
+"""Where the baseline of the benchmarks is stored and compared against"""
+
+_DEFAULT_BENCHMARK_STORAGE = "file://./.benchmarks"
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config: pytest.Config) -> None:
+    # Runs before `pytest-benchmark` reads its options, when it is installed at all.
+    # Benchmarks only run once by default, unless given `--benchmark-enable`
+    if not config.pluginmanager.hasplugin("benchmark"):
+        return
+    config.option.benchmark_disable = True
+    if config.option.benchmark_storage == _DEFAULT_BENCHMARK_STORAGE:
+        config.option.benchmark_storage = f"file://{BENCHMARK_STORAGE}"
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: list[pytest.Item]
+) -> None:
+    # Without `pytest-benchmark` there is no `benchmark` fixture to run them with
+    if config.pluginmanager.hasplugin("benchmark"):
+        return
+    skip = pytest.mark.skip(reason="pytest-benchmark is not installed")
+    for item in items:
+        if "benchmark" in getattr(item, "fixturenames", ()):
+            item.add_marker(skip)
@@ -1,8 +1,21 @@
+from array import array
+
+import numpy as np
+import pytest
 from frozendict import frozendict
 
-from mercury.automata import DeterministicFiniteAutomata
+from mercury.automata import (
+    BYTE_ALPHABET,
+    DeterministicFiniteAutomata,
+    _deterministic_finite_automata,
+)
 from mercury.decorators import DeltaFunction
-from mercury.exceptions import MissingDefinitionException
+from mercury.exceptions import (
+    InvalidRegexException,
+    MissingDefinitionException,
+    MissingStateException,
+)
+from mercury.operations import sets
 from mercury.operations.sets import S
 
 
@@ -123,3 +136,718 @@ def test_automata_Amod3xBmod3_scenario():
     assert automata.accepts_input("aaaxbbb")
     assert automata.accepts_input("aaax")
     assert not automata.accepts_input("axbb")
+
+
+def test_automata_stats():
+    states = [0, 1]
+    input_symbols = "01"
+    initial_state = 0
+    final_states = [0]
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(_: int, next: str):
+        return int(next)
+
+    automata = DeterministicFiniteAutomata(
+        states, input_symbols, initial_state, final_states, delta
+    )
+    assert automata.stats is None
+    assert delta.stats is None
+
+    automata = DeterministicFiniteAutomata(
+        states, input_symbols, initial_state, final_states, delta, collect_stats=True
+    )
+    stats = automata.stats
+    assert stats is not None
+    assert list(stats.construction) == ["states", "mappings", "automata", "compile"]
+    assert stats.transition_function is not None
+    assert stats.transition_function.calls == {(int,): 4}
+    # Counted for this automaton alone, other users of the function are unaffected
+    assert delta.stats is None
+    other = DeterministicFiniteAutomata(
+        states, input_symbols, initial_state, final_states, delta, collect_stats=True
+    )
+    assert other.stats is not None and other.stats.transition_function is not None
+    assert other.stats.transition_function is not stats.transition_function
+    assert stats.transition_function.calls == {(int,): 4}
+
+    assert automata.accepts_input("010")
+    assert list(automata.read_input_stepwise("01")) == [(0,), (0,), (1,)]
+    assert stats.inputs_processed == 2
+    assert stats.symbols_processed == 5
+    # States are cached as they are encoded, so none go through `literal_eval`
+    assert stats.decode_misses == 0
+    assert stats.decode_hit_rate == 1.0
+
+    stats.reset()
+    assert stats.symbols_processed == 0
+    assert stats.transition_function.total_calls == 0
+
+
+def test_automata_compiled_table():
+    states = S({"a", "b"}) * S(range(2))
+    input_symbols = "ab"
+    initial_state = ("a", 0)
+    final_states = [("b", 1)]
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(w: str, y: int, next: str):
+        return (next, (y + 1) % 2)
+
+    automata = DeterministicFiniteAutomata(
+        states, input_symbols, initial_state, final_states, delta
+    )
+    table = automata.compiled
+
+    assert table.states == (("a", 0), ("a", 1), ("b", 0), ("b", 1))
+    assert table.symbols == ("a", "b")
+    assert table.initial_state == 0
+    assert table.final_states == frozenset([3])
+    for (state, symbol), next_state in automata.transitions.items():
+        assert (
+            table.states[
+                table.transitions[table.state_ids[state]][table.class_ids[symbol]]
+            ]
+            == next_state
+        )
+
+
+def test_automata_symbol_classes():
+    states = ["start", "word", "number"]
+    input_symbols = "abcdefghij0123456789"
+    initial_state = "start"
+    final_states = ["word", "number"]
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(state: str, next: str):
+        return "number" if next.isdigit() else "word"
+
+    automata = DeterministicFiniteAutomata(
+        states, input_symbols, initial_state, final_states, delta
+    )
+    table = automata.compiled
+
+    assert set(automata.symbol_classes) == {
+        frozenset("0123456789"),
+        frozenset("abcdefghij"),
+    }
+    assert table.num_classes == 2
+    assert all(len(row) == 2 for row in table.transitions)
+    assert len(table.class_lookup) == 256
+    assert table.class_lookup[ord("a")] == table.class_ids["j"]
+    assert table.class_lookup[ord("z")] == -1
+    assert automata.accepts_input("abc123")
+    assert list(automata.finditer("ab1")) == [1, 2, 3]
+
+
+def test_automata_coverage():
+    states = [0, 1, 2]
+    input_symbols = "01"
+    initial_state = 0
+    final_states = [0]
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(state: int, next: str):
+        return 2 if state == 2 else int(next)
+
+    automata = DeterministicFiniteAutomata(
+        states, input_symbols, initial_state, final_states, delta
+    )
+    coverage = automata.coverage(["010", "1", "", "0x1"])
+
+    assert coverage.state_counts() == {(0,): 7, (1,): 2, (2,): 0}
+    assert coverage.visits((0,)) == 7
+    assert coverage.unvisited_states() == frozenset([(2,)])
+    assert coverage.transition_counts()[((0,), "0")] == 2
+    assert coverage.transition_counts()[((1,), "0")] == 1
+    assert ((2,), "1") in coverage.unvisited_transitions()
+    assert coverage.transition_visits.shape == (3, 2)
+
+
+def test_automata_accepts_batch():
+    # Accepts binary numbers that are multiples of 3
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(remainder: int, next: str):
+        return (remainder * 2 + int(next)) % 3
+
+    automata = DeterministicFiniteAutomata(range(3), "01", 0, [0], delta)
+    inputs = [
+        "",
+        "11",
+        "10",
+        "0x0",
+        "110",
+        "1" * 42 + "0",
+        "1" * 5000,
+        "1" * 5000 + "x",
+    ]
+    inputs += [bin(number)[2:] for number in range(200)]
+
+    accepted = automata.accepts_batch(inputs)
+    assert accepted.dtype == bool
+    assert accepted.tolist() == [automata.accepts_input(i) for i in inputs]
+    assert accepted[:6].tolist() == [True, True, False, False, True, True]
+    assert automata.accepts_batch([]).tolist() == []
+
+
+def test_automata_trace():
+    # Stays on 0 until reading a "b", then stays on 1
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(state: int, next: str):
+        return 1 if next == "b" else state
+
+    automata = DeterministicFiniteAutomata([0, 1], "ab", 0, [1], delta)
+
+    trace = automata.trace("aabab")
+    assert trace.dtype == np.int32
+    assert trace.tolist() == [0, 0, 0, 1, 1, 1]
+    assert automata.compiled.states[trace[-1]] == (1,)
+    assert automata.trace("abz").tolist() == [0, 0, 1]
+    assert automata.trace_ids("abz") == array("i", [0, 0, 1])
+
+    runs = automata.trace_runs("aabab")
+    assert list(runs.runs()) == [((0,), 3), ((1,), 3)]
+    assert len(runs) == 6
+    assert runs.expand().tolist() == trace.tolist()
+
+    # Long enough to be traced in several chunks, with runs going across them
+    input_str = "a" * 100_000 + "b" * 100_000 + "z"
+    runs = automata.trace_runs(input_str)
+    assert runs.state_ids.tolist() == [0, 1]
+    assert runs.lengths.tolist() == [100_001, 100_000]
+    assert (runs.expand() == automata.trace(input_str)).all()
+
+
+def test_automata_scanning():
+    # Recognizes "ab" and "bb"
+    states = ["start", "a", "b", "match", "dead"]
+    input_symbols = "ab"
+    initial_state = "start"
+    final_states = ["match"]
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(state: str, next: str):
+        if state == "start":
+            return next
+        if state in ("a", "b") and next == "b":
+            return "match"
+        return "dead"
+
+    automata = DeterministicFiniteAutomata(
+        states, input_symbols, initial_state, final_states, delta
+    )
+    text = "aabbxbbab"
+
+    assert list(automata.finditer(text)) == [3, 4, 7, 9]
+    assert list(automata.finditer(text, anchored=True)) == []
+    assert list(automata.finditer("abab", anchored=True)) == [2]
+    assert list(automata.scan(["aa", "b", "bxb", "bab"])) == [3, 4, 7, 9]
+    assert list(automata.finditer(text)) == [
+        end
+        for end in range(len(text) + 1)
+        if any(automata.accepts_input(text[start:end]) for start in range(end))
+    ]
+
+
+def test_automata_from_regex():
+    automata = DeterministicFiniteAutomata.from_regex("(ab|c)*[x-z]?", "abcxyz")
+
+    assert automata.accepts_input("")
+    assert automata.accepts_input("abcab")
+    assert automata.accepts_input("cabz")
+    assert not automata.accepts_input("abb")
+    assert not automata.accepts_input("zx")
+    assert all(
+        isinstance(state, tuple) and isinstance(state[0], tuple)
+        for state in automata.states
+    )
+    # Parsed once, but every call gets an automaton of its own
+    again = DeterministicFiniteAutomata.from_regex("(ab|c)*[x-z]?", "zyxcba")
+    assert again is not automata
+    assert again.compiled.transitions == automata.compiled.transitions
+    _ = again.compile_to_python()
+    assert automata._generated is None
+
+    digits = DeterministicFiniteAutomata.from_regex("[^a]\\.+", "a.0")
+    assert digits.accepts_input("0..")
+    assert not digits.accepts_input("a.")
+    assert list(digits.finditer("a.0.")) == [4]
+
+
+def test_automata_from_invalid_regex():
+    for pattern in ["(ab", "ab)", "*a", "[a", "d"]:
+        try:
+            DeterministicFiniteAutomata.from_regex(pattern, "abc")
+            assert False, f"Expected InvalidRegexException for {pattern}"
+        except InvalidRegexException:
+            assert True
+
+
+def test_automata_byte_mode():
+    # Accepts binary inputs whose amount of zero bytes is a multiple of 3
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(zeros: int, next: str):
+        return (zeros + 1) % 3 if next == "\x00" else zeros
+
+    automata = DeterministicFiniteAutomata(range(3), BYTE_ALPHABET, 0, [0], delta)
+
+    assert automata.accepts_bytes(b"")
+    assert automata.accepts_bytes(b"\x00\xff\x00\x10\x00")
+    assert not automata.accepts_bytes(bytearray(b"\x00\x00"))
+    assert automata.accepts_bytes(memoryview(b"\x01" * 10 + b"\x00" * 3))
+
+    # Long enough to be run with NumPy, with the same result as stepping through it
+    data = bytes(range(256)) * 100 + b"\x00"
+    assert automata.accepts_bytes(data) == automata.accepts_input(
+        data.decode("latin-1")
+    )
+    assert not automata.accepts_bytes(data)
+    assert list(automata.scan([b"\x00\x01", b"\x00\x00"], anchored=True)) == [0, 4]
+
+
+def test_automata_byte_mode_partial_alphabet():
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(_: int, next: str):
+        return int(next)
+
+    automata = DeterministicFiniteAutomata([0, 1], "01", 0, [0], delta)
+
+    assert automata.accepts_bytes(b"0110")
+    assert not automata.accepts_bytes(b"01")
+    assert not automata.accepts_bytes(b"0\xff0")
+    assert automata.accepts_bytes(b"01" * 5000 + b"0")
+    assert not automata.accepts_bytes(b"01" * 5000 + b"\xff0")
+    assert list(automata.finditer("1020")) == list(automata.scan([b"1020"]))
+
+
+def test_automata_dead_states_and_pruning():
+    delta = DeltaFunction()
+
+    # Accepts two or more 'a', where a 'b' leads into a pair of dead states. States
+    # 5 to 7 can't be reached, even though 5 and 7 can reach a final state
+    @delta.definition()
+    def _(state: int, next: str):
+        if state < 3:
+            return min(state + 1, 2) if next == "a" else 3
+        return {3: 4, 4: 3, 5: 2, 6: 3, 7: 7}[state]
+
+    automata = DeterministicFiniteAutomata(range(8), "ab", 0, [2, 7], delta)
+    pruned = DeterministicFiniteAutomata(range(8), "ab", 0, [2, 7], delta, prune=True)
+
+    assert automata.reachable_states() == {(0,), (1,), (2,), (3,), (4,)}
+    assert automata.live_states() == {(0,), (1,), (2,), (5,), (7,)}
+    assert automata.dead_states() == {(3,), (4,), (6,)}
+    assert automata.compiled.sink_state is None
+
+    # Dead states are collapsed into a sink, which only leads to itself
+    assert pruned.states == {(0,), (1,), (2,), (3,)}
+    assert pruned.final_states == {(2,)}
+    assert pruned.dead_states() == {(3,)}
+    assert pruned.compiled.sink_state == pruned.compiled.state_ids[(3,)]
+    assert pruned.next_state(3, "a") == (3,)
+    for input_str in ["", "a", "aa", "aab", "ba", "aaaa", "ab" * 5000]:
+        assert pruned.accepts_input(input_str) == automata.accepts_input(input_str)
+        assert pruned.accepts_bytes(input_str.encode()) == automata.accepts_input(
+            input_str
+        )
+
+    # Runs stop on the sink, before reaching symbols outside of the alphabet
+    assert not pruned.accepts_input("b" + "a" * 10_000 + "z")
+    assert pruned.read_input("bz") is None
+
+
+def test_automata_lazy_states():
+    import tracemalloc
+
+    delta = DeltaFunction()
+
+    # Counts 'a' modulo 4 in the first component, within a space of 10^7 states
+    @delta.definition()
+    def _(count: int, other: int, next: str):
+        return ((count + (next == "a")) % 4, other)
+
+    tracemalloc.start()
+    automata = DeterministicFiniteAutomata(
+        S(range(10_000)) * S(range(1_000)),
+        "ab",
+        (0, 0),
+        S(range(0, 10_000, 2)) * S({0}),
+        delta,
+    )
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert peak < 10_000_000
+    assert automata.states == {(0, 0), (1, 0), (2, 0), (3, 0)}
+    assert automata.final_states == {(0, 0), (2, 0)}
+    assert automata.accepts_input("abab")
+    assert not automata.accepts_input("abb")
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return count + 1
+
+    try:
+        DeterministicFiniteAutomata(S(range(1 << 16)), "a", 0, [], delta)
+        assert False, "Expected MissingStateException, constructor passed"
+    except MissingStateException:
+        assert True
+
+
+def test_automata_count_and_iter_accepted():
+    from itertools import product
+
+    automata = DeterministicFiniteAutomata.from_regex("(a|bc)*d?", "abcd")
+
+    for length in range(7):
+        inputs = ["".join(symbols) for symbols in product("abcd", repeat=length)]
+        accepted = [
+            input_str for input_str in inputs if automata.accepts_input(input_str)
+        ]
+        assert automata.count_accepted(length) == len(accepted)
+        assert automata.count_accepted(length, 7) == len(accepted) % 7
+        assert [
+            input_str
+            for input_str in automata.iter_accepted(6)
+            if len(input_str) == length
+        ] == accepted
+
+    assert list(automata.iter_accepted(2)) == ["", "a", "d", "aa", "ad", "bc"]
+
+    # Large lengths go through matrix exponentiation, words of 'a' and 'bc' of length n
+    # are counted by the Fibonacci numbers
+    fibonacci = [1, 1]
+    while len(fibonacci) <= 2_000:
+        fibonacci.append(fibonacci[-1] + fibonacci[-2])
+    assert automata.count_accepted(2_000) == fibonacci[2_000] + fibonacci[1_999]
+    assert automata.count_accepted(2_000, 10**9 + 7) == (
+        fibonacci[2_000] + fibonacci[1_999]
+    ) % (10**9 + 7)
+    assert automata.count_accepted(10**18, 1_000) >= 0
+
+    empty = DeterministicFiniteAutomata.from_regex("a[]", "ab")
+    assert empty.count_accepted(5) == 0
+    assert list(empty.iter_accepted(5)) == []
+
+
+def test_automata_sample_accepted():
+    from collections import Counter
+    from random import Random
+
+    automata = DeterministicFiniteAutomata.from_regex("(a|bc)*d?", "abcd")
+    accepted = [
+        input_str for input_str in automata.iter_accepted(4) if len(input_str) == 4
+    ]
+
+    # Both the batched and the single draws cover every accepted input evenly
+    for k in [1, 6_000]:
+        rng = Random(k)
+        samples = [
+            sample
+            for _ in range(6_000 // k)
+            for sample in automata.sample_accepted(4, k, rng)
+        ]
+        counts = Counter(samples)
+        assert set(counts) == set(accepted)
+        assert all(count > 6_000 / len(accepted) * 0.7 for count in counts.values())
+
+    assert automata.sample_accepted(6, 50, Random(3)) == automata.sample_accepted(
+        6, 50, Random(3)
+    )
+    assert automata.sample_accepted(0, 2) == ["", ""]
+    # Past int64 counts, inputs are drawn with Python integers
+    assert all(
+        automata.accepts_input(sample)
+        for sample in automata.sample_accepted(200, 20, Random(5))
+    )
+
+    try:
+        DeterministicFiniteAutomata.from_regex("ab*", "ab").sample_accepted(0, 1)
+        assert False, "Expected ValueError, sampled from an empty set of inputs"
+    except ValueError as e:
+        assert "no input of length 0" in str(e)
+
+
+def test_automata_distances_and_shortest_accepted():
+    delta = DeltaFunction()
+
+    # Accepts inputs with 'ab' followed by at least 2 more symbols, 5 is a dead state
+    @delta.definition()
+    def _(state: int, next: str):
+        if state == 5:
+            return 5
+        if state == 0:
+            return 1 if next == "a" else 0
+        if state == 1:
+            return 2 if next == "b" else (1 if next == "a" else 0)
+        return min(state + 1, 4)
+
+    automata = DeterministicFiniteAutomata(range(6), "abc", 0, [4], delta)
+
+    assert [automata.distance_to_acceptance(state) for state in range(6)] == [
+        4,
+        3,
+        2,
+        1,
+        0,
+        None,
+    ]
+    assert automata.distance_to_acceptance(9) is None
+    assert automata.shortest_accepted() == "abaa"
+    assert automata.shortest_accepted_from(2) == "aa"
+    assert automata.shortest_accepted_from(4) == ""
+    assert automata.shortest_accepted_from(5) is None
+    assert automata.can_accept_within(1, 3)
+    assert not automata.can_accept_within(1, 2)
+    assert not automata.can_accept_within(5, 100)
+
+    # Once distances are known, short inputs are rejected without being read
+    assert not automata.accepts_input("abc")
+    assert automata.accepts_input("cabcc")
+
+    empty = DeterministicFiniteAutomata.from_regex("a[]", "ab")
+    assert empty.shortest_accepted() is None
+
+
+def test_automata_dot_export(tmp_path):
+    from mercury.automata import _dot
+
+    automata = DeterministicFiniteAutomata.from_regex('[a-e]x*|"', 'abcdex"')
+    dot = "".join(automata.iter_dot())
+    lines = dot.splitlines()
+    nodes = [line for line in lines if line.startswith("  s") and "->" not in line]
+    edges = [line for line in lines if line.startswith("  s") and "->" in line]
+    assert lines[0] == "digraph {" and lines[-1] == "}"
+    assert len(nodes) == automata.compiled.num_states
+    assert len(edges) == sum(len(set(row)) for row in automata.compiled.transitions)
+    assert sum("doublecircle" in node for node in nodes) == 3
+    # Parallel transitions are merged, with symbol runs written as ranges
+    assert '[label="\\",a-e,x"]' in dot
+    assert "__omitted" not in dot
+
+    limited = "".join(automata.iter_dot(max_states=2)).splitlines()
+    assert len([line for line in limited if "label=" in line and "->" not in line]) == 3
+    assert any(line.endswith('-> __omitted [label="\\",a-e,x"];') for line in limited)
+
+    # Only the initial state, and everything it leads to as a placeholder
+    around = "".join(automata.iter_dot(around=automata.initial_state, radius=0))
+    assert around.count("->") == 2
+
+    path = tmp_path / "diagram.dot"
+    automata.export_diagram(str(path))
+    assert path.read_text() == dot
+    assert _dot.render(automata.compiled) is _dot.render(automata.compiled)
+
+    try:
+        automata.iter_dot(around=123)
+        assert False, "Expected ValueError, drew around a missing state"
+    except ValueError:
+        assert True
+
+
+def test_automata_rebuild(monkeypatch: pytest.MonkeyPatch):
+    delta = DeltaFunction()
+    calls: list[tuple[object, ...]] = []
+
+    @delta.definition()
+    def _(count: int, next: str):
+        calls.append((count,))
+        return (count + 1) % 3 if next == "a" else count
+
+    @delta.definition()
+    def _(name: str, next: str):
+        calls.append((name,))
+        return name
+
+    automata = DeterministicFiniteAutomata(
+        S(range(3)) | S({"x", "y"}), "ab", 0, [0, "y"], delta
+    )
+    assert automata.accepts_input("aaa") and not automata.accepts_input("ab")
+    assert automata.rebuild() == frozenset()
+
+    @delta.definition()
+    def _(count: int, next: str):
+        calls.append((count,))
+        return (count + 1) % 3 if next == "b" else count
+
+    calls.clear()
+    assert automata.rebuild() == {(0,), (1,), (2,)}
+    assert sorted(calls) == [(0,), (0,), (1,), (1,), (2,), (2,)]
+    assert automata.accepts_input("abbb") and not automata.accepts_input("aaab")
+    assert (
+        automata.compiled.transitions
+        == DeterministicFiniteAutomata(
+            S(range(3)) | S({"x", "y"}), "ab", 0, [0, "y"], delta
+        ).compiled.transitions
+    )
+
+    # Pruned automata get back the states that become reachable
+    pruned = DeterministicFiniteAutomata([0, 1, 2], "ab", 0, [2], delta, prune=True)
+    assert pruned.states == {(0,), (1,), (2,)}
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return count
+
+    _ = pruned.rebuild()
+    assert pruned.states == {(0,)} and not pruned.accepts_input("bb")
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return 2 if next == "b" else count
+
+    _ = pruned.rebuild()
+    assert pruned.states == {(0,), (2,)} and pruned.accepts_input("ab")
+
+    # Explored automata only resolve the states they reach
+    monkeypatch.setattr(_deterministic_finite_automata, "LAZY_STATES_MIN_SIZE", 1)
+    monkeypatch.setattr(sets, "LAZY_RANGE_MIN_SIZE", 1)
+    explored = DeterministicFiniteAutomata(S(range(10)), "ab", 0, [3], delta)
+    assert explored.states == {(0,), (2,)}
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return count + 1 if next == "a" and count < 3 else count
+
+    assert explored.rebuild() == {(0,), (1,), (2,), (3,)}
+    assert explored.accepts_input("aaa")
+
+
+def test_automata_lazy_final_states(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(sets, "LAZY_RANGE_MIN_SIZE", 1)
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return (count + 1) % 3
+
+    automata = DeterministicFiniteAutomata(S(range(3)), "a", 0, S(range(2)), delta)
+    assert automata.final_states == {(0,), (1,)}
+    assert automata.accepts_input("aaaa") and not automata.accepts_input("aa")
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return (count + 2) % 3
+
+    assert automata.rebuild() == {(0,), (1,), (2,)}
+    assert automata.final_states == {(0,), (1,)}
+    assert automata.accepts_input("aa") and not automata.accepts_input("a")
+
+
+def test_automata_shared_across_threads():
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    automata = DeterministicFiniteAutomata.from_regex("(a|b)*abb(a|b)*|c*", "abc")
+    generator = random.Random(11)
+    inputs = [
+        "".join(generator.choice("abc") for _ in range(generator.randrange(0, 60)))
+        for _ in range(5_000)
+    ] + ["ab" * 5_000 + "b"]
+    expected = [automata.accepts_input(input_str) for input_str in inputs]
+    matches = [list(automata.finditer(input_str)) for input_str in inputs[:200]]
+    counts = [automata.count_accepted(length) for length in range(40)]
+
+    assert automata.accepts_many(inputs) == expected
+    assert automata.accepts_many([]) == []
+    try:
+        automata.accepts_many(inputs, chunk_size=0)
+        assert False, "Expected ValueError, chunks of no inputs were accepted"
+    except ValueError:
+        assert True
+
+    # Every thread hits the lazily built structures at the same time
+    shared = automata
+    shared._clear_caches()
+
+    def work(seed: int) -> bool:
+        order = list(range(200))
+        random.Random(seed).shuffle(order)
+        return (
+            all(list(shared.finditer(inputs[i])) == matches[i] for i in order)
+            and [shared.count_accepted(length) for length in range(40)] == counts
+            and shared.accepts_many(inputs, chunk_size=97) == expected
+        )
+
+    for workers in (1, 2, 4, 8):
+        with ThreadPoolExecutor(workers) as executor:
+            assert automata.accepts_many(inputs, executor, chunk_size=64) == expected
+            assert all(executor.map(work, range(workers * 2)))
+
+
+def test_automata_canonical_hash_and_intern():
+    import gc
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return (count + (next == "a")) % 4
+
+    @delta.definition()
+    def _(name: str, next: str):
+        return name
+
+    # Even amounts of 'a', with redundant and unreachable states
+    counter = DeterministicFiniteAutomata(
+        S(range(4)) | S({"x"}), "ab", 0, [0, 2], delta
+    )
+    even = DeterministicFiniteAutomata.from_regex("(b*ab*a)*b*", "ab")
+    odd = DeterministicFiniteAutomata.from_regex("(b*ab*a)*b*a", "ab")
+    assert counter.canonical_hash() == even.canonical_hash()
+    assert counter.canonical_hash() != odd.canonical_hash()
+    assert (
+        DeterministicFiniteAutomata.from_regex("(b*ab*a)*b*", "abc").canonical_hash()
+        != even.canonical_hash()
+    )
+
+    # Every empty language over the alphabet is the same
+    empty = DeterministicFiniteAutomata(range(4), "ab", 0, [], delta)
+    assert (
+        empty.canonical_hash()
+        == DeterministicFiniteAutomata.from_regex("a(ab)*[^ab]", "ab").canonical_hash()
+    )
+
+    assert even.intern() is even
+    assert counter.intern() is even
+    assert odd.intern() is odd and even.intern() is even
+
+    # Interned automata are dropped once no longer used
+    digest = empty.canonical_hash()
+    assert empty.intern() is empty
+    del empty
+    _ = gc.collect()
+    other = DeterministicFiniteAutomata(["x"], "ab", "x", [], delta)
+    assert other.canonical_hash() == digest
+    assert other.intern() is other
+
+    # Rebuilding changes the language, so the automaton is no longer interned
+    fourth = DeterministicFiniteAutomata(range(4), "ab", 0, [0], delta)
+    assert fourth.intern() is fourth
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return (count + (next == "b")) % 4
+
+    assert fourth.rebuild() == {(0,), (1,), (2,), (3,)}
+    assert fourth.accepts_input("abbbb") and not fourth.accepts_input("aaab")
+    again = DeterministicFiniteAutomata.from_regex("(b*ab*ab*ab*a)*b*", "ab")
+    assert again.intern() is again
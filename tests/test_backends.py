@@ -0,0 +1,319 @@
+import random
+from array import array
+
+import pytest
+
+from mercury.automata import (
+    DeterministicFiniteAutomata,
+    DeterministicFiniteTransducer,
+    _backend,
+    _run,
+)
+from mercury.decorators import DeltaFunction, OutputFunction
+from mercury.exceptions import InvalidSymbolException, UnsupportedAlphabetException
+
+
+def make_counter_transducer() -> DeterministicFiniteTransducer:
+    """Counts 'a' modulo 5, writing the count before each 'a' and a dot otherwise"""
+    delta = DeltaFunction()
+    output_fn = OutputFunction()
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return (count + 1) % 5 if next == "a" else count
+
+    @output_fn.definition()
+    def _(count: int, next: str):
+        return str(count) if next == "a" else "."
+
+    return DeterministicFiniteTransducer(
+        range(5), "abñ€", ".01234", 0, [0], delta, output_fn
+    )
+
+
+def random_inputs(alphabet: str, amount: int = 200) -> list[str]:
+    generator = random.Random(7)
+    return [
+        "".join(generator.choice(alphabet) for _ in range(generator.randrange(0, 300)))
+        for _ in range(amount)
+    ] + ["a" * 70_000 + "b"]
+
+
+def backends():
+    speedups = pytest.importorskip("mercury.automata._speedups")
+    return _run, speedups
+
+
+def test_backends_run_equivalence():
+    python, speedups = backends()
+    table = make_counter_transducer().compiled
+    args = (table.class_lookup, table.flat_transitions, table.num_classes)
+
+    # Includes symbols outside of the alphabet, both below and past the lookup size
+    for input_str in random_inputs("abñ€z\U0001f600") + ["a" * 70_000 + "za"]:
+        assert python.run(*args, table.initial_state, input_str) == speedups.run(
+            *args, table.initial_state, input_str
+        )
+    for state in range(table.num_states):
+        assert python.run(*args, state, b"aab\xff") == speedups.run(
+            *args, state, b"aab\xff"
+        )
+        assert python.run(*args, state, bytearray(b"abba")) == speedups.run(
+            *args, state, bytearray(b"abba")
+        )
+
+
+def test_backends_run_many_equivalence():
+    python, speedups = backends()
+    table = make_counter_transducer().compiled
+    args = (table.class_lookup, table.flat_transitions, table.num_classes, 0)
+    inputs = random_inputs("abñ€z\U0001f600") + [b"aab\xff", bytearray(b"abba")]
+
+    for sink in (-1, 3):
+        python_out = array("i", [-2]) * len(inputs)
+        speedups_out = array("i", [-2]) * len(inputs)
+        python.run_many(*args, inputs, sink, python_out)
+        speedups.run_many(*args, inputs, sink, speedups_out)
+        assert python_out == speedups_out
+        assert python_out.tolist() == [
+            python.run(*args, input_str, sink) for input_str in inputs
+        ]
+
+    try:
+        speedups.run_many(*args, ["a", "b"], -1, array("i", [0]))
+        assert False, "Expected ValueError, states were written past the buffer"
+    except ValueError:
+        assert True
+
+
+def test_backends_trace_equivalence():
+    python, speedups = backends()
+    table = make_counter_transducer().compiled
+    args = (table.class_lookup, table.flat_transitions, table.num_classes)
+
+    for input_str in random_inputs("abñ€z") + ["a" * 70_000 + "za"]:
+        python_out = array("i", [-1]) * (len(input_str) + 1)
+        speedups_out = array("i", [-1]) * (len(input_str) + 1)
+        assert python.trace(
+            *args, table.initial_state, input_str, python_out
+        ) == speedups.trace(*args, table.initial_state, input_str, speedups_out)
+        assert python_out == speedups_out
+
+    try:
+        speedups.trace(*args, table.initial_state, "aa", array("i", [0, 0]))
+        assert False, "Expected ValueError, trace was written past the buffer"
+    except ValueError:
+        assert True
+
+
+def test_backends_transduce_equivalence():
+    python, speedups = backends()
+    transducer = make_counter_transducer()
+    table = transducer.compiled
+    args = (
+        table.class_lookup,
+        table.flat_transitions,
+        table.flat_outputs,
+        transducer._tape.outputs,
+        table.num_classes,
+        table.initial_state,
+    )
+
+    for input_str in random_inputs("abñ€z") + ["a" * 70_000 + "za"]:
+        assert python.transduce(*args, input_str) == speedups.transduce(
+            *args, input_str
+        )
+
+
+def test_backends_transduce_into_equivalence():
+    python, speedups = backends()
+    transducer = make_counter_transducer()
+    table = transducer.compiled
+    blob = "".join(transducer._tape.outputs).encode()
+    args = (
+        table.class_lookup,
+        table.flat_transitions,
+        table.flat_outputs,
+        blob,
+        array("i", range(len(blob) + 1)),
+        table.num_classes,
+        table.initial_state,
+    )
+
+    for input_str in random_inputs("abñ€z") + ["a" * 70_000 + "za"]:
+        python_out = bytearray(len(input_str))
+        speedups_out = bytearray(len(input_str))
+        assert python.transduce_into(
+            *args, input_str, python_out
+        ) == speedups.transduce_into(*args, input_str, speedups_out)
+        assert python_out == speedups_out
+
+    try:
+        speedups.transduce_into(*args, "aa", bytearray(1))
+        assert False, "Expected ValueError, outputs were written past the buffer"
+    except ValueError:
+        assert True
+
+
+def test_backends_invalid_table():
+    _, speedups = backends()
+    table = make_counter_transducer().compiled
+
+    try:
+        speedups.run(table.class_lookup, table.flat_transitions, 3, 0, "a")
+        assert False, "Expected ValueError, rows of the wrong width were accepted"
+    except ValueError:
+        assert True
+    try:
+        speedups.run(table.class_lookup, [0, 1], table.num_classes, 0, "a")
+        assert False, "Expected TypeError, a list was accepted as a table"
+    except TypeError:
+        assert True
+
+
+def test_backends_automata_results(monkeypatch: pytest.MonkeyPatch):
+    transducer = make_counter_transducer()
+    inputs = random_inputs("abñ€")
+    accepted = transducer.accepts_many(inputs)
+    expected = [
+        (
+            transducer.accepts_input(input_str),
+            transducer.read_input(input_str),
+            transducer.transduce_input(input_str),
+        )
+        for input_str in inputs
+    ]
+
+    monkeypatch.setattr(_backend, "run", _run.run)
+    monkeypatch.setattr(_backend, "run_many", _run.run_many)
+    monkeypatch.setattr(_backend, "transduce_into", _run.transduce_into)
+    assert expected == [
+        (
+            transducer.accepts_input(input_str),
+            transducer.read_input(input_str),
+            transducer.transduce_input(input_str),
+        )
+        for input_str in inputs
+    ]
+    assert accepted == transducer.accepts_many(inputs, chunk_size=7)
+    assert accepted == [accepts for accepts, _, _ in expected]
+
+
+def test_backends_transduce_matches_output_function():
+    transducer = make_counter_transducer()
+
+    # The final state is asked for its output without a symbol
+    assert transducer.transduce_input("") == "."
+    assert transducer.transduce_input("abaa") == "0.12."
+    assert transducer.transduce_input("ñaaaaaa€") == ".012340.."
+    for input_str in random_inputs("abñ€", 20):
+        assert transducer.transduce_input(input_str) == "".join(
+            transducer.read_input_transducer_stepwise(input_str)
+        )
+    assert transducer.read_input("aaaaaaa") == (2,)
+    assert transducer.read_input("aza") is None
+    assert not transducer.accepts_input("aza")
+
+    try:
+        transducer.transduce_input("abzb")
+        assert False, "Expected InvalidSymbolException, transduction passed"
+    except InvalidSymbolException as e:
+        assert "'z' at position 2" in str(e)
+
+
+def test_backends_symbols_outside_of_lookup():
+    # Symbols past U+FFFF can't be looked up by code point, and take the slower path
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(state: int, next: str):
+        return 1 - state if next == "\U0001f600" else state
+
+    automata = DeterministicFiniteAutomata([0, 1], "a\U0001f600", 0, [1], delta)
+
+    assert len(automata.compiled.class_lookup) == 0
+    assert automata.accepts_input("a\U0001f600a")
+    assert not automata.accepts_input("\U0001f600\U0001f600")
+    assert automata.read_input("ab") is None
+    assert automata.trace("a\U0001f600x").tolist() == [0, 0, 1]
+
+
+def test_backends_generated_python(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    transducer = make_counter_transducer()
+    inputs = random_inputs("abñ€")
+    expected = [
+        (
+            transducer.accepts_input(input_str),
+            transducer.read_input(input_str),
+            transducer.transduce_input(input_str),
+        )
+        for input_str in inputs
+    ]
+
+    module = transducer.compile_to_python()
+    table = transducer.compiled
+    for input_str in inputs[:20] + ["abz", "\U0001f600"]:
+        assert module.run(input_str, 2) == _run.run(
+            table.class_lookup, table.flat_transitions, table.num_classes, 2, input_str
+        )
+    assert module.transduce("aabz", 0) == ("01.", -1, 3)
+
+    # Runs through the generated module only when the extension isn't in use
+    monkeypatch.setattr(_backend, "BACKEND", "python")
+    monkeypatch.setattr(_backend, "run", None)
+    monkeypatch.setattr(_backend, "transduce_into", None)
+    assert expected == [
+        (
+            transducer.accepts_input(input_str),
+            transducer.read_input(input_str),
+            transducer.transduce_input(input_str),
+        )
+        for input_str in inputs
+    ]
+    try:
+        transducer.transduce_input("abzb")
+        assert False, "Expected InvalidSymbolException, transduction passed"
+    except InvalidSymbolException as e:
+        assert "'z' at position 2" in str(e)
+
+    # Written to disk, the module is imported from there
+    path = tmp_path / "counter.py"
+    module = transducer.compile_to_python(str(path))
+    assert module.__file__ == str(path)
+    assert transducer.compile_to_python(str(path)).TRANSITIONS == module.TRANSITIONS
+    assert transducer.transduce_input("aaaaaaa") == "0123401."
+
+    # Rebuilding drops the module, as the table it was generated from is gone
+    _ = transducer.rebuild()
+    assert transducer._generated is None
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(state: int, next: str):
+        return ord(next) - 0x100
+
+    wide = DeterministicFiniteAutomata(
+        range(300), "".join(map(chr, range(0x100, 0x100 + 300))), 0, [1], delta
+    )
+    try:
+        wide.compile_to_python()
+        assert False, "Expected UnsupportedAlphabetException, module was generated"
+    except UnsupportedAlphabetException as e:
+        assert "at most 255 symbol classes" in str(e)
+
+
+def test_backends_generated_python_without_symbols():
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(state: int, next: str):
+        return state
+
+    automata = DeterministicFiniteAutomata([0, 1], "", 1, [1], delta)
+    module = automata.compile_to_python()
+    assert module.WIDTH == 1
+    assert module.run("", 1) == 1 and module.run("a", 1) == -1
+    assert module.transduce("", 1) == ("", 1, 0)
+    assert module.transduce("ab", 1) == ("", -1, 0)
+    assert automata.accepts_input("") and not automata.accepts_input("a")
@@ -0,0 +1,168 @@
+"""
+Benchmarks for the hot paths of Mercury, powered by `pytest-benchmark`.
+
+By default these run once as regular tests (see `conftest.py`), so they only check that
+nothing is broken, and they are skipped without `pytest-benchmark`. To measure and
+compare against the latest baseline in `tests/benchmarks` run `tox -e benchmark`, or
+save a new baseline with `tox -e benchmark -- --benchmark-save=baseline`. Baselines are
+stored per platform and Python build and only hold on the machine that saved them, so
+save one locally before comparing (see CONTRIBUTING.rst).
+"""
+
+import pytest
+
+from mercury.automata import DeterministicFiniteAutomata, DeterministicFiniteTransducer
+from mercury.decorators import DeltaFunction, OutputFunction
+from mercury.operations.sets import S
+from mercury.web._dfa.dfa_schema import to_schema
+
+STATE_SPACE_SIZES = [10, 100, 1000]
+INPUT_LENGTHS = [10, 1_000, 10_000]
+
+
+def make_delta(n: int) -> DeltaFunction:
+    """
+    Amod(n)xBmod(n) delta function over the states S({"a", "b"}) * S(range(n)) | S({0})
+    """
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(_: int, next: str):
+        return 0
+
+    @delta.definition()
+    def _(w: str, y: int, next: str):
+        if w == "a" and next == "a":
+            return (w, (y + 1) % n)
+        elif w == "a" and next == "b":
+            return (w, y)
+        elif w == "a" and next == "x":
+            return ("b", (n - y) % n)
+        elif w == "b" and next == "b":
+            return (w, (y + 1) % n)
+        elif w == "b" and next == "a":
+            return (w, y)
+        else:
+            return 0
+
+    return delta
+
+
+def make_automata(n: int) -> DeterministicFiniteAutomata:
+    return DeterministicFiniteAutomata(
+        S({"a", "b"}) * S(range(n)) | S({0}),
+        "abx",
+        ("a", 0),
+        [("b", 0)],
+        make_delta(n),
+    )
+
+
+def make_transducer(n: int) -> DeterministicFiniteTransducer:
+    output_fn = OutputFunction()
+
+    @output_fn.definition()
+    def _(_: int, next: str):
+        return "r"
+
+    @output_fn.definition()
+    def _(w: str, y: int, next: str):
+        return w
+
+    return DeterministicFiniteTransducer(
+        S({"a", "b"}) * S(range(n)) | S({0}),
+        "abx",
+        "abr",
+        ("a", 0),
+        [("b", 0)],
+        make_delta(n),
+        output_fn,
+    )
+
+
+def make_input(length: int) -> str:
+    """Input that stays out of the rejecting state: a run of a's, an x, then b's"""
+    half = max(length // 2, 1)
+    return "a" * half + "x" + "b" * (length - half - 1)
+
+
+@pytest.mark.parametrize("n", STATE_SPACE_SIZES)
+def test_benchmark_construction(benchmark, n: int):
+    delta = make_delta(n)
+    states = S({"a", "b"}) * S(range(n)) | S({0})
+
+    automata = benchmark(
+        DeterministicFiniteAutomata, states, "abx", ("a", 0), [("b", 0)], delta
+    )
+    assert len(automata.states) == 2 * n + 1
+
+
+@pytest.mark.parametrize("length", INPUT_LENGTHS)
+def test_benchmark_accepts_input(benchmark, length: int):
+    automata = make_automata(3)
+    input_str = make_input(length)
+
+    assert benchmark(automata.accepts_input, input_str) == automata.accepts_input(
+        input_str
+    )
+
+
+@pytest.mark.parametrize("length", INPUT_LENGTHS)
+def test_benchmark_read_input_stepwise(benchmark, length: int):
+    automata = make_automata(3)
+    input_str = make_input(length)
+
+    states = benchmark(lambda: list(automata.read_input_stepwise(input_str)))
+    assert len(states) == length + 1
+
+
+@pytest.mark.parametrize("length", INPUT_LENGTHS)
+def test_benchmark_transduce_input(benchmark, length: int):
+    transducer = make_transducer(3)
+    input_str = make_input(length)
+
+    tape = benchmark(transducer.transduce_input, input_str)
+    assert len(tape) == length + 1
+
+
+def test_benchmark_delta_function_dispatch(benchmark):
+    delta = make_delta(3)
+
+    assert benchmark(delta, args=("a", 1), next_symbol="a") == ("a", 2)
+
+
+@pytest.mark.parametrize("n", [10, 100])
+def test_benchmark_to_schema(benchmark, n: int):
+    automata = make_automata(n)
+
+    schema = benchmark(to_schema, automata)
+    assert len(schema.nodes) == 2 * n + 1
+
+
+@pytest.mark.parametrize("length", INPUT_LENGTHS)
+def test_benchmark_finditer(benchmark, length: int):
+    automata = make_automata(3)
+    input_str = make_input(length)
+
+    benchmark(lambda: list(automata.finditer(input_str)))
+
+
+@pytest.mark.parametrize("amount", [100, 10_000])
+def test_benchmark_accepts_batch(benchmark, amount: int):
+    automata = make_automata(3)
+    inputs = [make_input(length % 32 + 1) for length in range(amount)]
+
+    accepted = benchmark(automata.accepts_batch, inputs)
+    assert accepted.tolist() == [automata.accepts_input(i) for i in inputs]
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_benchmark_accepts_many_threads(benchmark, workers: int):
+    from concurrent.futures import ThreadPoolExecutor
+
+    automata = make_automata(3)
+    inputs = [make_input(length % 512 + 1) for length in range(20_000)]
+
+    with ThreadPoolExecutor(workers) as executor:
+        accepted = benchmark(automata.accepts_many, inputs, executor)
+    assert accepted == [automata.accepts_input(i) for i in inputs]
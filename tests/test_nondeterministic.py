@@ -0,0 +1,68 @@
+from mercury.automata import NondeterministicFiniteAutomata
+from mercury.decorators import DeltaFunction
+from mercury.exceptions import InvalidReturnTypeException
+
+
+def make_nth_from_last_automata(n: int) -> NondeterministicFiniteAutomata:
+    """Accepts strings over 'ab' where the n-th symbol from the end is an 'a'"""
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(position: int, next: str):
+        if position == 0:
+            return {0, 1} if next == "a" else {0}
+        if position < n:
+            return {position + 1}
+        return set()
+
+    return NondeterministicFiniteAutomata(range(n + 1), "ab", 0, [n], delta)
+
+
+def test_nondeterministic_simple_scenario():
+    automata = make_nth_from_last_automata(3)
+
+    assert automata.accepts_input("abb")
+    assert automata.accepts_input("bbbabb")
+    assert automata.accepts_input("aaa")
+    assert not automata.accepts_input("bab")
+    assert not automata.accepts_input("")
+    assert not automata.accepts_input("abc")
+    assert list(automata.read_input_stepwise("ab")) == [
+        frozenset([(0,)]),
+        frozenset([(0,), (1,)]),
+        frozenset([(0,), (2,)]),
+    ]
+
+
+def test_nondeterministic_lazy_determinization():
+    automata = make_nth_from_last_automata(10)
+    assert automata.materialized_states == 1
+
+    # Only the sets of states visited by the input are built, out of the 2^10 possible
+    assert automata.accepts_input("b" * 20 + "a" + "b" * 9)
+    assert automata.materialized_states == 11
+    assert automata.accepts_input("b" * 20 + "a" + "b" * 9)
+    assert automata.materialized_states == 11
+
+
+def test_nondeterministic_to_dfa():
+    automata = make_nth_from_last_automata(3)
+    dfa = automata.to_dfa()
+
+    assert len(dfa.states) == 8
+    for input_str in ["", "a", "abb", "bab", "aaaa", "babba", "ababbb"]:
+        assert dfa.accepts_input(input_str) == automata.accepts_input(input_str)
+
+
+def test_nondeterministic_invalid_return_type():
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(position: int, next: str):
+        return position
+
+    try:
+        NondeterministicFiniteAutomata([0], "a", 0, [0], delta)
+        assert False, "Expected InvalidReturnTypeException, constructor passed"
+    except InvalidReturnTypeException:
+        assert True
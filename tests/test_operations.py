@@ -1,4 +1,4 @@
-from mercury.operations.sets import S
+from mercury.operations.sets import LAZY_RANGE_MIN_SIZE, LazySet, S
 
 
 def test_set_definition_operations():
@@ -8,3 +8,44 @@ def test_set_definition_operations():
     assert 0 in Q
     assert ("a", 0) in Q
     assert ("b", 2) in Q
+
+
+def test_set_lazy_views():
+    P = S(range(10_000)) * S(range(1_000)) * S({"x", "y"})
+
+    # Products are flat and never materialized
+    assert len(P) == 20_000_000
+    assert (5, 7, "x") in P
+    assert ((5, 7), "x") not in P
+    assert (5, 7, "z") not in P
+    assert (5, 7) not in P
+    assert next(iter(P)) == (0, 0, "x") or next(iter(P)) == (0, 0, "y")
+
+    Q = S({"a", "b"}) * S(range(3)) | S({0}) | S(range(2))
+    assert len(Q) == 8
+    assert sorted(map(str, Q)) == sorted(
+        map(str, [("a", 0), ("a", 1), ("a", 2), ("b", 0), ("b", 1), ("b", 2), 0, 1])
+    )
+    assert 1 in Q and ("b", 2) in Q and 2 not in Q
+
+    # The rest of the set operations return regular sets
+    R = S(range(LAZY_RANGE_MIN_SIZE))
+    assert isinstance(R, LazySet)
+    assert R & {1, 7, -1} == {1, 7}
+    assert isinstance({-1} | R, type(R | {-1}))
+
+
+def test_set_lazy_views_behave_like_frozensets():
+    # Small ranges are stored, so they are still an S
+    assert isinstance(S(range(3)), S)
+    assert S(range(3)) == {0, 1, 2}
+
+    R = S(range(LAZY_RANGE_MIN_SIZE))
+    assert R == frozenset(range(LAZY_RANGE_MIN_SIZE)) == R
+    assert R != frozenset(range(1, LAZY_RANGE_MIN_SIZE + 1))
+    assert hash(R) == hash(frozenset(range(LAZY_RANGE_MIN_SIZE)))
+
+    P = S({"a", "b"}) * S({0})
+    assert P == {("a", 0), ("b", 0)}
+    assert {P: 1}[frozenset({("b", 0), ("a", 0)})] == 1
+    assert len({P, S({("a", 0), ("b", 0)}), P | S({("a", 0)})}) == 1
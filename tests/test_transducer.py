@@ -1,6 +1,11 @@
-from mercury.automata import DeterministicFiniteTransducer
+from mercury.automata import DeterministicFiniteTransducer, MealyTransducer
 from mercury.decorators import DeltaFunction, OutputFunction
-from mercury.exceptions import InvalidOutputException
+from mercury.exceptions import (
+    InvalidOutputException,
+    InvalidReturnTypeException,
+    InvalidSymbolException,
+    UnsupportedAlphabetException,
+)
 from mercury.operations.sets import S
 
 
@@ -159,3 +164,252 @@ def test_invalid_output_function():
         assert True
     except Exception as e:
         assert False, f"Expected InvalidOutputException, encountered {e}"
+
+    # Only a MealyTransducer takes bytes
+    @output_fn.definition()
+    def _(state: str, next: str):
+        return b"a"
+
+    try:
+        __ = DeterministicFiniteTransducer(
+            states,
+            input_symbols,
+            output_symbols,
+            initial_state,
+            final_states,
+            delta,
+            output_fn,
+        )
+        assert False, "Expected InvalidReturnTypeException, constructor passed"
+    except InvalidReturnTypeException as e:
+        assert "expected to return type str" in str(e)
+
+
+def test_transducer_stats():
+    delta = DeltaFunction()
+    output_fn = OutputFunction()
+
+    @delta.definition()
+    def _(state: str, next: str):
+        return state
+
+    @output_fn.definition()
+    def _(state: str, next: str):
+        return "a"
+
+    transducer = DeterministicFiniteTransducer(
+        states=S(["a"]),
+        input_symbols="a",
+        output_symbols="a",
+        initial_state="a",
+        final_states=["a"],
+        transition_function=delta,
+        output_function=output_fn,
+        collect_stats=True,
+    )
+    stats = transducer.stats
+    assert stats is not None
+    assert "outputs" in stats.construction
+    assert stats.output_function is not None
+    assert output_fn.stats is None
+
+    assert transducer.transduce_input("aaa") == "aaaa"
+    assert stats.output_function.calls == {(str,): 5}
+    assert stats.symbols_processed == 3
+
+
+def make_escaper(output_type: type[str] | type[bytes] = str) -> MealyTransducer:
+    """Escapes quotes and backslashes, dropping the rest of the input after a '#'"""
+    delta = DeltaFunction()
+    output_fn = OutputFunction()
+
+    @delta.definition()
+    def _(comment: bool, next: str):
+        return comment or next == "#"
+
+    @output_fn.definition()
+    def _(comment: bool, next: str):
+        if comment or next == "#":
+            output = ""
+        elif next in '"\\':
+            output = "\\" + next
+        else:
+            output = "€" if next == "e" else next
+        return output if output_type is str else output.encode()
+
+    return MealyTransducer([False, True], 'ab"\\#e', False, [False], delta, output_fn)
+
+
+def test_mealy_transducer_outputs():
+    escaper = make_escaper()
+
+    assert escaper.transduce_input("") == ""
+    assert escaper.transduce_input("ab") == "ab"
+    assert escaper.transduce_input('a"b\\e') == 'a\\"b\\\\€'
+    assert escaper.transduce_input('a#b"') == "a"
+    assert escaper.transduce_input("e" * 100_000) == "€" * 100_000
+    assert escaper.transduce_input("ab" * 100_000 + "#a") == "ab" * 100_000
+
+    assert escaper.outputs.count("") == 1
+    assert escaper.output_table[((False,), '"')] == '\\"'
+    assert escaper.output_table[((True,), "a")] == ""
+    assert len(escaper.output_table) == 12
+
+    try:
+        escaper.transduce_input("a" * 70_000 + "z")
+        assert False, "Expected InvalidSymbolException, transduction passed"
+    except InvalidSymbolException as e:
+        assert "'z' at position 70000" in str(e)
+
+
+def test_mealy_transducer_bytes():
+    escaper = make_escaper(bytes)
+
+    assert escaper.transduce_input("") == b""
+    assert escaper.transduce_input('a"e#b') == 'a\\"€'.encode()
+    assert escaper.output_table[((False,), "e")] == "€".encode()
+
+    delta = DeltaFunction()
+    output_fn = OutputFunction()
+
+    @delta.definition()
+    def _(state: int, next: str):
+        return state
+
+    @output_fn.definition()
+    def _(state: int, next: str):
+        return next if next == "a" else next.encode()
+
+    try:
+        MealyTransducer([0], "ab", 0, [0], delta, output_fn)
+        assert False, "Expected InvalidReturnTypeException, constructor passed"
+    except InvalidReturnTypeException:
+        assert True
+
+
+def test_transducer_composition():
+    from test_backends import make_counter_transducer, random_inputs
+
+    counter = make_counter_transducer()
+
+    # Maps the digits of the counter into letters, and dots into 'b'
+    delta = DeltaFunction()
+    output_fn = OutputFunction()
+
+    @delta.definition()
+    def _(seen: int, next: str):
+        return min(seen + (next == "4"), 2)
+
+    @output_fn.definition()
+    def _(seen: int, next: str):
+        if next is None:
+            return "€" if seen == 2 else "b"
+        return "b" if next == "." else "a" if int(next) % 2 else "ñ"
+
+    letters = DeterministicFiniteTransducer(
+        range(3), ".01234", "abñ€", 0, [1], delta, output_fn
+    )
+
+    composed = counter >> letters
+    assert len(composed.states) <= len(counter.states) * len(letters.states)
+    for input_str in random_inputs("abñ€", 30)[:-1] + ["", "aaaaa", "aaaaab"]:
+        tape = counter.transduce_input(input_str)
+        assert composed.transduce_input(input_str) == letters.transduce_input(tape)
+        assert composed.accepts_input(input_str) == (
+            counter.accepts_input(input_str) and letters.accepts_input(tape)
+        )
+
+    # The composition can be chained further
+    twice = counter >> letters >> counter
+    assert twice.transduce_input("aaaaab") == counter.transduce_input(
+        composed.transduce_input("aaaaab")
+    )
+
+    try:
+        _ = letters >> letters
+        assert False, "Expected InvalidOutputException, composition passed"
+    except InvalidOutputException as e:
+        assert "returned value b" in str(e)
+
+    # Outputs are read a character at a time, which multi-character symbols can't be
+    @delta.definition()
+    def _(seen: int, next: str):
+        return seen
+
+    @output_fn.definition()
+    def _(seen: int, next: str):
+        return "a"
+
+    words = DeterministicFiniteTransducer(
+        [0], ["ab", "c"], "a", 0, [0], delta, output_fn
+    )
+    try:
+        _ = counter >> words
+        assert False, "Expected UnsupportedAlphabetException, composition passed"
+    except UnsupportedAlphabetException as e:
+        assert "single character" in str(e)
+
+
+def test_transducer_transduce_many():
+    from test_backends import make_counter_transducer, random_inputs
+
+    counter = make_counter_transducer()
+    inputs = random_inputs("abñ€", 50)
+    assert counter.transduce_many(inputs) == list(map(counter.transduce_input, inputs))
+    assert counter.transduce_many([]) == []
+
+    escaper = make_escaper(bytes)
+    assert escaper.transduce_many(["a", "", '"' * 10, "e#a"]) == [
+        b"a",
+        b"",
+        b'\\"' * 10,
+        "€".encode(),
+    ]
+
+    try:
+        counter.transduce_many(["ab", "abz"])
+        assert False, "Expected InvalidSymbolException, transduction passed"
+    except InvalidSymbolException as e:
+        assert "position 2" in str(e)
+
+
+def test_transducer_canonical_hash():
+    from test_backends import make_counter_transducer
+
+    counter = make_counter_transducer()
+
+    # Counts modulo 10 but writes the count modulo 5, which behaves just the same
+    delta = DeltaFunction()
+    output_fn = OutputFunction()
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return (count + 1) % 10 if next == "a" else count
+
+    @output_fn.definition()
+    def _(count: int, next: str):
+        return str(count % 5) if next == "a" else "."
+
+    def make(final_states: list[int]) -> DeterministicFiniteTransducer:
+        return DeterministicFiniteTransducer(
+            range(10), "abñ€", ".01234", 0, final_states, delta, output_fn
+        )
+
+    assert make([0, 5]).canonical_hash() == counter.canonical_hash()
+    assert make([0]).canonical_hash() != counter.canonical_hash()
+    assert make([0, 5]).intern() is counter.intern()
+
+    # The output after the last symbol tells states apart too
+    @output_fn.definition()
+    def _(count: int, next: str):
+        if next is None and count >= 5:
+            return "0"
+        return str(count % 5) if next == "a" else "."
+
+    assert make([0, 5]).transduce_input("aaaaa") == "012340"
+    assert make([0, 5]).canonical_hash() != counter.canonical_hash()
+
+    # Transducers with the same language but other outputs differ
+    mealy = make_escaper()
+    assert mealy.canonical_hash() != make_escaper(bytes).canonical_hash()
+    assert mealy.canonical_hash() == make_escaper().canonical_hash()
@@ -1,7 +1,12 @@
+from fastapi.testclient import TestClient
+
 from mercury.automata import DeterministicFiniteAutomata
 from mercury.decorators import DeltaFunction
+from mercury.exceptions import StatsNotCollectedException
 from mercury.operations.sets import S
 from mercury.web import DFAView
+from mercury.web._dfa.dfa_layout import layered_layout
+from mercury.web._dfa.dfa_schema import to_schema
 
 
 def test_automata_Amod3xBmod3_web_visualization():
@@ -36,4 +41,249 @@ def test_automata_Amod3xBmod3_web_visualization():
     )
 
     web = DFAView(automata)
-    # TODO: Some unit testing on the view endpoint would be appreciated
+    schema = TestClient(web._app).get("/api/automata").json()
+    assert len(schema["nodes"]) == 7
+
+    # Laid out in layers by distance from the initial state, without overlaps
+    positions = {node["id"]: (node["x"], node["y"]) for node in schema["nodes"]}
+    assert positions["('a', 0)"][0] == 0
+    assert positions["('b', 0)"][0] > positions["('a', 0)"][0]
+    assert len(set(positions.values())) == len(positions)
+
+
+def test_automata_web_schema_after_rebuild():
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return (count + 1) % 3
+
+    automata = DeterministicFiniteAutomata([0, 1, 2], "a", 0, [0], delta)
+    table = automata.compiled
+    client = TestClient(DFAView(automata)._app)
+    links = client.get("/api/automata").json()["links"]
+    assert {(link["source"], link["target"]) for link in links} == {
+        ("(0,)", "(1,)"),
+        ("(1,)", "(2,)"),
+        ("(2,)", "(0,)"),
+    }
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return count
+
+    assert automata.rebuild() == {(0,), (1,), (2,)}
+    links = client.get("/api/automata").json()["links"]
+    assert {(link["source"], link["target"]) for link in links} == {
+        ("(0,)", "(0,)"),
+        ("(1,)", "(1,)"),
+        ("(2,)", "(2,)"),
+    }
+
+    # A layout in progress describes the table it was computed from
+    schema = to_schema(automata, layered_layout(table), table)
+    assert {(link.source, link.target) for link in schema.links} == {
+        ("(0,)", "(1,)"),
+        ("(1,)", "(2,)"),
+        ("(2,)", "(0,)"),
+    }
+
+
+def test_automata_web_step_through_session():
+    states = [0, 1]
+    input_symbols = "01"
+    initial_state = 0
+    final_states = [0]
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(_: int, next: str):
+        return int(next)
+
+    automata = DeterministicFiniteAutomata(
+        states, input_symbols, initial_state, final_states, delta
+    )
+
+    client = TestClient(DFAView(automata)._app)
+    with client.websocket_connect("/api/automata/session") as websocket:
+        assert websocket.receive_json()["result"]["id"] == "(0,)"
+
+        websocket.send_json({"action": "read", "symbols": "01"})
+        assert websocket.receive_json()["result"]["id"] == "(0,)"
+        assert websocket.receive_json()["result"]["id"] == "(1,)"
+
+        websocket.send_json({"action": "finish"})
+        assert websocket.receive_json() == {"status": "finished", "result": False}
+
+        websocket.send_json({"action": "read", "symbols": "0"})
+        assert websocket.receive_json()["result"]["id"] == "(0,)"
+
+        websocket.send_json({"action": "finish"})
+        assert websocket.receive_json() == {"status": "finished", "result": True}
+
+        websocket.send_json({"action": "read", "symbols": "2"})
+        assert websocket.receive_json() == {"status": "finished", "result": False}
+
+        websocket.send_json({"action": "reset"})
+        assert websocket.receive_json() == {
+            "status": "ongoing",
+            "result": {"id": "(0,)", "label": "0"},
+        }
+
+        # Malformed messages get an error back, and the session goes on
+        websocket.send_text("{not json")
+        assert websocket.receive_json()["status"] == "error"
+        websocket.send_json({"action": "jump"})
+        error = websocket.receive_json()
+        assert (
+            error["status"] == "error"
+            and "'read', 'reset' or 'finish'" in error["detail"]
+        )
+
+        websocket.send_json({"action": "read", "symbols": "1"})
+        assert websocket.receive_json()["result"]["id"] == "(1,)"
+
+
+def test_automata_web_session_after_rebuild():
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(count: int, next: str):
+        return count
+
+    # Pruned, the final state is unreachable until the automaton is rebuilt
+    automata = DeterministicFiniteAutomata([0, 1], "01", 0, [1], delta, prune=True)
+    client = TestClient(DFAView(automata)._app)
+    with client.websocket_connect("/api/automata/session") as websocket:
+        assert websocket.receive_json()["result"]["id"] == "(0,)"
+
+        @delta.definition()
+        def _(count: int, next: str):
+            return int(next)
+
+        assert automata.rebuild() == {(0,), (1,)}
+        websocket.send_json({"action": "read", "symbols": "1"})
+        assert websocket.receive_json()["result"]["id"] == "(1,)"
+        websocket.send_json({"action": "finish"})
+        assert websocket.receive_json() == {"status": "finished", "result": True}
+
+
+def test_automata_web_metrics():
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(_: int, next: str):
+        return int(next)
+
+    automata = DeterministicFiniteAutomata(
+        [0, 1], "01", 0, [0], delta, collect_stats=True
+    )
+    client = TestClient(DFAView(automata, metrics=True)._app)
+
+    client.post("/api/automata/execute", params={"input_string": "0110"})
+    metrics = client.get("/metrics/").text
+
+    assert 'mercury_construction_seconds{phase="mappings"}' in metrics
+    assert "mercury_symbols_processed_total 4.0" in metrics
+    assert (
+        'mercury_definition_calls_total{function="transition",signature="(int)"} 4.0'
+        in metrics
+    )
+
+
+def test_automata_web_metrics_without_stats():
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(_: int, next: str):
+        return int(next)
+
+    automata = DeterministicFiniteAutomata([0, 1], "01", 0, [0], delta)
+
+    try:
+        DFAView(automata, metrics=True)
+        assert False, "Expected StatsNotCollectedException, constructor passed"
+    except StatsNotCollectedException:
+        assert True
+
+
+def test_automata_web_coverage_heatmap():
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(_: int, next: str):
+        return int(next)
+
+    automata = DeterministicFiniteAutomata([0, 1], "01", 0, [0], delta)
+    client = TestClient(DFAView(automata)._app)
+
+    heatmap = client.post("/api/automata/coverage", json=["01", "1"]).json()
+
+    assert {node["id"]: node["visits"] for node in heatmap["nodes"]} == {
+        "(0,)": 3,
+        "(1,)": 2,
+    }
+    assert {
+        (link["source"], link["label"]): link["visits"] for link in heatmap["links"]
+    } == {("(0,)", "0"): 1, ("(0,)", "1"): 2, ("(1,)", "0"): 0, ("(1,)", "1"): 0}
+
+
+def test_automata_web_execute():
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(_: int, next: str):
+        return int(next)
+
+    automata = DeterministicFiniteAutomata([0, 1], "01", 0, [0], delta)
+    client = TestClient(DFAView(automata)._app)
+
+    result = client.post(
+        "/api/automata/execute", params={"input_string": "0110"}
+    ).json()
+    assert [node["id"] for node in result["nodes"]] == [
+        "(0,)",
+        "(0,)",
+        "(1,)",
+        "(1,)",
+        "(0,)",
+    ]
+    assert result["accepted"]
+
+    result = client.post(
+        "/api/automata/execute", params={"input_string": "0110", "compact": True}
+    ).json()
+    assert [node["id"] for node in result["nodes"]] == ["(0,)", "(1,)", "(0,)"]
+    assert result["counts"] == [2, 2, 1]
+    assert result["accepted"]
+
+    # Stops at symbols outside of the alphabet, rejecting the input
+    result = client.post("/api/automata/execute", params={"input_string": "0x"}).json()
+    assert len(result["nodes"]) == 2
+    assert not result["accepted"]
+    result = client.post(
+        "/api/automata/execute", params={"input_string": "00x", "compact": True}
+    ).json()
+    assert result["counts"] == [3] and not result["accepted"]
+
+
+def test_web_layout_large_automata():
+    from mercury.web._dfa.dfa_layout import LAYER_SPACING, layered_layout
+
+    delta = DeltaFunction()
+
+    @delta.definition()
+    def _(state: int, next: str):
+        return (state * 2 + int(next)) % 3_000
+
+    automata = DeterministicFiniteAutomata(range(3_001), "01", 0, [1], delta)
+    positions = layered_layout(automata.compiled)
+
+    assert len(positions) == 3_001
+    assert len(set(positions)) == 3_001
+    assert positions[automata.compiled.state_ids[(0,)]] == (0.0, 0.0)
+    # State 3000 can't be reached, and goes after every other layer
+    unreachable = positions[automata.compiled.state_ids[(3_000,)]][0]
+    assert unreachable == max(x for x, _ in positions)
+    assert unreachable % LAYER_SPACING == 0